@@ -34,6 +34,120 @@ API_CONFIG = {
     "port": 8000,
     "token": os.environ.get("API_TOKEN", "?C@TS&D0GS!"),
     "model_path": MODELS_DIR / "cats_dogs_model.keras",
+    # Backend d'inférence : "keras" ou "tflite" (voir scripts/export_model.py)
+    "model_backend": os.environ.get("MODEL_BACKEND", "keras"),
+    # Workers uvicorn lancés par scripts/run_api.py (chacun charge son propre modèle)
+    "workers": int(os.environ.get("API_WORKERS", 1)),
+}
+API_CONFIG["model_paths"] = {
+    "keras": API_CONFIG["model_path"],
+    "tflite": Path(os.environ.get("TFLITE_MODEL_PATH", MODELS_DIR / "cats_dogs_model.tflite")),
+}
+# Registre de modèles versionnés : <registre>/<version>/<artefact>, le plus récent est servi par défaut.
+# Tant que le registre est vide, le modèle de model_paths est servi sous MODEL_CONFIG["version"].
+API_CONFIG["registry_dir"] = Path(os.environ.get("MODEL_REGISTRY_DIR", MODELS_DIR / "registry"))
+API_CONFIG["model_version"] = os.environ.get("MODEL_VERSION") or None
+
+# Configuration de l'inférence (regroupement dynamique des requêtes)
+INFERENCE_CONFIG = {
+    "max_batch_size": int(os.environ.get("INFERENCE_MAX_BATCH_SIZE", 16)),
+    "max_wait_ms": float(os.environ.get("INFERENCE_MAX_WAIT_MS", 5)),
+    # Nombre de threads pour le décodage et l'inférence hors de la boucle asyncio
+    "max_concurrency": int(os.environ.get("INFERENCE_MAX_CONCURRENCY", min(4, os.cpu_count() or 1))),
+    # Lots factices par taille compilée avant de déclarer le modèle prêt
+    "warmup_rounds": int(os.environ.get("INFERENCE_WARMUP_ROUNDS", 3)),
+    # Processus d'inférence dédiés (0 = inférence dans le processus de l'API)
+    "workers": int(os.environ.get("INFERENCE_WORKERS", 0)),
+    # Threads TensorFlow par processus qui charge un modèle (0 = valeur par défaut de TF,
+    # ou un thread intra-op par CPU attribué si le processus est épinglé) ; intra-op aussi pour TFLite
+    "intra_op_threads": int(os.environ.get("INFERENCE_INTRA_OP_THREADS", 0)),
+    "inter_op_threads": int(os.environ.get("INFERENCE_INTER_OP_THREADS", 0)),
+    # Épinglage CPU : "" (aucun), "auto" ou liste ("0-7"), partagée entre les workers uvicorn
+    # puis entre les processus d'inférence de chacun
+    "cpu_affinity": os.environ.get("INFERENCE_CPU_AFFINITY", ""),
+    # Nombre maximal de fichiers par requête sur /api/predict/batch
+    "max_batch_files": int(os.environ.get("INFERENCE_MAX_BATCH_FILES", 500)),
+    # Archives sur /api/predict/archive : taille maximale d'un membre, copie en mémoire avant débordement sur disque
+    "max_member_bytes": int(os.environ.get("INFERENCE_MAX_MEMBER_MB", 20)) * 1024 * 1024,
+    "archive_spool_bytes": 8 * 1024 * 1024,
+    # Décodage JPEG à résolution réduite (mise à l'échelle dans le domaine DCT)
+    "jpeg_draft": os.environ.get("INFERENCE_JPEG_DRAFT", "true").lower() in ("1", "true", "yes"),
+    # Type des poids du modèle Keras servi : "float32", "float16" ou "bfloat16" (mémoire des poids / 2)
+    "weights_dtype": os.environ.get("MODEL_WEIGHTS_DTYPE", "float32"),
+}
+
+def batch_buckets(max_batch_size: int, value: str = "") -> list:
+    """Tailles de lot compilées : liste explicite ou puissances de 2 jusqu'à max_batch_size"""
+    if value:
+        return sorted({int(size) for size in value.split(",") if size.strip()})
+    sizes = {max_batch_size}
+    size = 1
+    while size < max_batch_size:
+        sizes.add(size)
+        size *= 2
+    return sorted(sizes)
+
+# Les lots sont complétés jusqu'à la taille compilée supérieure (pas de retraçage)
+INFERENCE_CONFIG["batch_buckets"] = batch_buckets(
+    INFERENCE_CONFIG["max_batch_size"], os.environ.get("INFERENCE_BATCH_BUCKETS", "")
+)
+
+# Contrôle des fichiers envoyés, avant tout décodage des pixels
+UPLOAD_CONFIG = {
+    "formats": ["JPEG", "PNG", "GIF", "BMP", "WEBP"],
+    "max_bytes": int(os.environ.get("UPLOAD_MAX_MB", 20)) * 1024 * 1024,
+    # Au-delà, l'image est traitée comme une bombe de décompression
+    "max_pixels": int(os.environ.get("UPLOAD_MAX_PIXELS", 40_000_000)),
+}
+
+# Cache des prédictions par (hash de l'image, version du modèle)
+CACHE_CONFIG = {
+    "enabled": os.environ.get("PREDICTION_CACHE", "true").lower() in ("1", "true", "yes"),
+    # "memory" (par processus) ou "redis" (partagé entre processus de l'API)
+    "backend": os.environ.get("PREDICTION_CACHE_BACKEND", "memory"),
+    "max_entries": int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", 10000)),
+    "ttl_seconds": float(os.environ.get("PREDICTION_CACHE_TTL", 3600)),
+    "redis_url": os.environ.get("PREDICTION_CACHE_REDIS_URL", "redis://localhost:6379/0"),
+    # Réutilisation du score des quasi-doublons (dHash 64 bits, distance de Hamming maximale), sur option
+    "phash": os.environ.get("PREDICTION_CACHE_PHASH", "false").lower() in ("1", "true", "yes"),
+    "phash_distance": int(os.environ.get("PREDICTION_CACHE_PHASH_DISTANCE", 4)),
+}
+
+# Inférence fantôme d'un modèle candidat du registre (désactivée sans SHADOW_MODEL_VERSION)
+SHADOW_CONFIG = {
+    "model_version": os.environ.get("SHADOW_MODEL_VERSION") or None,
+    # Part des requêtes copiées vers le modèle candidat
+    "sample_rate": float(os.environ.get("SHADOW_SAMPLE_RATE", 0.1)),
+    # File bornée : au-delà, les copies sont abandonnées
+    "queue_size": int(os.environ.get("SHADOW_QUEUE_SIZE", 256)),
+    # Processus d'inférence dédié : priorité réduite (nice) et threads intra-op
+    "niceness": int(os.environ.get("SHADOW_NICENESS", 10)),
+    "intra_op_threads": int(os.environ.get("SHADOW_INTRA_OP_THREADS", 1)),
+}
+
+# Index des embeddings (sortie du pooling global) pour la recherche d'images similaires
+EMBEDDING_CONFIG = {
+    "enabled": os.environ.get("EMBEDDING_INDEX", "true").lower() in ("1", "true", "yes"),
+    # Persistance sur disque, relu en memmap au démarrage
+    "path": Path(os.environ.get("EMBEDDING_INDEX_DIR", DATA_DIR / "embeddings")),
+    # "exact" (recherche exhaustive) ou "ivf" (approchée, listes inversées)
+    "mode": os.environ.get("EMBEDDING_INDEX_MODE", "exact"),
+    "n_lists": int(os.environ.get("EMBEDDING_IVF_LISTS", 64)),
+    "n_probe": int(os.environ.get("EMBEDDING_IVF_PROBES", 8)),
+    # Similarité cosinus au-delà de laquelle une image est un quasi-doublon
+    "duplicate_threshold": float(os.environ.get("EMBEDDING_DUPLICATE_THRESHOLD", 0.98)),
+}
+
+# Journalisation des prédictions (ImageMetadata, PredictionLog, Feedback) écrite en différé, par lots
+METRICS_CONFIG = {
+    "write_behind": os.environ.get("METRICS_WRITE_BEHIND", "true").lower() in ("1", "true", "yes"),
+    "queue_size": int(os.environ.get("METRICS_QUEUE_SIZE", 10000)),
+    # Écriture dès flush_rows enregistrements en attente, ou flush_ms après le premier
+    "flush_rows": int(os.environ.get("METRICS_FLUSH_ROWS", 200)),
+    "flush_ms": float(os.environ.get("METRICS_FLUSH_MS", 500)),
+    # File pleine : "drop_new", "drop_oldest" ou "block" (attente jusqu'à block_ms puis abandon)
+    "overflow": os.environ.get("METRICS_QUEUE_OVERFLOW", "drop_new"),
+    "block_ms": float(os.environ.get("METRICS_BLOCK_MS", 100)),
 }
 
 # Configuration PostgreSQL
@@ -45,6 +159,21 @@ PG_CONFIG = {
     "database": os.environ.get("POSTGRES_DBNM"),
 }
 
+# Moteur SQLAlchemy : un seul par processus, connexions réutilisées par un pool
+DB_CONFIG = {
+    # URL SQLAlchemy complète (ex. sqlite:///data/cats_dogs.db), sinon PostgreSQL selon PG_CONFIG
+    "url": os.environ.get("DATABASE_URL") or None,
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+    # Connexions supplémentaires au-delà du pool lors des pointes, fermées au retour
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    # Vérification de la connexion avant usage, renouvellement après pool_recycle secondes
+    "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    # Journalisation de toutes les requêtes SQL sur la sortie standard
+    "echo": os.environ.get("DB_ECHO", "false").lower() in ("1", "true", "yes"),
+}
+
 # URLs de données
 DATA_URLS = {
     "kaggle_cats_dogs": "https://download.microsoft.com/download/3/E/1/3E1C3F21-ECDB-4869-8368-6DEBA77B919F/kagglecatsanddogs_5340.zip"
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Prétraitement et assemblage des lots sous charge soutenue : images et lots alloués vs décodage
+directement dans les lignes d'un tampon de lot préalloué"""
+
+import argparse
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG, INFERENCE_CONFIG
+from src.models.buffers import BufferPool
+from src.utils.benchmark import current_rss_mb, load_sample_images, print_table
+from src.utils.image import prepare_image
+
+
+def _decodes(data: bytes) -> bool:
+    try:
+        prepare_image(data, MODEL_CONFIG["image_size"])
+        return True
+    except Exception:
+        return False
+
+
+def run_load(samples: list, requests: int, threads: int, batch_size: int, pooled: bool) -> dict:
+    """Chaque thread décode des lots d'images et les assemble comme le batcher"""
+    shape = MODEL_CONFIG["image_size"] + (3,)
+    batch_pool = BufferPool(threads, (batch_size,) + shape) if pooled else None
+    per_thread = requests // threads
+
+    def worker(offset: int):
+        for start in range(0, per_thread, batch_size):
+            items = [samples[(offset + start + i) % len(samples)] for i in range(batch_size)]
+            if pooled:
+                # Comme le batcher : chaque image décodée dans sa ligne, aucun tableau intermédiaire
+                buffer = batch_pool.acquire()
+                for row, data in zip(buffer, items):
+                    prepare_image(data, MODEL_CONFIG["image_size"], out=row)
+                batch_pool.release(buffer)
+            else:
+                np.stack([prepare_image(data, MODEL_CONFIG["image_size"]) for data in items])
+
+    rss_before = current_rss_mb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = per_thread * threads
+    return {
+        "mode": "pool" if pooled else "alloc",
+        "requests": total,
+        "req/s": total / elapsed,
+        "peak_traced_kb": peak / 1024,
+        "rss_growth_kb/req": (current_rss_mb() - rss_before) * 1024 / total,
+        "pool_misses": batch_pool.misses if pooled else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=INFERENCE_CONFIG["max_concurrency"])
+    parser.add_argument("--batch-size", type=int, default=INFERENCE_CONFIG["max_batch_size"])
+    parser.add_argument("--samples", type=int, default=64)
+    args = parser.parse_args()
+
+    samples = [data for _, data, _ in load_sample_images(limit=args.samples, seed=0)]
+    samples = [data for data in samples if _decodes(data)]
+    if not samples:
+        sys.exit("Aucune image d'exemple")
+
+    # Un tour d'échauffement par mode, puis les mesures
+    rows = []
+    for pooled in (False, True):
+        run_load(samples, args.batch_size * args.threads, args.threads, args.batch_size, pooled)
+        rows.append(run_load(samples, args.requests, args.threads, args.batch_size, pooled))
+
+    print(f"\nCharge soutenue : {args.threads} threads, lots de {args.batch_size}\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
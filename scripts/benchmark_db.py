@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Débit d'insertion : moteur créé à chaque appel (avec ou sans journalisation SQL) vs moteur unique avec pool
+
+Les lignes ImageMetadata insérées (filename "benchmark") sont supprimées à la fin.
+Une autre base que PostgreSQL peut être mesurée avec --url (ex. sqlite:////tmp/bench.db).
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+
+def benchmark_row():
+    from src.database.models import ImageMetadata
+    return ImageMetadata(hash=f"bench-{uuid.uuid4().hex}", filename="benchmark", ext_type=".jpg",
+                         size_w=128, size_h=128, color_mode="RGB")
+
+
+def run_mode(rows: int, threads: int) -> list:
+    """Insertions unitaires par insert(), réparties sur des threads concurrents (latences en ms)"""
+    from src.database.db import insert
+
+    def timed_insert(_):
+        start = time.perf_counter()
+        insert(benchmark_row())
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(timed_insert, range(rows)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy (défaut : DATABASE_URL ou PG_CONFIG)")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    if args.url:
+        os.environ["DATABASE_URL"] = args.url
+
+    from sqlalchemy import delete
+    from sqlmodel import Session, create_engine
+    from src.database import db
+    from src.database.models import ImageMetadata
+    from src.utils.benchmark import print_table, summarize
+
+    db.create_tables()
+    modes = {
+        # Comportement d'origine : un moteur (et un pool) par appel, tout le SQL journalisé
+        "engine_per_call_echo": lambda: create_engine(db.db_url, echo=True),
+        "engine_per_call": lambda: create_engine(db.db_url, echo=False),
+        "pooled": None,
+    }
+
+    rows = []
+    for mode, factory in modes.items():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.ExitStack() as stack:
+            if factory is not None:
+                stack.enter_context(patch("src.database.db.make_engine", factory))
+            run_mode(min(20, args.rows), args.threads)
+            start = time.perf_counter()
+            timings = run_mode(args.rows, args.threads)
+            elapsed = time.perf_counter() - start
+        summary = summarize(timings)
+        rows.append({
+            "mode": mode,
+            "rows/s": args.rows / elapsed,
+            "p50_ms": summary["p50"],
+            "p99_ms": summary["p99"],
+        })
+
+    with Session(db.make_engine()) as session:
+        session.execute(delete(ImageMetadata).where(ImageMetadata.filename == "benchmark"))
+        session.commit()
+    db.dispose_engine()
+
+    print(f"\n{args.rows} insertions par mode, {args.threads} threads, {db.db_url.get_backend_name()}\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
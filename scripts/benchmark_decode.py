@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Chemin d'une requête par étape : ouvertures séparées de l'image vs une seule analyse partagée"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG, INFERENCE_CONFIG, UPLOAD_CONFIG
+from src.utils.benchmark import load_sample_images, summarize, print_table
+from src.utils.image import DecodedImage, analyze_image_content, check_upload, prepare_image
+
+STAGES = ("check", "metadata", "tensor")
+
+
+def run_separate(data: bytes, filename: str) -> list:
+    """Ancien chemin : chaque étape rouvre l'image à partir des octets"""
+    timings = []
+    start = time.perf_counter()
+    check_upload(data, **UPLOAD_CONFIG)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    analyze_image_content(data, filename)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    prepare_image(data, MODEL_CONFIG["image_size"], draft=INFERENCE_CONFIG["jpeg_draft"])
+    timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_shared(data: bytes, filename: str) -> list:
+    """Nouveau chemin : l'en-tête est analysé une fois et partagé par les trois étapes"""
+    timings = []
+    start = time.perf_counter()
+    decoded = DecodedImage(data, filename)
+    decoded.check(**UPLOAD_CONFIG)
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    decoded.metadata()
+    timings.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    decoded.to_array(MODEL_CONFIG["image_size"], draft=INFERENCE_CONFIG["jpeg_draft"])
+    timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = []
+    for path, data, _ in load_sample_images(limit=args.samples, seed=0):
+        try:
+            run_separate(data, path.name)
+            samples.append((data, path.name))
+        except Exception:
+            continue
+    if not samples:
+        sys.exit("Aucune image d'exemple")
+
+    rows = []
+    for mode, run in (("separate", run_separate), ("shared", run_shared)):
+        timings = [run(data, filename) for _ in range(args.repeat) for data, filename in samples]
+        row = {"mode": mode}
+        for i, stage in enumerate(STAGES):
+            row[f"{stage}_p50_ms"] = summarize([t[i] * 1000 for t in timings])["p50"]
+        total = summarize([sum(t) * 1000 for t in timings])
+        row.update({"total_p50_ms": total["p50"], "total_p99_ms": total["p99"]})
+        rows.append(row)
+
+    print(f"\n{len(samples)} images PetImages, latence par étape (ms)\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
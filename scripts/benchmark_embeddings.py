@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Index des embeddings : latence de recherche et rappel de l'index IVF par rapport à la recherche exacte"""
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import EMBEDDING_CONFIG
+from src.models.embeddings import EmbeddingIndex
+from src.models.predictor import CatDogPredictor
+from src.utils.benchmark import load_sample_images, measure, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=EMBEDDING_CONFIG["n_lists"])
+    parser.add_argument("--n-probe", type=int, default=EMBEDDING_CONFIG["n_probe"])
+    args = parser.parse_args()
+
+    predictor = CatDogPredictor()
+    if not predictor.is_loaded():
+        sys.exit("Modèle non disponible")
+
+    images = []
+    for _, data, _ in load_sample_images(limit=args.samples, seed=0):
+        try:
+            images.append(predictor.preprocess_image(data)[0])
+        except Exception:
+            continue
+    embeddings = np.concatenate([
+        predictor.embed_batch(np.stack(images[i:i + 64])) for i in range(0, len(images), 64)
+    ])
+    queries = embeddings[::max(1, len(embeddings) // args.queries)][:args.queries]
+
+    exact = EmbeddingIndex()
+    ivf = EmbeddingIndex(mode="ivf", n_lists=args.n_lists, n_probe=args.n_probe)
+    for i, embedding in enumerate(embeddings):
+        exact.add(str(i), embedding)
+        ivf.add(str(i), embedding)
+    ivf.train()
+
+    truth = [{key for key, _ in exact.search(query, k=args.k)} for query in queries]
+    rows = []
+    for mode, index in (("exact", exact), ("ivf", ivf)):
+        found = [{key for key, _ in index.search(query, k=args.k)} for query in queries]
+        timings = measure(lambda: [index.search(query, k=args.k) for query in queries], repeat=20)
+        rows.append({
+            "mode": mode,
+            "p50_ms/query": timings["p50"] / len(queries),
+            f"recall@{args.k}": float(np.mean([len(f & t) / args.k for f, t in zip(found, truth)])),
+        })
+
+    print(f"\n{len(embeddings)} embeddings de dimension {exact.dim}, {len(queries)} requêtes\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
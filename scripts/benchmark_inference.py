@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Benchmark de latence : model.predict vs fonctions compilées par taille de lot"""
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.predictor import CatDogPredictor
+from src.utils.benchmark import measure, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-sizes", default="1,3,8,16")
+    args = parser.parse_args()
+    
+    predictor = CatDogPredictor()
+    if not predictor.is_loaded():
+        sys.exit("Modèle non disponible")
+    
+    rng = np.random.default_rng(0)
+    rows = []
+    for size in (int(s) for s in args.batch_sizes.split(",")):
+        images = rng.integers(0, 256, (size,) + predictor.image_size + (3,), dtype=np.uint8)
+        
+        before = measure(lambda: predictor.model.predict(images, verbose=0), repeat=args.repeat)
+        after = measure(lambda: predictor.predict_batch(images), repeat=args.repeat)
+        rows.append({
+            "batch": size,
+            "predict p50": before["p50"],
+            "predict p99": before["p99"],
+            "compiled p50": after["p50"],
+            "compiled p99": after["p99"],
+            "speed-up": before["p50"] / after["p50"],
+        })
+    
+    print(f"\nLatence par appel (ms), buckets compilés: {predictor.batch_buckets}\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Quasi-doublons : taux de réutilisation des copies redimensionnées/réencodées et faux positifs selon la distance"""
+
+import argparse
+import hashlib
+import sys
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG, INFERENCE_CONFIG
+from src.models.cache import NearDuplicateCache, hamming
+from src.utils.benchmark import load_sample_images, measure, print_table
+from src.utils.image import DecodedImage
+
+
+def variants(data: bytes) -> list:
+    """Copies d'une image telles que réenvoyées par les clients : réduite, réencodée"""
+    image = Image.open(BytesIO(data)).convert("RGB")
+    copies = []
+    for scale, quality in ((0.5, 85), (1.0, 60), (0.75, 75)):
+        buffer = BytesIO()
+        image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale)))).save(
+            buffer, format="JPEG", quality=quality
+        )
+        copies.append(buffer.getvalue())
+    return copies
+
+
+def phash(data: bytes) -> int:
+    """Hash perceptuel calculé comme dans l'API, sur la miniature du modèle"""
+    decoded = DecodedImage(data)
+    decoded.to_array(MODEL_CONFIG["image_size"], draft=INFERENCE_CONFIG["jpeg_draft"])
+    return decoded.dhash()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--max-distance", type=int, default=10)
+    args = parser.parse_args()
+
+    originals, copies = [], []
+    for _, data, _ in load_sample_images(limit=args.samples, seed=0):
+        try:
+            originals.append((hashlib.md5(data).hexdigest(), phash(data)))
+            copies.append([(hashlib.md5(copy).hexdigest(), phash(copy)) for copy in variants(data)])
+        except Exception:
+            continue
+    if not originals:
+        sys.exit("Aucune image d'exemple")
+
+    md5s = {md5 for md5, _ in originals}
+    rows = [{
+        "max_distance": "md5",
+        "copy_hit_rate": float(np.mean([md5 in md5s for group in copies for md5, _ in group])),
+        "false_match_rate": 0.0,
+    }]
+    for max_distance in range(args.max_distance + 1):
+        # Le cache ne contient que les originaux : une copie servie par le cache est un vrai quasi-doublon
+        cache = NearDuplicateCache(max_distance=max_distance, max_entries=len(originals) + 1)
+        for i, (_, value) in enumerate(originals):
+            cache.set(value, "bench", i)
+        hits = [cache.get(value, "bench") == i for i, group in enumerate(copies) for _, value in group]
+        # Faux positif : une autre image du jeu de données à distance <= max_distance
+        false_matches = [
+            any(hamming(value, other) <= max_distance for j, (_, other) in enumerate(originals) if j != i)
+            for i, (_, value) in enumerate(originals)
+        ]
+        rows.append({
+            "max_distance": max_distance,
+            "copy_hit_rate": float(np.mean(hits)),
+            "false_match_rate": float(np.mean(false_matches)),
+        })
+
+    _, data, _ = load_sample_images(limit=1, seed=0)[0]
+    decoded = DecodedImage(data)
+    decoded.to_array(MODEL_CONFIG["image_size"])
+    timing = measure(decoded.dhash, repeat=1000)
+
+    print(f"\n{len(originals)} images, {sum(len(group) for group in copies)} copies "
+          f"(dHash sur la miniature : {timing['p50'] * 1000:.1f} µs p50)\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Décodage JPEG complet vs réduit (draft) : latence de prétraitement et écart de précision"""
+
+import argparse
+import sys
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG
+from src.data.preprocessing import setup_data_directory
+from src.utils.benchmark import load_sample_images, measure, print_table
+from src.utils.image import prepare_image
+
+
+def upscale_jpeg(data: bytes, size: tuple) -> bytes:
+    """Ré-encodage d'une image d'exemple à la taille d'une photo de téléphone"""
+    buffer = BytesIO()
+    Image.open(BytesIO(data)).convert("RGB").resize(size).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def decode_pairs(samples: list):
+    """Prétraitement complet et réduit des échantillons, les fichiers illisibles sont ignorés"""
+    full, draft, labels = [], [], []
+    for _, data, label in samples:
+        try:
+            pair = [prepare_image(data, MODEL_CONFIG["image_size"], draft=mode) for mode in (False, True)]
+        except Exception:
+            continue
+        full.append(pair[0])
+        draft.append(pair[1])
+        labels.append(label)
+    return np.stack(full), np.stack(draft), np.array(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--eval-samples", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--photo-size", default="4000x3000", help="Taille de l'image synthétique (LxH)")
+    args = parser.parse_args()
+
+    samples = load_sample_images(limit=args.eval_samples, data_path=setup_data_directory(), seed=0)
+    photo = upscale_jpeg(samples[0][1], tuple(int(v) for v in args.photo_size.split("x")))
+
+    # Latence de prétraitement par image
+    rows = []
+    for name, data in (("sample", samples[0][1]), (args.photo_size, photo)):
+        full = measure(lambda: prepare_image(data, MODEL_CONFIG["image_size"], draft=False), repeat=args.repeat)
+        draft = measure(lambda: prepare_image(data, MODEL_CONFIG["image_size"], draft=True), repeat=args.repeat)
+        rows.append({
+            "image": name,
+            "full p50": full["p50"],
+            "draft p50": draft["p50"],
+            "speed-up": full["p50"] / draft["p50"],
+        })
+    print("\nLatence de prétraitement (ms)\n")
+    print_table(rows, list(rows[0].keys()))
+
+    # Écart de précision sur le jeu d'évaluation
+    from src.models.predictor import CatDogPredictor
+
+    predictor = CatDogPredictor()
+    if not predictor.is_loaded():
+        sys.exit("Modèle non disponible")
+
+    full_images, draft_images, labels = decode_pairs(samples)
+    reference = predictor.predict_batch(full_images)
+    scores = predictor.predict_batch(draft_images)
+
+    accuracy = float(((scores > 0.5) == labels).mean())
+    reference_accuracy = float(((reference > 0.5) == labels).mean())
+    rows = [{
+        "accuracy_full": reference_accuracy,
+        "accuracy_draft": accuracy,
+        "acc_delta": accuracy - reference_accuracy,
+        "agreement": float(((scores > 0.5) == (reference > 0.5)).mean()),
+        "mean_score_diff": float(np.abs(scores - reference).mean()),
+        "max_score_diff": float(np.abs(scores - reference).max()),
+        "mean_pixel_diff": float(np.abs(draft_images.astype(np.int16) - full_images).mean()),
+    }]
+    print(f"\nÉvaluation sur {len(labels)} images\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Images déjà décodées : JPEG en multipart vs pixels bruts (octet-stream), latence de bout en bout
+
+À lancer contre une API démarrée avec PREDICTION_CACHE=false (sinon les images répétées sont servies par le cache).
+"""
+
+import argparse
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+import requests
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import API_CONFIG, MODEL_CONFIG
+from src.utils.benchmark import load_sample_images, print_table, summarize
+from src.utils.image import prepare_image
+
+
+def post_jpeg(session, url: str, frame: np.ndarray):
+    """Côté client : réencodage de l'image décodée, puis envoi en multipart"""
+    buffer = BytesIO()
+    Image.fromarray(frame).save(buffer, format="JPEG", quality=95)
+    return session.post(f"{url}/api/predict", files={"file": ("frame.jpg", buffer.getvalue(), "image/jpeg")})
+
+
+def post_raw(session, url: str, frames: np.ndarray):
+    """Pixels envoyés tels quels, forme dans l'en-tête"""
+    return session.post(
+        f"{url}/api/predict/raw",
+        data=frames.tobytes(),
+        headers={"Content-Type": "application/octet-stream", "X-Tensor-Shape": ",".join(map(str, frames.shape))},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=f"http://{API_CONFIG['host']}:{API_CONFIG['port']}")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    frames = []
+    for _, data, _ in load_sample_images(limit=64, seed=0):
+        try:
+            frames.append(prepare_image(data, MODEL_CONFIG["image_size"]))
+        except Exception:
+            continue
+    if not frames:
+        sys.exit("Aucune image d'exemple")
+    frames = np.stack(frames)
+
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bearer {API_CONFIG['token']}"
+    modes = {
+        "multipart_jpeg": (1, lambda i: post_jpeg(session, args.url, frames[i % len(frames)])),
+        "raw": (1, lambda i: post_raw(session, args.url, frames[i % len(frames)])),
+        f"raw_batch{args.batch_size}": (args.batch_size, lambda i: post_raw(
+            session, args.url, frames[np.arange(i, i + args.batch_size) % len(frames)]
+        )),
+    }
+
+    rows = []
+    for mode, (images_per_request, send) in modes.items():
+        send(0).raise_for_status()
+        timings = []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            send(i).raise_for_status()
+            timings.append((time.perf_counter() - start) * 1000)
+        summary = summarize(timings)
+        rows.append({
+            "mode": mode,
+            "p50_ms": summary["p50"],
+            "p99_ms": summary["p99"],
+            "ms/image": summary["mean"] / images_per_request,
+        })
+
+    print(f"\n{args.requests} requêtes par mode sur {args.url}\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Démarrage à froid de l'API : délai avant /health, avant /ready et avant la première prédiction"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+import requests
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import API_CONFIG
+from src.utils.benchmark import load_sample_images, print_table, summarize
+
+
+def wait_for(url: str, deadline: float, interval: float = 0.05) -> float:
+    """Attente d'une réponse 200, retourne l'instant de la réponse"""
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except requests.RequestException:
+            pass
+        time.sleep(interval)
+    raise TimeoutError(f"Pas de réponse de {url}")
+
+
+def cold_start(port: int, images: list, timeout: float) -> dict:
+    """Lancement d'un serveur neuf et chronologie jusqu'à la première prédiction
+
+    Deux images distinctes, caches désactivés : la seconde requête mesure une vraie inférence
+    à chaud et non un succès du cache.
+    """
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "PREDICTION_CACHE": "false", "PREDICTION_CACHE_PHASH": "false"}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        health = wait_for(f"{base_url}/health", deadline)
+        ready = wait_for(f"{base_url}/ready", deadline)
+
+        headers = {"Authorization": f"Bearer {API_CONFIG['token']}"}
+        latencies = []
+        for name, data in images:
+            before = time.perf_counter()
+            response = requests.post(f"{base_url}/api/predict", headers=headers,
+                                     files={"file": (name, data, "image/jpeg")}, timeout=timeout)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - before) * 1000)
+
+        return {
+            "health_ms": (health - start) * 1000,
+            "ready_ms": (ready - start) * 1000,
+            "first_prediction_ms": (ready - start) * 1000 + latencies[0],
+            "first_latency_ms": latencies[0],
+            "second_latency_ms": latencies[1],
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    samples = load_sample_images(limit=2)
+    if len(samples) < 2:
+        sys.exit("Deux images d'exemple sont nécessaires")
+    images = [(path.name, data) for path, data, _ in samples]
+
+    runs = [cold_start(args.port, images, args.timeout) for _ in range(args.runs)]
+    rows = [
+        {"étape": key, **{k: v for k, v in summarize([run[key] for run in runs]).items() if k != "n"}}
+        for key in runs[0]
+    ]
+
+    print(f"\nDémarrage à froid (ms), {args.runs} lancements\n")
+    print_table(rows, ["étape", "mean", "p50", "p99"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Balayage des réglages par processus (backend, nombre de processus, threads intra-op, épinglage CPU) : débit et p99"""
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG
+from src.utils.benchmark import load_sample_images, print_table, summarize
+from src.utils.image import prepare_image
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",")]
+
+
+def run_process(index: int, setting: dict, images: np.ndarray, duration: float, barrier, results):
+    """Un processus serveur : réglages appliqués avant le chargement, puis inférence en boucle"""
+    from src.models.runtime import configure_process
+    applied = configure_process(setting["intra"], setting["inter"], "auto" if setting["pin"] else "",
+                                index=index, count=setting["processes"])
+
+    from src.models.predictor import CatDogPredictor
+    predictor = CatDogPredictor(load=False)
+    predictor.backend_name = setting["backend"]
+    # Même nombre de threads intra-op pour TensorFlow et pour les interpréteurs TFLite
+    predictor.intra_op_threads = applied["intra_op_threads"]
+    predictor.load_model()
+    batch = images[:setting["batch_size"]]
+    for _ in range(5):
+        predictor.predict_batch(batch)
+
+    # Tous les processus mesurent en même temps, comme des workers concurrents sur la machine
+    barrier.wait()
+    timings = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        predictor.predict_batch(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    results.put((applied, timings))
+
+
+def run_setting(setting: dict, images: np.ndarray, duration: float) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(setting["processes"])
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_process, args=(i, setting, images, duration, barrier, results))
+        for i in range(setting["processes"])
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    timings = [t for _, process_timings in reports for t in process_timings]
+    summary = summarize(timings)
+    return {
+        **setting,
+        "threads/proc": reports[0][0]["intra_op_threads"] or "défaut",
+        "images/s": len(timings) * setting["batch_size"] / duration,
+        "p50_ms": summary["p50"],
+        "p99_ms": summary["p99"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", type=lambda value: value.split(","), default=["keras", "tflite"])
+    parser.add_argument("--processes", type=int_list, default=[1, 2, 4])
+    parser.add_argument("--intra", type=int_list, default=[0, 1, 2],
+                        help="Threads intra-op par processus (0 = défaut TF/TFLite, ou un par CPU attribué si épinglé)")
+    parser.add_argument("--inter", type=int_list, default=[0, 1])
+    parser.add_argument("--pin", type=int_list, default=[0, 1], help="Épinglage CPU (0/1)")
+    parser.add_argument("--batch-size", type=int_list, default=[1, 16])
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    images = []
+    for _, data, _ in load_sample_images(limit=64, seed=0):
+        try:
+            images.append(prepare_image(data, MODEL_CONFIG["image_size"]))
+        except Exception:
+            continue
+    if not images:
+        sys.exit("Aucune image d'exemple")
+    images = np.stack(images)
+
+    # Backends sans modèle exporté ignorés (TFLite : scripts/export_model.py)
+    from src.models.predictor import CatDogPredictor
+    backends = []
+    for backend in args.backend:
+        probe = CatDogPredictor(load=False)
+        probe.backend_name = backend
+        if probe.model_path is None or not probe.model_path.exists():
+            print(f"Backend {backend} ignoré : modèle introuvable")
+            continue
+        backends.append(backend)
+    if not backends:
+        sys.exit("Aucun modèle disponible")
+
+    rows = []
+    for backend, processes, intra, inter, pin, batch_size in itertools.product(
+        backends, args.processes, args.intra, args.inter, args.pin, args.batch_size
+    ):
+        setting = {"backend": backend, "processes": processes, "intra": intra, "inter": inter, "pin": bool(pin),
+                   "batch_size": batch_size}
+        rows.append(run_setting(setting, images, args.duration))
+        print(f"{setting} -> {rows[-1]['images/s']:.1f} images/s, p99 {rows[-1]['p99_ms']:.1f} ms")
+
+    print(f"\n{os.cpu_count()} CPU, {args.duration:.0f} s par réglage\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
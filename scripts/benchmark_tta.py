@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Augmentation au moment du test : surcoût de latence et gain de précision par rapport au chemin standard"""
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.data.preprocessing import setup_data_directory
+from src.models.predictor import CatDogPredictor
+from src.utils.benchmark import load_sample_images, measure, print_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--eval-samples", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    predictor = CatDogPredictor()
+    if not predictor.is_loaded():
+        sys.exit("Modèle non disponible")
+
+    samples = load_sample_images(limit=args.eval_samples, data_path=setup_data_directory(), seed=0)
+    plain_scores, tta_scores, labels = [], [], []
+    for _, data, label in samples:
+        try:
+            views = predictor.preprocess_tta(data)
+            image = predictor.preprocess_image(data)
+        except Exception:
+            continue
+        plain_scores.append(predictor.predict_batch(image)[0])
+        tta_scores.append(predictor.predict_batch(views).mean())
+        labels.append(label)
+    labels = np.array(labels)
+
+    # Latence par requête : décodage + inférence (un lot de 1 vs un lot de 4 vues)
+    _, data, _ = samples[0]
+    plain = measure(lambda: predictor.predict_batch(predictor.preprocess_image(data)), repeat=args.repeat)
+    tta = measure(lambda: predictor.predict_batch(predictor.preprocess_tta(data)), repeat=args.repeat)
+
+    rows = []
+    for mode, timings, scores in (("standard", plain, plain_scores), ("tta", tta, tta_scores)):
+        rows.append({
+            "mode": mode,
+            "p50_ms": timings["p50"],
+            "p99_ms": timings["p99"],
+            "overhead": timings["p50"] / plain["p50"],
+            "accuracy": float(((np.array(scores) > 0.5) == labels).mean()),
+        })
+
+    print(f"\nÉvaluation sur {len(labels)} images, latence par requête (ms)\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Export TFLite (float32 / float16 / int8) et comparaison avec le modèle Keras, poids float32 ou demi-précision"""
+
+import argparse
+import multiprocessing
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import MODEL_CONFIG, API_CONFIG, INFERENCE_CONFIG
+from src.utils.benchmark import print_table
+
+
+def profile_backend(name: str, model_path: Path, images: np.ndarray, repeat: int, weights_dtype: str) -> dict:
+    """Chargement et mesure d'un backend dans un processus dédié (mémoire isolée)"""
+    from src.models.backends import load_backend
+    from src.utils.benchmark import current_rss_mb, measure
+
+    rss_before = current_rss_mb()
+    backend = load_backend(name, model_path, MODEL_CONFIG["image_size"], INFERENCE_CONFIG["batch_buckets"],
+                           weights_dtype=weights_dtype)
+    rss_loaded = current_rss_mb()
+
+    scores = backend.predict(images)
+    max_batch = images[:INFERENCE_CONFIG["max_batch_size"]]
+    return {
+        "scores": scores,
+        "weights_kb": backend.weights_bytes() / 1024,
+        "load_rss_mb": rss_loaded - rss_before,
+        "peak_rss_mb": current_rss_mb() - rss_before,
+        "p50_b1_ms": measure(lambda: backend.predict(images[:1]), repeat=repeat)["p50"],
+        f"p50_b{len(max_batch)}_ms": measure(lambda: backend.predict(max_batch), repeat=repeat)["p50"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quantize", action="store_true", help="Exporter aussi une variante int8")
+    parser.add_argument("--half", action="store_true",
+                        help="Comparer aussi les poids float16/bfloat16 (Keras) et un export TFLite float16")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--eval-samples", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    from src.models.exporter import CatDogExporter
+
+    exporter = CatDogExporter()
+    variants = [("keras", "keras", API_CONFIG["model_path"], "float32")]
+    if args.half:
+        variants.append(("keras_float16", "keras", API_CONFIG["model_path"], "float16"))
+        variants.append(("keras_bfloat16", "keras", API_CONFIG["model_path"], "bfloat16"))
+    variants.append(("tflite", "tflite", exporter.export_tflite(), "float32"))
+    if args.half:
+        variants.append(("tflite_fp16", "tflite", exporter.export_tflite(float16=True), "float32"))
+    if args.quantize:
+        variants.append(("tflite_int8", "tflite", exporter.export_tflite(
+            quantize=True, num_calibration=args.calibration_samples
+        ), "float32"))
+
+    # Jeu d'évaluation disjoint de l'échantillon de calibration (tranche suivante du même mélange)
+    images, labels = exporter.evaluation_images(args.eval_samples, num_calibration=args.calibration_samples)
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    reference = None
+    for variant, backend_name, model_path, weights_dtype in variants:
+        with context.Pool(1) as pool:
+            result = pool.apply(profile_backend, (backend_name, model_path, images, args.repeat, weights_dtype))
+
+        scores = result.pop("scores")
+        reference = scores if reference is None else reference
+        accuracy = float(((scores > 0.5) == labels).mean())
+        rows.append({
+            "variant": variant,
+            "size_kb": model_path.stat().st_size / 1024,
+            "accuracy": accuracy,
+            "acc_delta": accuracy - float(((reference > 0.5) == labels).mean()),
+            "agreement": float(((scores > 0.5) == (reference > 0.5)).mean()),
+            "max_score_diff": float(np.abs(scores - reference).max()),
+            **result,
+        })
+
+    print(f"\nÉvaluation sur {len(labels)} images\n")
+    print_table(rows, list(rows[0].keys()))
+
+
+if __name__ == "__main__":
+    main()
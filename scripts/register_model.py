@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Enregistrement d'un modèle dans le registre versionné (rechargement à chaud via /api/admin/models/reload)"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from config.settings import API_CONFIG
+from src.models.registry import ModelRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("version", help="Version à enregistrer (ex. 1.1.0)")
+    parser.add_argument("--backend", default=API_CONFIG["model_backend"], choices=list(API_CONFIG["model_paths"]))
+    parser.add_argument("--artifact", type=Path, help="Artefact à enregistrer (défaut : modèle du backend)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(
+        API_CONFIG["registry_dir"],
+        {name: path.name for name, path in API_CONFIG["model_paths"].items()},
+    )
+    artifact = args.artifact or API_CONFIG["model_paths"][args.backend]
+    if not artifact.exists():
+        sys.exit(f"Artefact non trouvé: {artifact}")
+
+    target = registry.register(artifact, args.version, args.backend)
+    print(f"Modèle enregistré ({args.backend}, version {args.version}): {target}")
+    print(f"Versions disponibles: {', '.join(registry.versions(args.backend))}")
+
+
+if __name__ == "__main__":
+    main()
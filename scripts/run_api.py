@@ -20,5 +20,6 @@ if __name__ == "__main__":
         "src.api.main:app",
         host=API_CONFIG["host"],
         port=API_CONFIG["port"],
+        workers=API_CONFIG["workers"],
         reload=False  # En production Docker
     )
\ No newline at end of file
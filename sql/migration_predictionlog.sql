@@ -0,0 +1,8 @@
+-- Mise à niveau d'une table predictionlog créée avant l'ajout du cache et de l'inférence fantôme
+-- (les nouvelles bases créées par schema.sql ou make create-tables ont déjà ces colonnes)
+
+ALTER TABLE predictionlog ADD COLUMN IF NOT EXISTS cache_hit bool NOT NULL DEFAULT false;
+
+ALTER TABLE predictionlog ADD COLUMN IF NOT EXISTS shadow_prob_dog float8 NULL;
+
+ALTER TABLE predictionlog ADD COLUMN IF NOT EXISTS shadow_model_version varchar NULL;
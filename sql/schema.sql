@@ -16,6 +16,9 @@ CREATE TABLE predictionlog (
 	inference_time_ms float8 NOT NULL,
 	success bool NOT NULL,
 	model_version varchar NOT NULL,
+	cache_hit bool NOT NULL DEFAULT false,
+	shadow_prob_dog float8 NULL,
+	shadow_model_version varchar NULL,
 	image_id varchar NOT NULL,
 	CONSTRAINT predictionlog_pkey PRIMARY KEY (uuid),
 	CONSTRAINT predictionlog_image_id_fkey FOREIGN KEY (image_id) REFERENCES imagemetadata(hash)
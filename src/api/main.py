@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 import sys
@@ -7,12 +8,21 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from .routes import router
+from .routes import router, start_inference, shutdown_inference
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Chargement du modèle en arrière-plan : le serveur accepte les connexions immédiatement
+    start_inference()
+    yield
+    # Arrêt des pools d'inférence
+    shutdown_inference()
 
 app = FastAPI(
     title="Cats vs Dogs Classifier",
     description="API de classification d'images chats vs chiens avec interface web",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Ajouter les routes
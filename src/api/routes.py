@@ -1,11 +1,17 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Request, Form
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, HTTPException, Depends, Request, Form
+from typing import List
 from pydantic import BaseModel, Field
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+import asyncio
+import json
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 import time
-from src.database.db import insert_feedback, update_feedback, insert_prediction
+import numpy as np
+from src.database.db import insert_feedback, update_feedback, insert_prediction, update_shadow_predictions, dispose_engine
 #from src.database.models import Prediction
 from src.utils.task_id import generate_task_id
 from sqlmodel import Session
@@ -20,8 +26,19 @@ ROOT_DIR = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
 from .auth import verify_token
+from config.settings import TEMP_DIR, API_CONFIG, INFERENCE_CONFIG, CACHE_CONFIG, SHADOW_CONFIG, UPLOAD_CONFIG, EMBEDDING_CONFIG
 from src.models.predictor import CatDogPredictor
-from src.monitoring.metrics import log_metrics
+from src.models.batcher import MicroBatcher
+from src.models.executor import InferenceExecutor
+from src.models.workers import InferenceWorkerPool
+from src.models.cache import make_cache, make_near_duplicate_cache
+from src.models.shadow import ShadowRunner
+from src.models.buffers import BufferPool
+from src.models.embeddings import make_index
+from src.models.runtime import pin_cpus, runtime_info
+from src.monitoring.metrics import log_metrics, record_predictions, metrics_writer, describe_upload, describe_tensor
+from src.utils.archive import iter_archive_images, next_chunk
+from src.utils.image import DecodedImage, ImageRejected
 
 # Configuration des templates
 TEMPLATES_DIR = ROOT_DIR / "src" / "web" / "templates"
@@ -29,15 +46,211 @@ templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 router = APIRouter()
 
-# Initialisation du prédicteur
-predictor = CatDogPredictor()
+# Pool borné pour le décodage et l'inférence (la boucle asyncio reste disponible)
+executor = InferenceExecutor(max_workers=INFERENCE_CONFIG["max_concurrency"])
+
+# Initialisation du prédicteur : dans le processus de l'API ou dans des processus dédiés.
+# Le modèle (ou le pool de processus) est chargé au démarrage (start_inference), sans bloquer
+# l'import ni /health : importer ce module ne lance aucun processus.
+predictor = CatDogPredictor(load=False)
+use_workers = INFERENCE_CONFIG["workers"] > 0
+# Remplacé par le pool de processus dans start_inference
+engine = predictor
+if use_workers:
+    # Un lot en vol par processus, les threads ne font qu'attendre la réponse
+    dispatch_executor = InferenceExecutor(max_workers=INFERENCE_CONFIG["workers"])
+else:
+    dispatch_executor = executor
+
+# Tampons de lot préalloués, un par lot en vol : chaque image est décodée directement dans sa ligne
+# et le lot y est complété jusqu'à la taille compilée. Avec les processus d'inférence, predict_batch
+# ne rend la main qu'une fois le résultat reçu, donc après l'envoi du lot : le tampon peut être réutilisé.
+image_shape = predictor.image_size + (3,)
+batch_pool = BufferPool(
+    dispatch_executor.max_workers, (INFERENCE_CONFIG["max_batch_size"],) + image_shape
+)
+# Vues d'augmentation (TTA) : un tampon (4, H, W, C) par lot en vol
+tta_pool = BufferPool(dispatch_executor.max_workers, (4,) + image_shape)
+
+def predict_engine_batch(images: np.ndarray):
+    """Inférence d'un lot par le moteur courant (prédicteur local ou pool de processus), avec la version"""
+    return engine.predict_batch(images, with_version=True)
+
+# Regroupement des requêtes concurrentes en lots d'inférence
+batcher = MicroBatcher(
+    predict_engine_batch,
+    max_batch_size=INFERENCE_CONFIG["max_batch_size"],
+    max_wait_ms=INFERENCE_CONFIG["max_wait_ms"],
+    executor=dispatch_executor,
+    buffer_pool=batch_pool,
+    with_version=True,
+    # Décodage des images dans les lignes du tampon, en parallèle sur les threads de prétraitement
+    fill_fn=predictor.preprocess_into,
+    fill_executor=executor,
+    batch_buckets=INFERENCE_CONFIG["batch_buckets"],
+)
+
+# Cache des scores : les images déjà vues ne repassent pas par le modèle
+prediction_cache = make_cache(CACHE_CONFIG)
+# Images redimensionnées ou réencodées : score réutilisé à distance de Hamming bornée du hash perceptuel
+near_duplicates = make_near_duplicate_cache(CACHE_CONFIG)
+
+# Index des embeddings : images similaires et quasi-doublons sans base vectorielle externe
+embedding_index = make_index(EMBEDDING_CONFIG)
+
+def write_shadow_predictions(rows: list):
+    """Scores fantômes, écrits après les lignes PredictionLog encore en file d'écriture différée"""
+    if metrics_writer is not None:
+        metrics_writer.flush()
+    return update_shadow_predictions(rows)
+
+# Modèle candidat évalué sur une copie échantillonnée du trafic, après l'envoi des réponses
+shadow = None
+if SHADOW_CONFIG["model_version"]:
+    shadow = ShadowRunner(
+        # Processus d'inférence dédié, de priorité réduite : le candidat ne prend que le CPU laissé libre
+        lambda: InferenceWorkerPool(
+            num_workers=1,
+            intra_op_threads=SHADOW_CONFIG["intra_op_threads"],
+            version=SHADOW_CONFIG["model_version"],
+            niceness=SHADOW_CONFIG["niceness"],
+        ),
+        write_fn=write_shadow_predictions,
+        sample_rate=SHADOW_CONFIG["sample_rate"],
+        queue_size=SHADOW_CONFIG["queue_size"],
+        batch_size=INFERENCE_CONFIG["max_batch_size"],
+        # Abandon des copies dès que des requêtes attendent un thread d'inférence
+        is_busy=lambda: any(pool.get_stats()["waiting"] > 0 for pool in (executor, dispatch_executor)),
+    )
+
+def start_inference():
+    """Chargement et préchauffage du modèle en arrière-plan (lancement des processus d'inférence)"""
+    global engine
+    # Épinglage CPU avant le lancement des processus d'inférence, qui se partagent les CPU hérités.
+    # Chaque worker uvicorn réserve sa part par un verrou de fichier.
+    if INFERENCE_CONFIG["cpu_affinity"]:
+        pin_cpus(INFERENCE_CONFIG["cpu_affinity"], count=API_CONFIG["workers"], lock_dir=TEMP_DIR / "cpu-slots")
+    if use_workers:
+        if engine is predictor:
+            engine = InferenceWorkerPool(
+                num_workers=INFERENCE_CONFIG["workers"],
+                intra_op_threads=INFERENCE_CONFIG["intra_op_threads"],
+                inter_op_threads=INFERENCE_CONFIG["inter_op_threads"],
+                version=API_CONFIG["model_version"],
+                cpu_affinity=bool(INFERENCE_CONFIG["cpu_affinity"]),
+            )
+    else:
+        predictor.load_in_background()
+    if shadow is not None:
+        shadow.start()
+
+def shutdown_inference():
+    """Arrêt des pools d'inférence, vidage des journaux en attente et fermeture des connexions"""
+    if shadow is not None:
+        shadow.shutdown()
+    if embedding_index is not None and len(embedding_index):
+        embedding_index.save(EMBEDDING_CONFIG["path"])
+    if engine is not predictor:
+        engine.shutdown()
+    if use_workers:
+        dispatch_executor.shutdown()
+    executor.shutdown()
+    if metrics_writer is not None:
+        metrics_writer.shutdown()
+    dispose_engine()
+
+def cache_version(model_version: str, tta: bool = False) -> str:
+    """Clé de version du cache : les scores dépendent de la version, du backend et de l'augmentation"""
+    return f"{model_version}-{predictor.backend_name}" + ("-tta" if tta else "")
+
+async def score_image(image: DecodedImage, image_hash: str = None, tta: bool = False,
+                      shadow_input: np.ndarray = None):
+    """Score brut d'une image déjà analysée (cache puis regroupement), retourne (score, servi par le cache, version)
+
+    shadow_input : tableau (H, W, C) qui reçoit l'entrée du modèle, si l'image passe dans un lot (pas servie par un cache).
+    """
+    model_version = engine.model_version
+    if prediction_cache is not None and image_hash:
+        score = await prediction_cache.get_async(image_hash, cache_version(model_version, tta))
+        if score is not None:
+            return score, True, model_version
+
+    phash, score, reused = None, None, False
+    if tta:
+        # Toutes les vues augmentées passent dans le modèle en un seul lot, écrites dans un tampon du pool
+        views = tta_pool.acquire()
+        try:
+            await executor.run(predictor.preprocess_tta, image, views)
+            # Hash perceptuel calculé sur la miniature déjà décodée
+            if near_duplicates is not None:
+                phash = image.dhash()
+                score = near_duplicates.get(phash, cache_version(model_version, tta))
+            if score is None:
+                scores, model_version = await dispatch_executor.run(engine.predict_batch, views, with_version=True)
+                score = float(scores.mean())
+            else:
+                reused = True
+        finally:
+            tta_pool.release(views)
+    else:
+        if near_duplicates is not None:
+            # Hash perceptuel sur un décodage réduit en niveaux de gris, avant le passage dans un lot
+            phash = await executor.run(image.dhash)
+            score = near_duplicates.get(phash, cache_version(model_version, tta))
+        if score is None:
+            # L'image est décodée directement dans sa ligne du tampon du lot
+            score, model_version = await batcher.submit(image, copy_to=shadow_input)
+        else:
+            reused = True
+    if reused:
+        # Quasi-doublon d'une image déjà servie : score réutilisé sans passer par le modèle
+        if prediction_cache is not None and image_hash:
+            await prediction_cache.set_async(image_hash, cache_version(model_version, tta), score)
+        return score, True, model_version
+    # model_version : version du modèle qui a produit le score (pas celle en service au retour du lot)
+    if prediction_cache is not None and image_hash:
+        await prediction_cache.set_async(image_hash, cache_version(model_version, tta), score)
+    if phash is not None:
+        near_duplicates.set(phash, cache_version(model_version, tta), score)
+    return score, False, model_version
+
+async def score_tensor(image: np.ndarray, image_hash: str):
+    """Score brut d'une image déjà décodée à la taille du modèle (cache puis regroupement)"""
+    model_version = engine.model_version
+    if prediction_cache is not None:
+        score = await prediction_cache.get_async(image_hash, cache_version(model_version))
+        if score is not None:
+            return score, True, model_version
+
+    score, model_version = await batcher.submit(image)
+    if prediction_cache is not None:
+        await prediction_cache.set_async(image_hash, cache_version(model_version), score)
+    return score, False, model_version
+
+def parse_tensor_shape(value: str, max_images: int) -> tuple:
+    """Forme annoncée dans X-Tensor-Shape : "H,W,3" (une image) ou "N,H,W,3" (lot)"""
+    expected = predictor.image_size + (3,)
+    try:
+        shape = tuple(int(side) for side in value.split(","))
+    except (AttributeError, ValueError):
+        raise HTTPException(status_code=400, detail="En-tête X-Tensor-Shape manquant ou invalide")
+    if shape[-3:] != expected or len(shape) not in (3, 4):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Forme invalide {shape} : attendu {','.join(map(str, expected))} ou N,{','.join(map(str, expected))}"
+        )
+    if len(shape) == 4 and shape[0] < 1:
+        raise HTTPException(status_code=400, detail="Lot vide")
+    if len(shape) == 4 and shape[0] > max_images:
+        raise HTTPException(status_code=413, detail=f"Trop d'images ({shape[0]} > {max_images})")
+    return shape
 
 @router.get("/", response_class=HTMLResponse)
 async def welcome(request: Request):
     """Page d'accueil avec interface web"""
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "model_loaded": predictor.is_loaded()
+        "model_loaded": engine.is_loaded()
     })
 
 @router.get("/info", response_class=HTMLResponse)
@@ -47,10 +260,10 @@ async def info_page(request: Request):
         "name": "Cats vs Dogs Classifier",
         "version": "1.0.0",
         "description": "Modèle CNN pour classification chats/chiens",
-        "parameters": predictor.model.count_params() if predictor.is_loaded() else 0,
+        "parameters": engine.count_params(),
         "classes": ["Cat", "Dog"],
         "input_size": f"{predictor.image_size[0]}x{predictor.image_size[1]}",
-        "model_loaded": predictor.is_loaded()
+        "model_loaded": engine.is_loaded()
     }
     return templates.TemplateResponse("info.html", {
         "request": request, 
@@ -62,26 +275,46 @@ async def inference_page(request: Request):
     """Page d'inférence"""
     return templates.TemplateResponse("inference.html", {
         "request": request,
-        "model_loaded": predictor.is_loaded()
+        "model_loaded": engine.is_loaded()
     })
 
 @router.post("/api/predict")
 @log_metrics  # Décorateur de monitoring
 async def predict_api(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     token: str = Depends(verify_token),
     image_data: bytes = None,
+    decoded_image=None,
+    image_hash: str = None,
+    task_id: str = None,
+    tta: bool = False,
 ):
-    """API de prédiction avec monitoring"""
-    if not predictor.is_loaded():
+    """API de prédiction avec monitoring (tta=true : moyenne sur des vues augmentées, latence accrue)"""
+    if not engine.is_loaded():
         raise HTTPException(status_code=503, detail="Modèle non disponible")
     
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Format d'image invalide")
     
+    # Le type annoncé par le client ne suffit pas : signature, taille et dimensions avant décodage
+    # En-tête déjà analysé par log_metrics : un seul décodage pour métadonnées, contrôle et tenseur
+    if decoded_image is None:
+        decoded_image = DecodedImage(image_data, file.filename)
+    try:
+        decoded_image.check(**UPLOAD_CONFIG)
+    except ImageRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    # Le modèle candidat est comparé sur le chemin standard uniquement, sur l'entrée déjà prétraitée
+    shadow_input = None
+    if shadow is not None and task_id and not tta and shadow.sample():
+        shadow_input = np.empty(image_shape, dtype=np.uint8)
+    
     try:
 
-        result = predictor.predict(image_data)
+        score, cached, model_version = await score_image(decoded_image, image_hash, tta=tta, shadow_input=shadow_input)
+        result = predictor.format_prediction(score)
 
         response_data = {
             "filename": file.filename,
@@ -90,14 +323,304 @@ async def predict_api(
             "probabilities": {
                 "cat": result['probabilities']['cat'],
                 "dog": result['probabilities']['dog']
-            }
+            },
+            "cached": cached,
+            "model_version": model_version,
+            "tta": tta
         }
         
+        if shadow_input is not None and not cached:
+            # Exécuté après l'envoi de la réponse
+            background_tasks.add_task(shadow.submit, task_id, shadow_input, score)
+        
         return response_data
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de prédiction: {str(e)}")
 
+async def predict_image(image_data: bytes, filename: str, start_time: float, is_image: bool = True, error: str = None,
+                        shadow_input: np.ndarray = None):
+    """Prédiction d'une image d'un lot, retourne (réponse, ligne de journalisation)"""
+    decoded_image = DecodedImage(image_data or b"", filename)
+    record = {
+        'uuid': generate_task_id(),
+        'image_info': describe_upload(decoded_image, filename),
+        'prediction': {'p_cat': None, 'p_dog': None},
+        'success': False,
+        'cache_hit': False,
+        'model_version': engine.model_version,
+    }
+    response_data = {"filename": filename, "task_id": record['uuid']}
+    try:
+        if error:
+            raise ValueError(error)
+        if not is_image:
+            raise ValueError("Format d'image invalide")
+        decoded_image.check(**UPLOAD_CONFIG)
+        # Les images du lot rejoignent la file du batcher et partagent ses passes du modèle
+        score, cached, model_version = await score_image(decoded_image, record['image_info']['hash'],
+                                                         shadow_input=shadow_input)
+        result = predictor.format_prediction(score)
+        record.update(
+            prediction={'p_cat': result['probabilities']['cat'], 'p_dog': result['probabilities']['dog']},
+            success=True,
+            cache_hit=cached,
+            model_version=model_version,
+        )
+        response_data.update({
+            "prediction": result["prediction"],
+            "confidence": result['confidence'],
+            "probabilities": result['probabilities'],
+            "cached": cached,
+            "model_version": model_version
+        })
+    except Exception as e:
+        response_data["error"] = str(e)
+    finally:
+        record['inference_time_ms'] = (time.perf_counter() - start_time) * 1000
+    return response_data, record
+
+@router.post("/api/predict/batch")
+async def predict_batch_api(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    token: str = Depends(verify_token),
+):
+    """API de prédiction sur plusieurs images, journalisation groupée"""
+    if not engine.is_loaded():
+        raise HTTPException(status_code=503, detail="Modèle non disponible")
+    
+    if len(files) > INFERENCE_CONFIG["max_batch_files"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop de fichiers ({len(files)} > {INFERENCE_CONFIG['max_batch_files']})"
+        )
+    
+    start_time = time.perf_counter()
+    records = []
+    
+    async def predict_file(file: UploadFile) -> dict:
+        image_data = await file.read()
+        is_image = bool(file.content_type) and file.content_type.startswith('image/')
+        shadow_input = np.empty(image_shape, dtype=np.uint8) if shadow is not None and shadow.sample() else None
+        response_data, record = await predict_image(image_data, file.filename, start_time, is_image,
+                                                    shadow_input=shadow_input)
+        records.append(record)
+        if shadow_input is not None and record['success'] and not record['cache_hit']:
+            background_tasks.add_task(shadow.submit, record['uuid'], shadow_input, record['prediction']['p_dog'])
+        return response_data
+    
+    try:
+        results = await asyncio.gather(*(predict_file(file) for file in files))
+    finally:
+        if records:
+            await record_predictions(records)
+    
+    return {
+        "count": len(results),
+        "succeeded": sum("error" not in r for r in results),
+        "results": results
+    }
+
+@router.post("/api/predict/raw")
+async def predict_raw_api(request: Request, token: str = Depends(verify_token)):
+    """API de prédiction sur des pixels bruts (application/octet-stream, uint8 RGB à la taille du modèle)
+
+    La forme est donnée par l'en-tête X-Tensor-Shape ; le corps est lu sans décodage
+    ni copie (np.frombuffer) et chaque image rejoint directement la file du batcher.
+    """
+    if not engine.is_loaded():
+        raise HTTPException(status_code=503, detail="Modèle non disponible")
+    
+    if request.headers.get("content-type", "").split(";")[0].strip() != "application/octet-stream":
+        raise HTTPException(status_code=415, detail="Type attendu : application/octet-stream")
+    if request.headers.get("x-tensor-dtype", "uint8") != "uint8":
+        raise HTTPException(status_code=415, detail="Seuls les pixels uint8 sont acceptés")
+    shape = parse_tensor_shape(request.headers.get("x-tensor-shape"), INFERENCE_CONFIG["max_batch_files"])
+    
+    body = await request.body()
+    if len(body) != int(np.prod(shape)):
+        raise HTTPException(status_code=400, detail=f"Taille du corps ({len(body)} octets) incompatible avec la forme {shape}")
+    images = np.frombuffer(body, dtype=np.uint8).reshape((-1,) + shape[-3:])
+    
+    start_time = time.perf_counter()
+    records = []
+    
+    async def predict_tensor(index: int) -> dict:
+        record = {
+            'uuid': generate_task_id(),
+            'image_info': describe_tensor(images[index], index),
+            'prediction': {'p_cat': None, 'p_dog': None},
+            'success': False,
+            'cache_hit': False,
+            'model_version': engine.model_version,
+        }
+        records.append(record)
+        response_data = {"index": index, "task_id": record['uuid']}
+        try:
+            score, cached, model_version = await score_tensor(images[index], record['image_info']['hash'])
+            result = predictor.format_prediction(score)
+            record.update(
+                prediction={'p_cat': result['probabilities']['cat'], 'p_dog': result['probabilities']['dog']},
+                success=True,
+                cache_hit=cached,
+                model_version=model_version,
+            )
+            response_data.update({
+                "prediction": result["prediction"],
+                "confidence": result['confidence'],
+                "probabilities": result['probabilities'],
+                "cached": cached,
+                "model_version": model_version
+            })
+        except Exception as e:
+            response_data["error"] = str(e)
+        finally:
+            record['inference_time_ms'] = (time.perf_counter() - start_time) * 1000
+        return response_data
+    
+    try:
+        results = await asyncio.gather(*(predict_tensor(i) for i in range(len(images))))
+    finally:
+        # Mêmes tables et champs que log_metrics, par la même file d'écriture différée
+        if records:
+            await record_predictions(records)
+    
+    if len(shape) == 3:
+        if "error" in results[0]:
+            raise HTTPException(status_code=500, detail=f"Erreur de prédiction: {results[0]['error']}")
+        return results[0]
+    return {
+        "count": len(results),
+        "succeeded": sum("error" not in r for r in results),
+        "results": results
+    }
+
+@router.post("/api/predict/archive")
+async def predict_archive_api(
+    file: UploadFile = File(...),
+    token: str = Depends(verify_token),
+):
+    """API de prédiction sur une archive zip/tar, résultats diffusés en NDJSON au fil des lots"""
+    if not engine.is_loaded():
+        raise HTTPException(status_code=503, detail="Modèle non disponible")
+    
+    # Copie privée de l'archive : le fichier de la requête est fermé dès le retour de la route
+    archive_file = tempfile.SpooledTemporaryFile(max_size=INFERENCE_CONFIG["archive_spool_bytes"])
+    try:
+        await executor.run(shutil.copyfileobj, file.file, archive_file)
+        members = await executor.run(iter_archive_images, archive_file, INFERENCE_CONFIG["max_member_bytes"])
+    except Exception as e:
+        archive_file.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def stream():
+        count = succeeded = 0
+        try:
+            while True:
+                # Un seul lot de membres décodés en mémoire à la fois
+                chunk = await executor.run(next_chunk, members, INFERENCE_CONFIG["max_batch_size"])
+                if not chunk:
+                    break
+                start_time = time.perf_counter()
+                pairs = await asyncio.gather(*(
+                    predict_image(data, name, start_time, error=error) for name, data, error in chunk
+                ))
+                await record_predictions([record for _, record in pairs])
+                for response_data, _ in pairs:
+                    count += 1
+                    succeeded += "error" not in response_data
+                    yield json.dumps(response_data) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Archive illisible: {e}"}) + "\n"
+        finally:
+            archive_file.close()
+        yield json.dumps({"summary": {"count": count, "succeeded": succeeded}}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+def format_neighbors(neighbors: list) -> list:
+    return [{"image_hash": key, "similarity": similarity} for key, similarity in neighbors]
+
+def index_embedding(image_hash: str, embedding, model_version: str, k: int, add: bool) -> list:
+    """Recherche des voisins puis ajout à l'index (bloquant : entraînement IVF possible à l'ajout)"""
+    # Les embeddings d'une autre version du modèle ne sont pas comparables
+    if embedding_index.model_version != model_version:
+        embedding_index.reset(model_version)
+    neighbors = embedding_index.search(embedding, k=k, exclude=image_hash)
+    if add:
+        embedding_index.add(image_hash, embedding)
+    return neighbors
+
+@router.post("/api/embed")
+async def embed_api(
+    file: UploadFile = File(...),
+    token: str = Depends(verify_token),
+    k: int = 5,
+    add: bool = True,
+):
+    """Embedding d'une image et ses plus proches voisins dans l'index (add=false : recherche seule)"""
+    if not engine.is_loaded():
+        raise HTTPException(status_code=503, detail="Modèle non disponible")
+    
+    image_data = await file.read()
+    decoded_image = DecodedImage(image_data, file.filename)
+    try:
+        decoded_image.check(**UPLOAD_CONFIG)
+    except ImageRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    image_hash = describe_upload(decoded_image, file.filename)['hash']
+    try:
+        processed_image = await executor.run(predictor.preprocess_image, decoded_image)
+        embeddings, model_version = await dispatch_executor.run(
+            engine.embed_batch, processed_image, with_version=True
+        )
+        embedding = embeddings[0]
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur d'extraction: {str(e)}")
+    
+    neighbors, near_duplicate = [], False
+    if embedding_index is not None:
+        # Hors de la boucle asyncio, dans le pool de calcul du prétraitement
+        neighbors = await executor.run(index_embedding, image_hash, embedding, model_version, k, add)
+        near_duplicate = bool(neighbors) and neighbors[0][1] >= EMBEDDING_CONFIG["duplicate_threshold"]
+    
+    return {
+        "filename": file.filename,
+        "image_hash": image_hash,
+        "model_version": model_version,
+        "embedding": embedding.tolist(),
+        "neighbors": format_neighbors(neighbors),
+        "near_duplicate": near_duplicate
+    }
+
+@router.get("/api/embed/{image_hash}/neighbors")
+async def embedding_neighbors(image_hash: str, k: int = 5, token: str = Depends(verify_token)):
+    """Plus proches voisins d'une image déjà indexée"""
+    if embedding_index is None:
+        raise HTTPException(status_code=404, detail="Index des embeddings désactivé")
+    embedding = embedding_index.get(image_hash)
+    if embedding is None:
+        raise HTTPException(status_code=404, detail=f"Image non indexée: {image_hash}")
+    neighbors = await executor.run(embedding_index.search, embedding, k=k, exclude=image_hash)
+    return {
+        "image_hash": image_hash,
+        "neighbors": format_neighbors(neighbors)
+    }
+
+def apply_feedback(uuid: str, grade: int):
+    """Mise à jour du feedback d'une prédiction, y compris encore dans la file de journalisation différée"""
+    try:
+        update_feedback(uuid=uuid, grade=grade)
+    except ValueError:
+        # La prédiction est peut-être encore dans la file : écriture forcée puis nouvel essai
+        if metrics_writer is None or not metrics_writer.flush():
+            raise
+        update_feedback(uuid=uuid, grade=grade)
+
 @router.post("/api/feedback")
 async def submit_feedback(
     request: FeedbackRequest,
@@ -105,9 +628,8 @@ async def submit_feedback(
 ):
     """Soumettre un feedback utilisateur"""
     try:
-        uuid = request.uuid
-        grade = request.grade
-        update_feedback(uuid=uuid, grade=grade)
+        # Aller-retour en base et vidage éventuel de la file différée hors de la boucle asyncio
+        await asyncio.to_thread(apply_feedback, request.uuid, request.grade)
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"Erreur lors de la soumission du feedback: {str(e)}")  
@@ -117,10 +639,59 @@ async def submit_feedback(
 async def api_info():
     """Informations API JSON"""
     return {
-        "model_loaded": predictor.is_loaded(),
+        "model_loaded": engine.is_loaded(),
         "model_path": str(predictor.model_path),
+        "model_version": engine.model_version,
+        "backend": predictor.backend_name,
         "version": "1.0.0",
-        "parameters": predictor.model.count_params() if predictor.is_loaded() else 0
+        "parameters": engine.count_params()
+    }
+
+@router.get("/api/stats")
+async def api_stats():
+    """Statistiques d'exécution de l'inférence"""
+    return {
+        "batching": batcher.get_stats(),
+        "tta_buffers": tta_pool.get_stats(),
+        "executor": executor.get_stats(),
+        "runtime": runtime_info(),
+        "workers": engine.get_stats() if engine is not predictor else None,
+        "cache": prediction_cache.get_stats() if prediction_cache is not None else None,
+        "near_duplicates": near_duplicates.get_stats() if near_duplicates is not None else None,
+        "shadow": shadow.get_stats() if shadow is not None else None,
+        "embeddings": embedding_index.get_stats() if embedding_index is not None else None,
+        "metrics_writer": metrics_writer.get_stats() if metrics_writer is not None else None
+    }
+
+@router.get("/api/admin/models")
+async def list_models(token: str = Depends(verify_token)):
+    """Versions du registre, version servie et rechargement en cours"""
+    info = predictor.get_model_info()
+    if engine is not predictor:
+        info["serving"] = engine.model_version
+        info["workers"] = {w["id"]: w["version"] for w in engine.get_stats()["workers"]}
+    return info
+
+@router.post("/api/admin/models/reload", status_code=202)
+async def reload_model(version: str = None, token: str = Depends(verify_token)):
+    """Rechargement à chaud : chargement et préchauffage en arrière-plan, puis bascule atomique"""
+    try:
+        version, _ = predictor.registry.resolve(predictor.backend_name, version)
+        # Le processus de l'API ou chaque processus d'inférence recharge sans interrompre le service
+        engine.reload(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"status": "reloading", "version": version, "serving": engine.model_version}
+
+@router.get("/api/admin/memory")
+async def memory_usage(token: str = Depends(verify_token)):
+    """Mémoire par processus : poids du modèle, mémoire résidente et allocateur"""
+    return {
+        "api": predictor.memory_info(),
+        "workers": await asyncio.to_thread(engine.memory_info) if engine is not predictor else None,
+        "shadow": await asyncio.to_thread(shadow.engine.memory_info) if shadow is not None and shadow.engine is not None else None
     }
 
 @router.get("/health")
@@ -128,5 +699,16 @@ async def health_check():
     """Vérification de l'état de l'API"""
     return {
         "status": "healthy",
-        "model_loaded": predictor.is_loaded()
-    }
\ No newline at end of file
+        "model_loaded": engine.is_loaded(),
+        "model_state": engine.state
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    """Disponibilité pour l'inférence : modèle chargé et préchauffé"""
+    if not engine.is_loaded():
+        raise HTTPException(status_code=503, detail=f"Modèle non prêt ({engine.state})")
+    if engine is not predictor:
+        # Le modèle est chargé dans chaque processus d'inférence, pas dans celui de l'API
+        return {"status": "ready", "workers": engine.load_status()}
+    return {"status": "ready", **predictor.load_stats}
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlmodel import SQLModel, Session, create_engine
-from sqlalchemy import URL
+import os
+import threading
+from contextlib import contextmanager
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy import URL, bindparam, make_url, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
 from .models import *
-from config.settings import PG_CONFIG, MODEL_CONFIG
+from config.settings import PG_CONFIG, DB_CONFIG, MODEL_CONFIG
 
-db_url = URL.create(
+db_url = make_url(DB_CONFIG["url"]) if DB_CONFIG["url"] else URL.create(
     drivername = "postgresql+psycopg2",
     username   = PG_CONFIG["user"],
     password   = PG_CONFIG["password"],
@@ -13,11 +17,59 @@ db_url = URL.create(
     database   = PG_CONFIG["database"],
 )
 
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+def engine_options(url) -> dict:
+    """Options du moteur selon DB_CONFIG (pool, vérification des connexions, journalisation SQL)"""
+    options = {"echo": DB_CONFIG["echo"], "pool_pre_ping": DB_CONFIG["pool_pre_ping"]}
+    if url.get_backend_name() == "sqlite":
+        # Pool par défaut du dialecte ; connexions utilisées depuis le thread d'écriture différée
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=DB_CONFIG["pool_size"],
+            max_overflow=DB_CONFIG["max_overflow"],
+            pool_timeout=DB_CONFIG["pool_timeout"],
+            pool_recycle=DB_CONFIG["pool_recycle"],
+        )
+    return options
+
 def make_engine():
-    global db_url
-    if db_url:
-        return create_engine(db_url, echo=True)
-    return None
+    """Moteur unique du processus, créé au premier usage et partagé par toutes les sessions"""
+    global _engine, _engine_pid
+    if not db_url:
+        return None
+    if _engine is None or _engine_pid != os.getpid():
+        with _engine_lock:
+            if _engine is not None and _engine_pid != os.getpid():
+                # Processus enfant : les connexions héritées restent au parent
+                _engine.dispose(close=False)
+                _engine = None
+            if _engine is None:
+                _engine = create_engine(db_url, **engine_options(db_url))
+                _engine_pid = os.getpid()
+    return _engine
+
+def dispose_engine():
+    """Fermeture des connexions du pool (arrêt du serveur)"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+@contextmanager
+def unit_of_work():
+    """Session transactionnelle : tout est validé à la sortie du bloc, ou rien en cas d'erreur"""
+    with Session(make_engine()) as session:
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
 
 def create_tables():
     engine = make_engine()
@@ -28,13 +80,15 @@ def drop_tables():
     SQLModel.metadata.drop_all(engine)
 
 def insert(row):
-    engine = make_engine()
-    with Session(engine) as session:
-        try : 
-            session.add(row)
-            session.commit()
-        except IntegrityError as e:
-            session.rollback()
+    try:
+        with unit_of_work() as session:
+            if isinstance(row, ImageMetadata):
+                # Hash déjà connu : ignoré par ON CONFLICT DO NOTHING, sans échec ni rollback
+                _add_image_metadata(session, [row])
+            else:
+                session.add(row)
+    except IntegrityError as e:
+        pass
     return row
 
 def insert_feedback(uuid:str, grade: int):
@@ -64,17 +118,110 @@ def insert_image_metadata(hash:str, filename:str, ext_type:str, size_w:int, size
     )
     return insert(image_metadata)
 
-def insert_prediction(uuid:str, image_id:str, inference_time_ms:float, success:bool, prediction):
+def insert_prediction(uuid:str, image_id:str, inference_time_ms:float, success:bool, prediction, cache_hit:bool = False, model_version:str = None):
     monitoring = PredictionLog(
         uuid=uuid,
         prob_cat=prediction["p_cat"],
         prob_dog=prediction["p_dog"],
         inference_time_ms=inference_time_ms,
         success=success,
-        image_id=image_id
+        image_id=image_id,
+        cache_hit=cache_hit,
+        model_version=model_version or MODEL_CONFIG["version"]
     )
     return insert(monitoring)
 
+# INSERT ... ON CONFLICT DO NOTHING par dialecte
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def _add_image_metadata(session, image_metadata: list) -> int:
+    """Upsert des métadonnées : les images déjà connues (ou répétées dans la liste) sont ignorées"""
+    new_rows = {}
+    for row in image_metadata:
+        new_rows.setdefault(row.hash, row)
+    if not new_rows:
+        return 0
+
+    insert_fn = UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if insert_fn is None:
+        # Autres bases : sélection préalable des hashes connus
+        known = set(session.exec(select(ImageMetadata.hash).where(ImageMetadata.hash.in_(new_rows))).all())
+        session.add_all(row for image_hash, row in new_rows.items() if image_hash not in known)
+        return len(new_rows) - len(known)
+
+    # Une seule instruction, les hashes déjà présents ne lèvent pas d'IntegrityError
+    columns = [column.name for column in ImageMetadata.__table__.columns]
+    statement = insert_fn(ImageMetadata).values(
+        [{name: getattr(row, name) for name in columns} for row in new_rows.values()]
+    ).on_conflict_do_nothing(index_elements=["hash"])
+    return session.execute(statement).rowcount
+
+def _add_prediction_rows(session, image_metadata: list, predictions: list, feedbacks: list):
+    # Ordre imposé par les clés étrangères : images, puis journaux, puis feedbacks
+    _add_image_metadata(session, image_metadata)
+    session.flush()
+    session.add_all(predictions)
+    session.flush()
+    session.add_all(feedbacks)
+
+def insert_prediction_rows(image_metadata: ImageMetadata, prediction: PredictionLog, feedback: Feedback = None):
+    """Lignes d'une prédiction (image, journal, feedback initial) écrites en une seule transaction"""
+    feedback = feedback or Feedback(uuid=prediction.uuid, grade=0)
+    try:
+        with unit_of_work() as session:
+            _add_prediction_rows(session, [image_metadata], [prediction], [feedback])
+    except IntegrityError as e:
+        print(f"Prédiction {prediction.uuid} non enregistrée: {e.orig}")
+        return None
+    return prediction
+
+def insert_batch(image_metadata: list, predictions: list, feedbacks: list) -> int:
+    """Insertion groupée des lignes d'un lot de prédictions (une seule transaction), nombre de prédictions écrites
+
+    Lot refusé (IntegrityError) : les prédictions sont réessayées une par une, chacune avec son
+    image et ses feedbacks, pour qu'une ligne invalide ne fasse pas perdre les autres.
+    """
+    if not predictions:
+        return 0
+    try:
+        with unit_of_work() as session:
+            _add_prediction_rows(session, image_metadata, predictions, feedbacks)
+        return len(predictions)
+    except IntegrityError as e:
+        print(f"Lot de {len(predictions)} prédictions refusé, nouvel essai ligne par ligne: {e.orig}")
+
+    images = {row.hash: row for row in image_metadata}
+    feedbacks_by_uuid = {}
+    for feedback in feedbacks:
+        feedbacks_by_uuid.setdefault(feedback.uuid, []).append(feedback)
+    written = 0
+    for prediction in predictions:
+        image_rows = [images[prediction.image_id]] if prediction.image_id in images else []
+        try:
+            with unit_of_work() as session:
+                _add_prediction_rows(session, image_rows, [prediction], feedbacks_by_uuid.get(prediction.uuid, []))
+            written += 1
+        except IntegrityError as e:
+            print(f"Prédiction {prediction.uuid} non enregistrée: {e.orig}")
+    return written
+
+def update_shadow_predictions(rows: list):
+    """Scores du modèle fantôme (uuid, prob_dog, version) à côté de ceux du modèle principal"""
+    if not rows:
+        return 0
+    # Une seule instruction UPDATE exécutée pour toutes les lignes (executemany), sans relecture
+    statement = (
+        update(PredictionLog)
+        .where(PredictionLog.uuid == bindparam("b_uuid"))
+        .values(shadow_prob_dog=bindparam("b_prob_dog"), shadow_model_version=bindparam("b_version"))
+    )
+    with unit_of_work() as session:
+        session.connection().execute(statement, [
+            {"b_uuid": uuid, "b_prob_dog": prob_dog, "b_version": model_version}
+            for uuid, prob_dog, model_version in rows
+        ])
+    return len(rows)
+
 if __name__ == "__main__":
     create_tables()
     #drop_tables()
\ No newline at end of file
@@ -28,4 +28,7 @@ class PredictionLog(SQLModel, table=True):
     inference_time_ms : float = Field(nullable=False)
     success : bool = Field(nullable=False)
     model_version : str = Field(default=MODEL_CONFIG["version"])
+    cache_hit : bool = Field(default=False, nullable=False)
+    shadow_prob_dog : float | None = Field(default=None, nullable=True)
+    shadow_model_version : str | None = Field(default=None, nullable=True)
     image_id: str = Field(foreign_key="imagemetadata.hash", nullable=False)
@@ -0,0 +1,196 @@
+import threading
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+
+class InferenceBackend:
+    """Base commune : découpage et complétion des lots jusqu'aux tailles compilées"""
+    name = None
+
+    def __init__(self, model_path: Path, image_size: tuple, batch_buckets: list):
+        self.model_path = Path(model_path)
+        self.image_size = image_size
+        self.batch_buckets = batch_buckets
+        self.input_shape = image_size + (3,)
+
+    def predict(self, images: np.ndarray) -> np.ndarray:
+        """Prédiction sur un lot uint8 (N, H, W, C), retourne les scores bruts (classe Dog)"""
+        return self._batched(images, self._run)[:, 0]
+
+    def embed(self, images: np.ndarray) -> np.ndarray:
+        """Embeddings (N, D) d'un lot uint8, sortie du GlobalAveragePooling2D"""
+        return self._batched(images, self._embed)
+
+    def _batched(self, images: np.ndarray, run) -> np.ndarray:
+        max_bucket = self.batch_buckets[-1]
+        if len(images) > max_bucket:
+            return np.concatenate([
+                self._batched(images[i:i + max_bucket], run)
+                for i in range(0, len(images), max_bucket)
+            ])
+
+        # Complétion jusqu'à la taille compilée supérieure
+        images = np.asarray(images, dtype=np.uint8)
+        size = len(images)
+        bucket = next(b for b in self.batch_buckets if b >= size)
+        if bucket != size:
+            padded = np.zeros((bucket,) + images.shape[1:], dtype=np.uint8)
+            padded[:size] = images
+            images = padded
+
+        return run(images)[:size]
+
+    def _run(self, images: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def _embed(self, images: np.ndarray) -> np.ndarray:
+        raise NotImplementedError(f"Embeddings non disponibles pour le backend {self.name}")
+
+    def count_params(self) -> int:
+        return 0
+
+    def weights_bytes(self) -> int:
+        """Mémoire occupée par les poids du modèle"""
+        return 0
+
+
+class KerasBackend(InferenceBackend):
+    """Modèle Keras servi par des fonctions concrètes tracées par taille de lot
+
+    weights_dtype "float16" ou "bfloat16" : le modèle est reconstruit avec des poids (et des
+    calculs) en demi-précision, ce qui divise par deux la mémoire des poids de chaque processus.
+    """
+    name = "keras"
+    WEIGHTS_DTYPES = ("float32", "float16", "bfloat16")
+
+    def __init__(self, model_path: Path, image_size: tuple, batch_buckets: list, weights_dtype: str = "float32"):
+        super().__init__(model_path, image_size, batch_buckets)
+        if weights_dtype not in self.WEIGHTS_DTYPES:
+            raise ValueError(f"Type de poids inconnu: {weights_dtype} (disponibles: {', '.join(self.WEIGHTS_DTYPES)})")
+        self.weights_dtype = weights_dtype
+        model = tf.keras.models.load_model(self.model_path)
+        if weights_dtype != "float32":
+            model = self._cast_weights(model, weights_dtype)
+        self.model = model
+        self._serving_fns = self._build_serving_fns(self.model)
+        # Tracées à la première demande d'embeddings seulement
+        self._embedding_fns = None
+        self._embedding_lock = threading.Lock()
+
+    @staticmethod
+    def _cast_weights(model, dtype: str):
+        """Reconstruction du modèle depuis sa configuration avec le type dtype pour chaque couche"""
+        def with_dtype(config):
+            if isinstance(config, list):
+                return [with_dtype(value) for value in config]
+            if not isinstance(config, dict):
+                return config
+            # L'entrée reste en float32 (conversion dans la première couche), les tenseurs symboliques aussi
+            if config.get("class_name") in ("InputLayer", "__keras_tensor__"):
+                return config
+            return {key: dtype if key == "dtype" else with_dtype(value) for key, value in config.items()}
+
+        cast = model.__class__.from_config(with_dtype(model.get_config()))
+        # Les poids float32 sont convertis à l'affectation
+        cast.set_weights(model.get_weights())
+        return cast
+
+    def _build_serving_fns(self, model):
+        """Traçage d'une fonction concrète par taille de lot, préchauffée au chargement"""
+        @tf.function
+        def serve(images):
+            # Sorties toujours en float32, quel que soit le type des poids
+            return tf.cast(model(tf.cast(images, tf.float32), training=False), tf.float32)
+
+        serving_fns = {}
+        for size in self.batch_buckets:
+            spec = tf.TensorSpec((size,) + self.input_shape, tf.uint8)
+            serving_fn = serve.get_concrete_function(spec)
+            serving_fn(tf.zeros(spec.shape, tf.uint8))
+            serving_fns[size] = serving_fn
+        return serving_fns
+
+    def _run(self, images: np.ndarray) -> np.ndarray:
+        return self._serving_fns[len(images)](tf.constant(images)).numpy()
+
+    def _embed(self, images: np.ndarray) -> np.ndarray:
+        with self._embedding_lock:
+            if self._embedding_fns is None:
+                pooling = next(
+                    layer for layer in self.model.layers
+                    if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D)
+                )
+                self._embedding_fns = self._build_serving_fns(tf.keras.Model(self.model.inputs, pooling.output))
+        return self._embedding_fns[len(images)](tf.constant(images)).numpy()
+
+    def count_params(self) -> int:
+        return self.model.count_params()
+
+    def weights_bytes(self) -> int:
+        return sum(int(np.prod(weight.shape)) * tf.as_dtype(weight.dtype).size for weight in self.model.weights)
+
+
+class TFLiteBackend(InferenceBackend):
+    """Modèle TFLite (float32 ou int8), un interpréteur par thread et par taille de lot"""
+    name = "tflite"
+
+    def __init__(self, model_path: Path, image_size: tuple, batch_buckets: list, num_threads: int = None):
+        super().__init__(model_path, image_size, batch_buckets)
+        self.num_threads = num_threads
+        self._model_content = self.model_path.read_bytes()
+        # Les interpréteurs TFLite ne sont pas partageables entre threads
+        self._local = threading.local()
+        for size in self.batch_buckets:
+            self._run(np.zeros((size,) + self.input_shape, dtype=np.uint8))
+
+    def _get_interpreter(self, size: int):
+        interpreters = getattr(self._local, "interpreters", None)
+        if interpreters is None:
+            interpreters = self._local.interpreters = {}
+
+        if size not in interpreters:
+            interpreter = Interpreter(model_content=self._model_content, num_threads=self.num_threads)
+            input_index = interpreter.get_input_details()[0]["index"]
+            interpreter.resize_tensor_input(input_index, (size,) + self.input_shape)
+            interpreter.allocate_tensors()
+            interpreters[size] = interpreter
+        return interpreters[size]
+
+    def weights_bytes(self) -> int:
+        # Les poids float16 d'un export TFLite sont convertis en float32 au chargement sur CPU
+        return len(self._model_content)
+
+    def _run(self, images: np.ndarray) -> np.ndarray:
+        interpreter = self._get_interpreter(len(images))
+        interpreter.set_tensor(interpreter.get_input_details()[0]["index"], images)
+        interpreter.invoke()
+        return interpreter.get_tensor(interpreter.get_output_details()[0]["index"])
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    TFLiteBackend.name: TFLiteBackend,
+}
+
+
+def load_backend(name: str, model_path: Path, image_size: tuple, batch_buckets: list,
+                 weights_dtype: str = "float32", num_threads: int = None) -> InferenceBackend:
+    """Instanciation du backend d'inférence configuré
+
+    num_threads : threads de chaque interpréteur TFLite (None = défaut de TFLite) ; le backend
+    Keras utilise les pools de threads TensorFlow du processus (configure_threads).
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend inconnu: {name} (disponibles: {', '.join(BACKENDS)})")
+    if name == KerasBackend.name:
+        return KerasBackend(model_path, image_size, batch_buckets, weights_dtype=weights_dtype)
+    # Les modèles TFLite fixent le type de leurs poids à l'export (scripts/export_model.py --float16)
+    if weights_dtype != "float32":
+        raise ValueError(f"Type de poids {weights_dtype} non applicable au backend {name}")
+    return BACKENDS[name](model_path, image_size, batch_buckets, num_threads=num_threads or None)
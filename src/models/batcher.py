@@ -0,0 +1,215 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class BatchingStats:
+    """Statistiques de regroupement (taille des lots, attente en file)"""
+
+    def __init__(self, window: int = 1000):
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_sizes = Counter()
+        self.queue_wait_ms = deque(maxlen=window)
+        self.inference_ms = deque(maxlen=window)
+
+    def record(self, batch_size: int, waits_ms: list, inference_ms: float):
+        self.total_requests += batch_size
+        self.total_batches += 1
+        self.batch_sizes[batch_size] += 1
+        self.queue_wait_ms.extend(waits_ms)
+        self.inference_ms.append(inference_ms)
+
+    @staticmethod
+    def _summary(values) -> dict:
+        if not values:
+            return {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+        data = np.fromiter(values, dtype=np.float64)
+        return {
+            "mean": float(data.mean()),
+            "p50": float(np.percentile(data, 50)),
+            "p99": float(np.percentile(data, 99)),
+            "max": float(data.max()),
+        }
+
+    def as_dict(self) -> dict:
+        mean_batch = self.total_requests / self.total_batches if self.total_batches else 0.0
+        return {
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "mean_batch_size": mean_batch,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+            "queue_wait_ms": self._summary(self.queue_wait_ms),
+            "inference_ms": self._summary(self.inference_ms),
+        }
+
+
+def copy_row(image: np.ndarray, out: np.ndarray):
+    """Remplissage par défaut : image déjà prétraitée (H, W, C) copiée dans sa ligne"""
+    np.copyto(out, image)
+
+
+class MicroBatcher:
+    """Ordonnanceur d'inférence regroupant les requêtes concurrentes en lots
+
+    Avec un pool de tampons, chaque élément est écrit directement dans sa ligne du tampon du lot
+    par fill_fn(élément, ligne) : une image encore compressée y est décodée (en parallèle sur
+    fill_executor), un tableau déjà prêt y est copié. Le lot est complété par des lignes nulles
+    jusqu'à la taille compilée supérieure (batch_buckets), dans le même tampon.
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = 16, max_wait_ms: float = 5.0, executor=None,
+                 buffer_pool=None, with_version: bool = False, fill_fn=None, fill_executor=None,
+                 batch_buckets: list = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être >= 1")
+        if fill_fn is not None and buffer_pool is None:
+            raise ValueError("fill_fn écrit dans les tampons du lot : buffer_pool requis")
+        self.predict_fn = predict_fn
+        # predict_fn retourne (scores, version) : chaque requête reçoit (score, version du lot)
+        self.with_version = with_version
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        # Un lot par thread d'inférence : tant que tous sont occupés, la file continue de se remplir
+        self.max_inflight = executor.max_workers if executor is not None else 1
+        # Tampons (max_batch_size, H, W, C) préalloués pour assembler les lots sans allocation
+        self.buffer_pool = buffer_pool
+        self.fill_fn = fill_fn or copy_row
+        self.fill_executor = fill_executor
+        self.batch_buckets = sorted(batch_buckets) if batch_buckets else None
+        self.stats = BatchingStats()
+        self._queue = None
+        self._worker = None
+        self._slots = None
+
+    def _ensure_worker(self):
+        """Démarrage paresseux de la tâche de fond dans la boucle courante"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, image, copy_to: np.ndarray = None):
+        """Soumission d'une image (H, W, C), ou de tout élément accepté par fill_fn ;
+        retourne le score brut (et sa version si with_version)
+
+        copy_to : tableau (H, W, C) qui reçoit une copie de l'entrée du modèle (ex. inférence fantôme).
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, time.perf_counter(), copy_to))
+        return await future
+
+    async def _collect(self) -> list:
+        """Attente du premier élément puis remplissage jusqu'à max_batch_size ou max_wait_ms"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            # Les requêtes annulées (client déconnecté) ne passent pas dans le modèle
+            batch = [item for item in batch if not item[1].done()]
+            if batch:
+                task = loop.create_task(self._process(batch))
+                task.add_done_callback(lambda _: self._slots.release())
+            else:
+                self._slots.release()
+
+    async def _predict(self, inputs: np.ndarray):
+        if self.executor is None:
+            return self.predict_fn(inputs)
+        return await self.executor.run(self.predict_fn, inputs)
+
+    async def _fill(self, batch: list, buffer: np.ndarray) -> list:
+        """Écriture de chaque élément dans sa ligne du tampon ; exception par élément (None si réussi)"""
+        if self.fill_executor is None:
+            errors = []
+            for row, (item, _, _, _) in zip(buffer, batch):
+                try:
+                    self.fill_fn(item, row)
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+            return errors
+        results = await asyncio.gather(
+            *(self.fill_executor.run(self.fill_fn, item, row) for row, (item, _, _, _) in zip(buffer, batch)),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    def _padded_size(self, size: int, capacity: int) -> int:
+        """Taille compilée supérieure, si le tampon peut la contenir (sinon le backend complète)"""
+        if self.batch_buckets is None:
+            return size
+        bucket = next((b for b in self.batch_buckets if b >= size), size)
+        return bucket if bucket <= capacity else size
+
+    async def _process(self, batch: list):
+        started = time.perf_counter()
+        waits_ms = [(started - enqueued) * 1000 for _, _, enqueued, _ in batch]
+        buffer = self.buffer_pool.acquire() if self.buffer_pool is not None else None
+        try:
+            if buffer is not None:
+                errors = await self._fill(batch, buffer)
+                for index, error in enumerate(errors):
+                    if error is not None:
+                        # Élément illisible : sa ligne reste dans le lot, mise à zéro, sans score rendu
+                        buffer[index] = 0
+                        if not batch[index][1].done():
+                            batch[index][1].set_exception(error)
+                size = self._padded_size(len(batch), len(buffer))
+                buffer[len(batch):size] = 0
+                inputs = buffer[:size]
+            else:
+                inputs = np.stack([image for image, _, _, _ in batch])
+            for row, (_, future, _, copy_to) in zip(inputs, batch):
+                if copy_to is not None and not future.done():
+                    np.copyto(copy_to, row)
+            scores = await self._predict(inputs)
+            version = None
+            if self.with_version:
+                scores, version = scores
+        except Exception as e:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            if buffer is not None:
+                self.buffer_pool.release(buffer)
+
+        self.stats.record(len(batch), waits_ms, (time.perf_counter() - started) * 1000)
+        for (_, future, _, _), score in zip(batch, scores):
+            if not future.done():
+                future.set_result((float(score), version) if self.with_version else float(score))
+
+    def get_stats(self) -> dict:
+        """Statistiques courantes et paramètres de l'ordonnanceur"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "max_inflight": self.max_inflight,
+            "queue_size": self._queue.qsize() if self._queue is not None else 0,
+            "buffers": self.buffer_pool.get_stats() if self.buffer_pool is not None else None,
+            **self.stats.as_dict(),
+        }
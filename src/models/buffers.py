@@ -0,0 +1,43 @@
+import queue
+import numpy as np
+
+
+class BufferPool:
+    """Pool de tableaux uint8 préalloués de forme fixe, réutilisés d'une requête à l'autre
+
+    acquire() ne bloque jamais : si le pool est vide, un tableau supplémentaire est
+    alloué (compté dans misses) et n'est conservé au retour que dans la limite de count.
+    """
+
+    def __init__(self, count: int, shape: tuple, dtype=np.uint8):
+        if count < 1:
+            raise ValueError("count doit être >= 1")
+        self.count = count
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.acquired = 0
+        self.misses = 0
+        self._free = queue.LifoQueue()
+        for _ in range(count):
+            self._free.put(np.zeros(self.shape, dtype=dtype))
+
+    def acquire(self) -> np.ndarray:
+        self.acquired += 1
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            self.misses += 1
+            return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, array: np.ndarray):
+        if self._free.qsize() < self.count:
+            self._free.put(array)
+
+    def get_stats(self) -> dict:
+        return {
+            "count": self.count,
+            "shape": list(self.shape),
+            "free": self._free.qsize(),
+            "acquired": self.acquired,
+            "misses": self.misses,
+        }
@@ -0,0 +1,381 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    """Compteurs du cache de prédictions"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class PredictionCache:
+    """Cache borné des scores par (hash de l'image, version du modèle), éviction LRU et TTL"""
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        if max_entries < 1:
+            raise ValueError("max_entries doit être >= 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_hash: str, model_version: str) -> str:
+        return f"{model_version}:{image_hash}"
+
+    def get(self, image_hash: str, model_version: str):
+        """Score brut en cache, None si absent ou expiré"""
+        key = self.make_key(image_hash, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    def set(self, image_hash: str, model_version: str, score: float):
+        key = self.make_key(image_hash, model_version)
+        with self._lock:
+            self._entries[key] = (float(score), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    async def get_async(self, image_hash: str, model_version: str):
+        """Variante pour la boucle asyncio (aucune attente en mémoire, partagée avec le cache Redis)"""
+        return self.get(image_hash, model_version)
+
+    async def set_async(self, image_hash: str, model_version: str, score: float):
+        self.set(image_hash, model_version, score)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats.as_dict(),
+            }
+
+
+class RedisPredictionCache(PredictionCache):
+    """Cache partagé entre processus de l'API (Redis), borné à max_entries par un index LRU
+
+    Depuis la boucle asyncio, get_async/set_async passent par redis.asyncio : l'aller-retour
+    réseau ne bloque pas la boucle. Chaque accès met à jour la date de l'entrée dans un
+    ensemble trié ; au-delà de max_entries, les entrées les plus anciennes sont supprimées.
+    """
+    name = "redis"
+
+    def __init__(self, url: str, max_entries: int = 10000, ttl_seconds: float = 3600, prefix: str = "catdog:"):
+        import redis
+        import redis.asyncio
+
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.prefix = prefix
+        self.index_key = prefix + "lru"
+        self._client = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+
+    def _key(self, image_hash: str, model_version: str) -> str:
+        return self.prefix + self.make_key(image_hash, model_version)
+
+    def _queue_get(self, pipe, key: str):
+        pipe.get(key)
+        # Date d'accès rafraîchie seulement pour une entrée déjà indexée
+        pipe.zadd(self.index_key, {key: time.time()}, xx=True)
+
+    def _queue_set(self, pipe, key: str, score: float):
+        pipe.set(key, repr(float(score)), ex=int(self.ttl_seconds) or None)
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.zcard(self.index_key)
+
+    def _record_lookup(self, value):
+        with self._lock:
+            if value is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        return float(value)
+
+    def _excess(self, size: int) -> int:
+        return max(0, size - self.max_entries)
+
+    def _record_evictions(self, evicted: list) -> list:
+        with self._lock:
+            self.stats.evictions += len(evicted)
+        return [key for key, _ in evicted]
+
+    def get(self, image_hash: str, model_version: str):
+        with self._client.pipeline(transaction=False) as pipe:
+            self._queue_get(pipe, self._key(image_hash, model_version))
+            value, _ = pipe.execute()
+        return self._record_lookup(value)
+
+    async def get_async(self, image_hash: str, model_version: str):
+        async with self._async_client.pipeline(transaction=False) as pipe:
+            self._queue_get(pipe, self._key(image_hash, model_version))
+            value, _ = await pipe.execute()
+        return self._record_lookup(value)
+
+    def set(self, image_hash: str, model_version: str, score: float):
+        with self._client.pipeline(transaction=False) as pipe:
+            self._queue_set(pipe, self._key(image_hash, model_version), score)
+            *_, size = pipe.execute()
+        if self._excess(size):
+            keys = self._record_evictions(self._client.zpopmin(self.index_key, self._excess(size)))
+            if keys:
+                self._client.delete(*keys)
+
+    async def set_async(self, image_hash: str, model_version: str, score: float):
+        async with self._async_client.pipeline(transaction=False) as pipe:
+            self._queue_set(pipe, self._key(image_hash, model_version), score)
+            *_, size = await pipe.execute()
+        if self._excess(size):
+            keys = self._record_evictions(await self._async_client.zpopmin(self.index_key, self._excess(size)))
+            if keys:
+                await self._async_client.delete(*keys)
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+    def __len__(self) -> int:
+        return self._client.zcard(self.index_key)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats.as_dict(),
+            }
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Arbre BK sur la distance de Hamming : recherche des hashs à distance bornée sans tout parcourir
+
+    Un nœud ne peut pas être détaché sans réorganiser ses descendants : remove le marque
+    supprimé, et l'arbre est reconstruit lorsque les nœuds supprimés deviennent majoritaires.
+    """
+
+    def __init__(self):
+        # Nœud : [hash, valeur, {distance: enfant}, présent]
+        self._root = None
+        self._size = 0
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item):
+        """Insertion (la valeur d'un hash déjà présent est remplacée)"""
+        if self._root is None:
+            self._root = [value, item, {}, True]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if not node[3]:
+                    node[3] = True
+                    self._size += 1
+                    self._removed -= 1
+                node[1] = item
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, item, {}, True]
+                self._size += 1
+                return
+            node = child
+
+    def remove(self, value: int) -> bool:
+        """Suppression d'un hash, False s'il est absent"""
+        node = self._root
+        while node is not None:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if not node[3]:
+                    return False
+                node[3] = False
+                node[1] = None
+                self._size -= 1
+                self._removed += 1
+                if self._removed > self._size:
+                    self._rebuild()
+                return True
+            node = node[2].get(distance)
+        return False
+
+    def _rebuild(self):
+        live = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            if node[3]:
+                live.append((node[0], node[1]))
+            stack.extend(node[2].values())
+        self._root, self._size, self._removed = None, 0, 0
+        for value, item in live:
+            self.add(value, item)
+
+    def search(self, value: int, max_distance: int):
+        """Entrée la plus proche à distance <= max_distance : (distance, valeur) ou None"""
+        best = None
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if node[3] and distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, node[1])
+                if distance == 0:
+                    break
+            # Inégalité triangulaire : seuls les enfants à |d - distance| <= max_distance peuvent convenir
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    stack.append(child)
+        return best
+
+
+class NearDuplicateCache:
+    """Scores réutilisés pour les images quasi identiques (hash perceptuel à distance de Hamming bornée)
+
+    Un arbre BK par version du modèle, indexé par un dictionnaire ordonné par date d'écriture :
+    les entrées expirent après ttl_seconds comme dans PredictionCache, et au-delà de
+    max_entries les plus anciennes sont évincées une à une.
+    """
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 10000, ttl_seconds: float = 3600):
+        if max_entries < 1:
+            raise ValueError("max_entries doit être >= 1")
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._trees = {}
+        # (version du modèle, hash) -> (score, date d'écriture), du plus ancien au plus récent
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, written_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - written_at > self.ttl_seconds
+
+    def _discard(self, key):
+        model_version, phash = key
+        del self._entries[key]
+        tree = self._trees[model_version]
+        tree.remove(phash)
+        if not len(tree):
+            del self._trees[model_version]
+
+    def get(self, phash: int, model_version: str):
+        """Score d'une image à distance <= max_distance, None sinon"""
+        now = time.monotonic()
+        with self._lock:
+            while True:
+                tree = self._trees.get(model_version)
+                match = tree.search(phash, self.max_distance) if tree is not None else None
+                if match is None:
+                    self.stats.misses += 1
+                    return None
+                key = (model_version, match[1])
+                score, written_at = self._entries[key]
+                if not self._expired(written_at, now):
+                    self.stats.hits += 1
+                    return score
+                # Entrée expirée : retirée, la recherche reprend parmi les suivantes
+                self._discard(key)
+                self.stats.expirations += 1
+
+    def set(self, phash: int, model_version: str, score: float):
+        now = time.monotonic()
+        key = (model_version, phash)
+        with self._lock:
+            self._entries[key] = (float(score), now)
+            self._entries.move_to_end(key)
+            self._trees.setdefault(model_version, BKTree()).add(phash, phash)
+            while self._entries:
+                oldest, (_, written_at) = next(iter(self._entries.items()))
+                if self._expired(written_at, now):
+                    self.stats.expirations += 1
+                elif len(self._entries) > self.max_entries:
+                    self.stats.evictions += 1
+                else:
+                    break
+                self._discard(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats.as_dict(),
+            }
+
+def make_cache(config: dict):
+    """Instanciation du cache configuré (None si désactivé)"""
+    if not config["enabled"]:
+        return None
+    if config["backend"] == "redis":
+        return RedisPredictionCache(config["redis_url"], max_entries=config["max_entries"],
+                                    ttl_seconds=config["ttl_seconds"])
+    if config["backend"] != "memory":
+        raise ValueError(f"Cache inconnu: {config['backend']} (disponibles: memory, redis)")
+    return PredictionCache(max_entries=config["max_entries"], ttl_seconds=config["ttl_seconds"])
+
+
+def make_near_duplicate_cache(config: dict):
+    """Cache des quasi-doublons configuré (None si désactivé)"""
+    if not config["enabled"] or not config["phash"]:
+        return None
+    return NearDuplicateCache(max_distance=config["phash_distance"], max_entries=config["max_entries"],
+                              ttl_seconds=config["ttl_seconds"])
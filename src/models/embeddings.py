@@ -0,0 +1,221 @@
+import json
+import threading
+from pathlib import Path
+import numpy as np
+
+
+class EmbeddingIndex:
+    """Index en mémoire des embeddings d'images, similarité cosinus par produit scalaire vectorisé
+
+    mode "exact" : recherche exhaustive sur tous les vecteurs.
+    mode "ivf" : les vecteurs sont répartis entre n_lists centroïdes (k-means entraîné dès que
+    l'index contient assez de vecteurs) et seules les n_probe listes les plus proches sont parcourues.
+    """
+
+    MODES = ("exact", "ivf")
+
+    def __init__(self, mode: str = "exact", n_lists: int = 64, n_probe: int = 8, model_version: str = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode d'index inconnu: {mode} (disponibles: {', '.join(self.MODES)})")
+        self.mode = mode
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.model_version = model_version
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._vectors = None
+        self._size = 0
+        self._keys = []
+        self._rows = {}
+        self._centroids = None
+        self._assignments = np.empty(0, dtype=np.int32)
+
+    def reset(self, model_version: str = None):
+        """Index vidé : les embeddings d'une autre version du modèle ne sont pas comparables"""
+        with self._lock:
+            self._clear()
+            self.model_version = model_version
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dim(self):
+        return self._vectors.shape[1] if self._vectors is not None else None
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _reserve(self, dim: int):
+        """Capacité doublée au besoin ; un index chargé en memmap (lecture seule) est copié en mémoire"""
+        if self._vectors is None:
+            self._vectors = np.empty((64, dim), dtype=np.float32)
+            self._assignments = np.full(64, -1, dtype=np.int32)
+            return
+        if self._size < len(self._vectors) and self._vectors.flags.writeable:
+            return
+        capacity = max(2 * self._size, 64)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        self._vectors, self._assignments = vectors, assignments
+
+    def add(self, key: str, vector: np.ndarray) -> bool:
+        """Ajout d'un embedding sous sa clé (hash de l'image), False si la clé est déjà indexée"""
+        vector = self.normalize(vector)[0]
+        with self._lock:
+            if key in self._rows:
+                return False
+            if self.dim is not None and len(vector) != self.dim:
+                raise ValueError(f"Dimension {len(vector)} incompatible avec l'index ({self.dim})")
+            self._reserve(len(vector))
+            row = self._size
+            self._vectors[row] = vector
+            self._assignments[row] = self._nearest_list(vector[None])[0] if self.trained else -1
+            self._keys.append(key)
+            self._rows[key] = row
+            self._size += 1
+            if self.mode == "ivf" and not self.trained and self._size >= self.n_lists * 16:
+                self._train()
+        return True
+
+    def get(self, key: str):
+        """Embedding indexé sous cette clé (None si absent)"""
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else np.array(self._vectors[row])
+
+    def _nearest_list(self, vectors: np.ndarray, count: int = 1) -> np.ndarray:
+        similarities = vectors @ self._centroids.T
+        if count == 1:
+            return similarities.argmax(axis=1).astype(np.int32)
+        return np.argsort(-similarities, axis=1)[:, :count]
+
+    def _train(self, iterations: int = 10, seed: int = 0):
+        """k-means sphérique sur les vecteurs indexés, puis affectation de chacun à sa liste"""
+        vectors = self._vectors[:self._size]
+        rng = np.random.default_rng(seed)
+        n_lists = min(self.n_lists, self._size)
+        centroids = vectors[rng.choice(self._size, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = (vectors @ centroids.T).argmax(axis=1)
+            for i in range(n_lists):
+                members = vectors[assignments == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids = self.normalize(centroids)
+        self._centroids = centroids
+        self._assignments[:self._size] = self._nearest_list(vectors)
+
+    def train(self):
+        """Entraînement (ou ré-entraînement) des listes IVF sur le contenu actuel"""
+        with self._lock:
+            if self._size:
+                self._train()
+
+    def search(self, vector: np.ndarray, k: int = 5, exclude: str = None) -> list:
+        """k plus proches voisins [(clé, similarité cosinus)], du plus proche au plus lointain"""
+        query = self.normalize(vector)[0]
+        with self._lock:
+            if not self._size:
+                return []
+            if self.mode == "ivf" and self.trained:
+                probes = self._nearest_list(query[None], min(self.n_probe, len(self._centroids)))[0]
+                rows = np.flatnonzero(np.isin(self._assignments[:self._size], probes))
+            else:
+                rows = np.arange(self._size)
+            scores = self._vectors[rows] @ query
+            keys = self._keys
+
+            # Une place de plus pour pouvoir écarter la clé de la requête
+            top = min(k + (exclude is not None), len(rows))
+            if top == 0:
+                return []
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            results = [(keys[rows[i]], float(scores[i])) for i in best if keys[rows[i]] != exclude]
+        return results[:k]
+
+    def save(self, path: Path):
+        """Persistance sur disque (vecteurs .npy relus en memmap par load)"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            vectors = self._vectors[:self._size] if self._vectors is not None else np.empty((0, 0), np.float32)
+            assignments = self._assignments[:self._size]
+            meta = {
+                "model_version": self.model_version,
+                "mode": self.mode,
+                "n_lists": self.n_lists,
+                "n_probe": self.n_probe,
+                "keys": list(self._keys),
+            }
+            # Écriture dans des fichiers temporaires puis remplacement : un index lu n'est jamais partiel
+            for name, array in (("vectors", vectors), ("assignments", assignments)):
+                with open(path / f"{name}.tmp.npy", "wb") as f:
+                    np.save(f, array)
+            if self._centroids is not None:
+                with open(path / "centroids.tmp.npy", "wb") as f:
+                    np.save(f, self._centroids)
+            (path / "index.tmp.json").write_text(json.dumps(meta))
+        for name in ("vectors", "assignments", "centroids"):
+            tmp = path / f"{name}.tmp.npy"
+            if tmp.exists():
+                tmp.replace(path / f"{name}.npy")
+            elif name == "centroids":
+                (path / "centroids.npy").unlink(missing_ok=True)
+        (path / "index.tmp.json").replace(path / "index.json")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True, **kwargs) -> "EmbeddingIndex":
+        """Chargement d'un index persisté ; en memmap, les vecteurs ne sont lus qu'à la demande"""
+        path = Path(path)
+        meta = json.loads((path / "index.json").read_text())
+        params = {name: meta[name] for name in ("mode", "n_lists", "n_probe", "model_version")}
+        params.update(kwargs)
+        index = cls(**params)
+        keys = meta["keys"]
+        if keys:
+            index._vectors = np.load(path / "vectors.npy", mmap_mode="r" if mmap else None)
+            index._assignments = np.load(path / "assignments.npy")
+            index._keys = keys
+            index._rows = {key: row for row, key in enumerate(keys)}
+            index._size = len(keys)
+            centroids = path / "centroids.npy"
+            if centroids.exists():
+                index._centroids = np.load(centroids)
+        return index
+
+    def get_stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "size": self._size,
+            "dim": self.dim,
+            "trained": self.trained,
+            "n_lists": self.n_lists if self.mode == "ivf" else None,
+            "n_probe": self.n_probe if self.mode == "ivf" else None,
+            "model_version": self.model_version,
+        }
+
+
+def make_index(config: dict):
+    """Index configuré, rechargé depuis le disque s'il existe (None si désactivé)"""
+    if not config["enabled"]:
+        return None
+    params = {"mode": config["mode"], "n_lists": config["n_lists"], "n_probe": config["n_probe"]}
+    if (Path(config["path"]) / "index.json").exists():
+        try:
+            return EmbeddingIndex.load(config["path"], **params)
+        except Exception as e:
+            print(f"Erreur de chargement de l'index d'embeddings: {e}")
+    return EmbeddingIndex(**params)
@@ -0,0 +1,49 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceExecutor:
+    """Exécution bornée des tâches bloquantes (décodage, inférence) hors de la boucle asyncio"""
+
+    def __init__(self, max_workers: int = 4):
+        if max_workers < 1:
+            raise ValueError("max_workers doit être >= 1")
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._semaphore = None
+        self._active = 0
+        self._waiting = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def run(self, fn, *args, **kwargs):
+        """Exécution de fn dans le pool, l'attente d'un créneau reste côté boucle (annulable)"""
+        semaphore = self._get_semaphore()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._active -= 1
+            semaphore.release()
+
+    def shutdown(self, wait: bool = True):
+        """Arrêt du pool de threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "active": self._active,
+            "waiting": self._waiting,
+        }
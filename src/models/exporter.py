@@ -0,0 +1,83 @@
+import sys
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+
+# Ajouter les chemins nécessaires
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from config.settings import MODEL_CONFIG, API_CONFIG, MODELS_DIR
+from src.data.preprocessing import setup_data_directory
+from src.utils.benchmark import load_sample_images
+from src.utils.image import prepare_image
+
+# Graine du mélange unique des images : calibration puis évaluation, tranches disjointes
+SPLIT_SEED = 1337
+
+class CatDogExporter:
+    def __init__(self, model_path: Path = None):
+        self.config = MODEL_CONFIG
+        self.model_path = Path(model_path or API_CONFIG["model_path"])
+        self.models_dir = MODELS_DIR
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+
+    def _prepared_images(self, num_samples: int, offset: int) -> tuple:
+        """Images PetImages prétraitées et labels, tranche [offset, offset + num_samples) du mélange"""
+        samples = load_sample_images(limit=num_samples, data_path=setup_data_directory(), seed=SPLIT_SEED,
+                                     offset=offset)
+        images, labels = [], []
+        for _, data, label in samples:
+            try:
+                images.append(prepare_image(data, self.config["image_size"]))
+                labels.append(label)
+            except Exception:
+                continue
+        return images, labels
+
+    def calibration_images(self, num_samples: int = 200) -> np.ndarray:
+        """Échantillon d'images PetImages prétraitées pour la calibration int8 (début du mélange)"""
+        images, _ = self._prepared_images(num_samples, offset=0)
+        if not images:
+            raise ValueError("Aucune image disponible pour la calibration")
+        return np.stack(images)
+
+    def evaluation_images(self, num_samples: int = 500, num_calibration: int = 200) -> tuple:
+        """Jeu d'évaluation (images, labels) pris après les num_calibration images de calibration"""
+        images, labels = self._prepared_images(num_samples, offset=num_calibration)
+        if not images:
+            raise ValueError("Aucune image disponible pour l'évaluation")
+        return np.stack(images), np.array(labels)
+
+    def export_tflite(self, output_path: Path = None, quantize: bool = False, num_calibration: int = 200,
+                      float16: bool = False) -> Path:
+        """Export TFLite (entrée uint8), avec quantification int8 ou poids float16 optionnels"""
+        model = tf.keras.models.load_model(self.model_path)
+
+        @tf.function
+        def serve(images):
+            return model(tf.cast(images, tf.float32), training=False)
+
+        # Taille de lot dynamique : le backend redimensionne l'entrée par bucket
+        spec = tf.TensorSpec((None,) + self.config["image_size"] + (3,), tf.uint8)
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function(spec)], model)
+
+        if quantize:
+            calibration = self.calibration_images(num_calibration)
+
+            def representative_dataset():
+                for image in calibration:
+                    yield [image[None]]
+
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        elif float16:
+            # Poids stockés en float16 : fichier deux fois plus petit, calculs en float32 sur CPU
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+
+        suffix = "_int8" if quantize else "_fp16" if float16 else ""
+        output_path = Path(output_path or self.models_dir / f"{self.model_path.stem}{suffix}.tflite")
+        output_path.write_bytes(converter.convert())
+
+        print(f"Modèle exporté: {output_path}")
+        return output_path
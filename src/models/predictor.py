@@ -1,54 +1,216 @@
 import sys
+import threading
+import time
+from collections import namedtuple
 from pathlib import Path
-import tensorflow as tf
 import numpy as np
-from PIL import Image
-import io
 
 # Ajouter les chemins nécessaires
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from config.settings import MODEL_CONFIG, API_CONFIG
+from config.settings import MODEL_CONFIG, API_CONFIG, INFERENCE_CONFIG
+from src.models.registry import ModelRegistry
+from src.models.runtime import process_memory, configure_threads, available_cpus
+from src.utils.image import prepare_image, prepare_tta_views
+
+# Modèle servi : remplacé d'un bloc lors d'un rechargement (les lots en cours finissent sur l'ancien)
+ServedModel = namedtuple("ServedModel", ["backend", "version", "path"])
 
 class CatDogPredictor:
-    def __init__(self):
+    def __init__(self, load: bool = True, version: str = None):
         self.image_size = MODEL_CONFIG["image_size"]
-        self.model_path = API_CONFIG["model_path"]
-        self.model = None
-        self.load_model()
+        self.backend_name = API_CONFIG["model_backend"]
+        self.batch_buckets = INFERENCE_CONFIG["batch_buckets"]
+        self.jpeg_draft = INFERENCE_CONFIG["jpeg_draft"]
+        self.weights_dtype = INFERENCE_CONFIG["weights_dtype"]
+        self.intra_op_threads = INFERENCE_CONFIG["intra_op_threads"]
+        self.inter_op_threads = INFERENCE_CONFIG["inter_op_threads"]
+        self.cpu_affinity = INFERENCE_CONFIG["cpu_affinity"]
+        self.warmup_rounds = INFERENCE_CONFIG["warmup_rounds"]
+        self.registry = ModelRegistry(
+            API_CONFIG["registry_dir"],
+            {name: path.name for name, path in API_CONFIG["model_paths"].items()},
+            fallback_version=MODEL_CONFIG["version"],
+            fallback_paths=API_CONFIG["model_paths"],
+        )
+        self.pinned_version = version or API_CONFIG["model_version"]
+        self._served = None
+        # idle -> loading -> ready | failed
+        self.state = "idle"
+        self.load_stats = {}
+        self.load_error = None
+        self.reloading = None
+        self._loader = None
+        self._reload_lock = threading.Lock()
+        if load:
+            self.load_model(self.pinned_version)
+    
+    @property
+    def backend(self):
+        return self._served.backend if self._served is not None else None
+    
+    @property
+    def model_version(self) -> str:
+        """Version du modèle servi (à défaut, celle qui sera chargée)"""
+        if self._served is not None:
+            return self._served.version
+        return self._resolve(self.pinned_version)[0]
+    
+    @property
+    def model_path(self) -> Path:
+        if self._served is not None:
+            return self._served.path
+        return self._resolve(self.pinned_version)[1]
     
-    def load_model(self):
-        """Chargement du modèle"""
+    def _resolve(self, version: str = None) -> tuple:
         try:
-            if self.model_path.exists():
-                self.model = tf.keras.models.load_model(self.model_path)
-                print(f"Modèle chargé: {self.model_path}")
-            else:
-                print(f"Modèle non trouvé: {self.model_path}")
+            return self.registry.resolve(self.backend_name, version)
+        except ValueError:
+            return version, None
+    
+    def load_model(self, version: str = None) -> bool:
+        """Chargement et préchauffage d'une version du modèle, puis bascule vers celle-ci"""
+        first = self._served is None
+        if first:
+            self.state = "loading"
+        try:
+            version, model_path = self.registry.resolve(self.backend_name, version)
+            if not model_path.exists():
+                raise FileNotFoundError(f"Modèle non trouvé: {model_path}")
+            # Pools de threads fixés avant le premier modèle du processus (un par CPU attribué si épinglé),
+            # même réglage pour les interpréteurs TFLite
+            intra_op_threads = self.intra_op_threads or (len(available_cpus()) if self.cpu_affinity else 0)
+            configure_threads(intra_op_threads, self.inter_op_threads)
+            # Import différé : TensorFlow n'est chargé qu'au chargement du modèle
+            from src.models.backends import load_backend
+            start = time.perf_counter()
+            backend = load_backend(self.backend_name, model_path, self.image_size, self.batch_buckets,
+                                   weights_dtype=self.weights_dtype, num_threads=intra_op_threads)
+            loaded = time.perf_counter()
+            self.warm_up(backend)
+            self.load_stats = {
+                "load_ms": (loaded - start) * 1000,
+                "warmup_ms": (time.perf_counter() - loaded) * 1000,
+            }
+            # Le modèle n'est servi qu'une fois préchauffé
+            self._served = ServedModel(backend, version, model_path)
+            self.state = "ready"
+            self.load_error = None
+            print(f"Modèle chargé ({self.backend_name}, version {version}): {model_path}")
+            return True
         except Exception as e:
             print(f"Erreur de chargement du modèle: {e}")
-            self.model = None
+            self.load_error = str(e)
+            # Un rechargement raté laisse l'ancien modèle en service
+            if first:
+                self.state = "failed"
+            return False
     
-    def preprocess_image(self, image_data: bytes):
-        """Préprocessing de l'image"""
-        image = Image.open(io.BytesIO(image_data))
+    def load_in_background(self) -> threading.Thread:
+        """Chargement du modèle dans un thread, le serveur répond pendant ce temps"""
+        if self._loader is None:
+            self._loader = threading.Thread(
+                target=self.load_model, args=(self.pinned_version,), name="model-loader", daemon=True
+            )
+            self._loader.start()
+        return self._loader
+    
+    def reload(self, version: str = None) -> threading.Thread:
+        """Rechargement à chaud d'une version du registre (la plus récente par défaut), sans interruption"""
+        with self._reload_lock:
+            if self.reloading is not None:
+                raise RuntimeError(f"Rechargement déjà en cours ({self.reloading})")
+            version, _ = self.registry.resolve(self.backend_name, version)
+            self.reloading = version
         
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        def run():
+            try:
+                self.load_model(version)
+            finally:
+                self.reloading = None
         
-        image = image.resize(self.image_size)
-        img_array = np.array(image)
+        thread = threading.Thread(target=run, name="model-reloader", daemon=True)
+        thread.start()
+        return thread
+    
+    def warm_up(self, backend):
+        """Quelques lots factices à chaque taille compilée avant de servir le modèle"""
+        for size in self.batch_buckets:
+            images = np.zeros((size,) + self.image_size + (3,), dtype=np.uint8)
+            for _ in range(self.warmup_rounds):
+                backend.predict(images)
+    
+    def get_model_info(self) -> dict:
+        """Version servie, rechargement en cours et versions disponibles"""
+        return {
+            "backend": self.backend_name,
+            "serving": self.model_version if self.is_loaded() else None,
+            "reloading": self.reloading,
+            "last_error": self.load_error,
+            "available": self.registry.versions(self.backend_name),
+        }
+    
+    @property
+    def model(self):
+        """Modèle Keras sous-jacent (None pour les backends exportés)"""
+        return getattr(self.backend, "model", None)
+    
+    def count_params(self) -> int:
+        backend = self.backend
+        return backend.count_params() if backend is not None else 0
+    
+    def memory_info(self) -> dict:
+        """Mémoire des poids du modèle servi et du processus qui le charge"""
+        backend = self.backend
+        return {
+            "model_version": self.model_version if backend is not None else None,
+            "weights_dtype": self.weights_dtype,
+            "weights_mb": backend.weights_bytes() / 1024 ** 2 if backend is not None else 0.0,
+            **process_memory(),
+        }
+    
+    def preprocess_image(self, image_data):
+        """Préprocessing de l'image, octets ou DecodedImage déjà analysée"""
+        img_array = prepare_image(image_data, self.image_size, draft=self.jpeg_draft)
         img_array = np.expand_dims(img_array, axis=0)
         
         return img_array
     
-    def predict(self, image_data: bytes):
-        """Prédiction"""
-        if self.model is None:
+    def preprocess_into(self, image_data, out: np.ndarray) -> np.ndarray:
+        """Préprocessing écrit directement dans out (ligne d'un tampon de lot) ; un tableau (H, W, C) déjà prêt y est copié"""
+        if isinstance(image_data, np.ndarray):
+            np.copyto(out, image_data)
+            return out
+        return prepare_image(image_data, self.image_size, draft=self.jpeg_draft, out=out)
+    
+    def preprocess_tta(self, image_data, out: np.ndarray = None) -> np.ndarray:
+        """Vues d'augmentation (image, miroir, recadrage central, miroir du recadrage) en un seul lot (écrites dans out si fourni)"""
+        return prepare_tta_views(image_data, self.image_size, draft=self.jpeg_draft, out=out)
+    
+    def predict_batch(self, images: np.ndarray, with_version: bool = False):
+        """Prédiction sur un lot (N, H, W, C), retourne les scores bruts (classe Dog)
+        
+        with_version : retourne (scores, version du modèle qui les a produits), lue avant l'inférence
+        """
+        served = self._served
+        if served is None:
             raise ValueError("Modèle non chargé")
         
-        processed_image = self.preprocess_image(image_data)
-        prediction = self.model.predict(processed_image, verbose=0)
-        score = float(prediction[0][0])
+        scores = served.backend.predict(images)
+        return (scores, served.version) if with_version else scores
+    
+    def embed_batch(self, images: np.ndarray, with_version: bool = False):
+        """Embeddings d'un lot (N, H, W, C), sortie de la couche de pooling global (N, D)"""
+        served = self._served
+        if served is None:
+            raise ValueError("Modèle non chargé")
+        
+        embeddings = served.backend.embed(images)
+        return (embeddings, served.version) if with_version else embeddings
+    
+    @staticmethod
+    def format_prediction(score: float):
+        """Mise en forme du résultat à partir du score brut"""
+        score = float(score)
         
         if score > 0.5:
             predicted_class = "Dog"
@@ -67,6 +229,12 @@ class CatDogPredictor:
             "raw_score": score
         }
     
+    def predict(self, image_data: bytes):
+        """Prédiction"""
+        processed_image = self.preprocess_image(image_data)
+        score = self.predict_batch(processed_image)[0]
+        return self.format_prediction(score)
+    
     def is_loaded(self):
         """Vérifier si le modèle est chargé"""
-        return self.model is not None
\ No newline at end of file
+        return self._served is not None
\ No newline at end of file
@@ -0,0 +1,56 @@
+import re
+import shutil
+from pathlib import Path
+
+
+def _version_key(version: str) -> tuple:
+    """Tri naturel des versions (1.10.0 après 1.9.0)"""
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"[.\-_]", version))
+
+
+class ModelRegistry:
+    """Répertoire de modèles versionnés : <root>/<version>/<artefact> (ex. 1.1.0/cats_dogs_model.keras)"""
+
+    def __init__(self, root: Path, artifact_names: dict, fallback_version: str = None, fallback_paths: dict = None):
+        self.root = Path(root)
+        self.artifact_names = artifact_names
+        # Modèle hors registre (chemin historique) servi tant que le registre est vide
+        self.fallback_version = fallback_version
+        self.fallback_paths = fallback_paths or {}
+
+    def versions(self, backend_name: str = None) -> list:
+        """Versions disponibles (triées), éventuellement limitées à celles qui ont l'artefact du backend"""
+        if not self.root.is_dir():
+            return []
+        versions = [
+            path.name for path in self.root.iterdir()
+            if path.is_dir() and (backend_name is None or (path / self.artifact_names[backend_name]).exists())
+        ]
+        return sorted(versions, key=_version_key)
+
+    def resolve(self, backend_name: str, version: str = None) -> tuple:
+        """(version, chemin de l'artefact) : version demandée, sinon la plus récente du registre"""
+        if version is not None:
+            # Seules les versions présentes dans le registre sont acceptées (jamais un chemin arbitraire)
+            if version in self.versions(backend_name):
+                return version, self.root / version / self.artifact_names[backend_name]
+            if version == self.fallback_version and backend_name in self.fallback_paths:
+                return version, Path(self.fallback_paths[backend_name])
+            raise ValueError(f"Version inconnue pour {backend_name}: {version}")
+
+        versions = self.versions(backend_name)
+        if versions:
+            return versions[-1], self.root / versions[-1] / self.artifact_names[backend_name]
+        return self.fallback_version, Path(self.fallback_paths[backend_name])
+
+    def register(self, artifact: Path, version: str, backend_name: str) -> Path:
+        """Copie d'un artefact dans le registre sous la version donnée"""
+        target = self.root / version / self.artifact_names[backend_name]
+        if target.exists():
+            raise ValueError(f"Version déjà enregistrée pour {backend_name}: {version}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Copie puis renommage : un chargement concurrent ne voit jamais d'artefact partiel
+        partial = target.with_name(target.name + ".partial")
+        shutil.copyfile(artifact, partial)
+        partial.replace(target)
+        return target
@@ -0,0 +1,177 @@
+import ctypes
+import os
+import resource
+import sys
+from pathlib import Path
+
+MB = 1024 * 1024
+
+
+class _MallInfo2(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_size_t) for name in (
+        "arena", "ordblks", "smblks", "hblks", "hblkhd", "usmblks", "fsmblks", "uordblks", "fordblks", "keepcost"
+    )]
+
+
+_threads_configured = False
+
+
+def configure_threads(intra_op_threads: int = 0, inter_op_threads: int = 0):
+    """Réglage des pools de threads TensorFlow (0 = valeur par défaut de TF)
+
+    Doit être appelé avant toute exécution d'opération TensorFlow dans le processus ;
+    seul le premier appel est pris en compte (les rechargements gardent les mêmes pools).
+    """
+    global _threads_configured
+    if _threads_configured:
+        return
+    _threads_configured = True
+
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError as e:
+        # Contexte TensorFlow déjà initialisé : les pools existants sont conservés
+        print(f"Threads TensorFlow non modifiés: {e}")
+
+
+def parse_cpu_list(value: str) -> list:
+    """Liste de CPU au format "0-3,8,10-11" """
+    cpus = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        cpus.update(range(int(start), int(end or start) + 1))
+    return sorted(cpus)
+
+
+def available_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_slice(cpus: list, index: int, count: int) -> list:
+    """Part index/count des CPU, en blocs contigus (les CPU en trop vont aux premiers processus)"""
+    size, extra = divmod(len(cpus), count)
+    if size == 0:
+        # Plus de processus que de CPU : plusieurs processus partagent un même CPU
+        return [cpus[index % len(cpus)]]
+    start = index * size + min(index, extra)
+    return cpus[start:start + size + (index < extra)]
+
+
+def claim_slot(count: int, lock_dir: Path) -> int:
+    """Index libre parmi count, réservé par un verrou de fichier tenu jusqu'à la fin du processus
+
+    Permet de répartir les CPU entre des processus lancés indépendamment (workers uvicorn).
+    """
+    import fcntl
+
+    lock_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        handle = open(lock_dir / f"cpu-slot-{index}.lock", "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _held_locks.append(handle)
+        return index
+    return os.getpid() % count
+
+
+_held_locks = []
+
+
+def pin_cpus(cpu_affinity: str, index: int = None, count: int = 1, lock_dir: Path = None):
+    """Épinglage du processus sur sa part des CPU, retourne les CPU attribués (None si indisponible)
+
+    cpu_affinity : "auto" (CPU disponibles) ou liste explicite ("0-3,8"), partagée en count
+    parts ; sans index, une part libre est réservée par verrou de fichier dans lock_dir.
+    """
+    cpus = available_cpus() if cpu_affinity == "auto" else parse_cpu_list(cpu_affinity)
+    if index is None:
+        index = claim_slot(count, lock_dir) if count > 1 and lock_dir is not None else 0
+    cpus = cpu_slice(cpus, index, count)
+    if not hasattr(os, "sched_setaffinity"):
+        print("Épinglage CPU non disponible sur cette plateforme")
+        return None
+    os.sched_setaffinity(0, cpus)
+    return cpus
+
+
+def configure_process(intra_op_threads: int = 0, inter_op_threads: int = 0, cpu_affinity: str = "",
+                      index: int = None, count: int = 1, lock_dir: Path = None) -> dict:
+    """Épinglage CPU optionnel puis pools de threads TensorFlow, avant tout chargement de modèle
+
+    Épinglé, un processus sans réglage explicite utilise un thread intra-op par CPU attribué
+    au lieu d'un par cœur de la machine.
+    """
+    cpus = pin_cpus(cpu_affinity, index, count, lock_dir) if cpu_affinity else None
+    intra_op_threads = intra_op_threads or (len(cpus) if cpus else 0)
+    configure_threads(intra_op_threads, inter_op_threads)
+    return {"cpus": cpus, "intra_op_threads": intra_op_threads, "inter_op_threads": inter_op_threads}
+
+
+def runtime_info() -> dict:
+    """CPU attribués au processus et pools de threads TensorFlow effectifs (0 = défaut de TF)"""
+    info = {"pid": os.getpid(), "cpus": available_cpus()}
+    tf = sys.modules.get("tensorflow")
+    if tf is not None:
+        info["intra_op_threads"] = tf.config.threading.get_intra_op_parallelism_threads()
+        info["inter_op_threads"] = tf.config.threading.get_inter_op_parallelism_threads()
+    return info
+
+
+def process_rss_mb(pid="self") -> dict:
+    """Mémoire résidente courante et pic d'un processus (Mo), lus dans /proc sous Linux"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line.split(":")[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        if pid != "self":
+            return {"rss_mb": None, "peak_rss_mb": None}
+        # Hors Linux : seul le pic est disponible (octets sous macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mb": None, "peak_rss_mb": peak / MB if sys.platform == "darwin" else peak / 1024}
+    return {"rss_mb": values.get("VmRSS"), "peak_rss_mb": values.get("VmHWM")}
+
+
+def allocator_info():
+    """Occupation du tas malloc (glibc mallinfo2), None si indisponible"""
+    try:
+        mallinfo2 = ctypes.CDLL("libc.so.6").mallinfo2
+    except (OSError, AttributeError):
+        return None
+    mallinfo2.restype = _MallInfo2
+    info = mallinfo2()
+    return {
+        "heap_mb": info.arena / MB,
+        "mmap_mb": info.hblkhd / MB,
+        "in_use_mb": (info.uordblks + info.hblkhd) / MB,
+        "free_mb": info.fordblks / MB,
+    }
+
+
+def process_memory() -> dict:
+    """Mémoire du processus courant : résidente, allocateur malloc et allocateurs TensorFlow des GPU"""
+    info = {"pid": os.getpid(), **process_rss_mb(), "allocator": allocator_info()}
+    # TensorFlow n'est pas importé pour autant : seuls les processus qui servent un modèle le chargent
+    tf = sys.modules.get("tensorflow")
+    if tf is not None:
+        devices = {}
+        for device in tf.config.list_logical_devices("GPU"):
+            memory = tf.config.experimental.get_memory_info(device.name)
+            devices[device.name] = {"current_mb": memory["current"] / MB, "peak_mb": memory["peak"] / MB}
+        info["devices"] = devices
+    return info
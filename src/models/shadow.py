@@ -0,0 +1,144 @@
+import queue
+import random
+import threading
+import numpy as np
+
+
+class ShadowStats:
+    """Compteurs de l'inférence fantôme et accord avec le modèle principal"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.dropped_full = 0
+        self.dropped_busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.agreements = 0
+        self.total_abs_diff = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "dropped_full": self.dropped_full,
+            "dropped_busy": self.dropped_busy,
+            "processed": self.processed,
+            "failed": self.failed,
+            "agreement": self.agreements / self.processed if self.processed else 0.0,
+            "mean_abs_diff": self.total_abs_diff / self.processed if self.processed else 0.0,
+        }
+
+
+class ShadowRunner:
+    """Inférence d'un modèle candidat sur un échantillon du trafic, hors du chemin de la réponse
+
+    Le modèle candidat est servi par le moteur créé par engine_factory au démarrage (dans l'API,
+    un processus d'inférence dédié de priorité réduite). Les requêtes sont tirées (sample) avant
+    leur prétraitement ; l'entrée (H, W, C) déjà calculée pour le modèle principal passe ensuite
+    par une file bornée, sans nouveau décodage. Les copies sont abandonnées si la file est pleine
+    ou si l'inférence principale est saturée (is_busy), vérifié au tirage puis avant chaque lot.
+    """
+
+    def __init__(self, engine_factory, write_fn, sample_rate: float = 0.1, queue_size: int = 256,
+                 batch_size: int = 16, is_busy=None):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate doit être compris entre 0 et 1")
+        self.engine_factory = engine_factory
+        self.engine = None
+        self.write_fn = write_fn
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.is_busy = is_busy
+        self.stats = ShadowStats()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self):
+        """Lancement du moteur du modèle candidat (chargé en arrière-plan) et du thread de traitement"""
+        if self.engine is None:
+            self.engine = self.engine_factory()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shadow-inference", daemon=True)
+            self._thread.start()
+
+    def is_loaded(self) -> bool:
+        return self.engine is not None and self.engine.is_loaded()
+
+    def sample(self) -> bool:
+        """Tirage d'une requête à copier vers le modèle candidat, avant son prétraitement"""
+        if not self.is_loaded() or random.random() >= self.sample_rate:
+            return False
+        if self.is_busy is not None and self.is_busy():
+            self.stats.dropped_busy += 1
+            return False
+        return True
+
+    def submit(self, task_id: str, image: np.ndarray, primary_score: float) -> bool:
+        """Copie de l'entrée (H, W, C) d'une requête déjà servie, sans jamais bloquer l'appelant"""
+        if not self.is_loaded():
+            return False
+        try:
+            self._queue.put_nowait((task_id, image, primary_score))
+        except queue.Full:
+            self.stats.dropped_full += 1
+            return False
+        self.stats.submitted += 1
+        return True
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is None
+            items = [item for item in batch if item is not None]
+            if items and self.is_busy is not None and self.is_busy():
+                # La charge a pu monter depuis la copie : le lot cède la place au trafic principal
+                self.stats.dropped_busy += len(items)
+            elif items:
+                self._process(items)
+            if stop:
+                break
+
+    def _process(self, items: list):
+        images = np.stack([image for _, image, _ in items])
+        kept = [(task_id, primary_score) for task_id, _, primary_score in items]
+
+        try:
+            scores, version = self.engine.predict_batch(images, with_version=True)
+            self.write_fn([(task_id, float(score), version) for (task_id, _), score in zip(kept, scores)])
+        except Exception as e:
+            print(f"Erreur d'inférence fantôme: {e}")
+            self.stats.failed += len(kept)
+            return
+
+        for (_, primary_score), score in zip(kept, scores):
+            self.stats.processed += 1
+            self.stats.agreements += (score > 0.5) == (primary_score > 0.5)
+            self.stats.total_abs_diff += abs(float(score) - primary_score)
+
+    def shutdown(self):
+        """Arrêt du thread (les requêtes en file sont traitées avant l'arrêt), puis du moteur"""
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=5)
+                self._thread.join(timeout=5)
+            except queue.Full:
+                pass
+        if self.engine is not None:
+            self.engine.shutdown()
+
+    def get_stats(self) -> dict:
+        return {
+            "model_version": self.engine.model_version if self.is_loaded() else None,
+            "sample_rate": self.sample_rate,
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self.stats.as_dict(),
+        }
@@ -0,0 +1,386 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from src.models.runtime import process_rss_mb
+
+# Méthodes du prédicteur exécutables dans un processus d'inférence
+METHODS = ("predict_batch", "embed_batch")
+
+
+def _load(predictor, worker_id: int, version: str, result_queue):
+    if predictor.load_model(version):
+        result_queue.put(("ready", worker_id,
+                          (predictor.count_params(), predictor.model_version, predictor.load_stats), None))
+    else:
+        result_queue.put(("failed", worker_id, predictor.load_error, None))
+
+
+def _worker_main(worker_id: int, input_queue, result_queue, intra_op_threads: int, inter_op_threads: int,
+                 version: str = None, cpu_affinity: bool = False, num_workers: int = 1, niceness: int = 0):
+    """Boucle d'un processus d'inférence : un modèle chargé par processus"""
+    if niceness:
+        # Priorité réduite (ex. modèle fantôme) : l'ordonnanceur sert d'abord les autres processus
+        os.nice(niceness)
+    from src.models.runtime import configure_process
+    # Part des CPU hérités du processus de l'API (lui-même éventuellement épinglé)
+    configure_process(intra_op_threads, inter_op_threads, "auto" if cpu_affinity else "",
+                      index=worker_id, count=num_workers)
+
+    from src.models.predictor import CatDogPredictor
+    predictor = CatDogPredictor(load=False)
+    _load(predictor, worker_id, version, result_queue)
+
+    while True:
+        item = input_queue.get()
+        if item is None:
+            break
+        if item[0] == "reload":
+            # Chargement en arrière-plan : le processus continue de servir l'ancien modèle
+            threading.Thread(target=_load, args=(predictor, worker_id, item[1], result_queue), daemon=True).start()
+            continue
+        if item[0] == "memory":
+            result_queue.put(("memory", worker_id, predictor.memory_info(), None))
+            continue
+        request_id, method, images = item
+        try:
+            # Résultat accompagné de la version qui l'a produit (rechargement progressif des processus)
+            result_queue.put(("result", request_id, getattr(predictor, method)(images, with_version=True), None))
+        except Exception as e:
+            result_queue.put(("result", request_id, None, f"{type(e).__name__}: {e}"))
+
+
+class _Request:
+    __slots__ = ("future", "method", "images", "attempts", "worker")
+
+    def __init__(self, future: Future, method: str, images: np.ndarray):
+        self.future = future
+        self.method = method
+        self.images = images
+        self.attempts = 0
+        self.worker = None
+
+
+class _Worker:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.input_queue = None
+        self.inflight = {}
+        self.completed = 0
+        self.restarts = 0
+        self.ready = False
+        self.version = None
+        # Durées du dernier chargement réussi (load_ms, warmup_ms) et dernière erreur de chargement
+        self.load_stats = {}
+        self.load_error = None
+        # Plantages consécutifs sans chargement réussi, et date du prochain redémarrage
+        self.failures = 0
+        self.restart_at = None
+        # Relevés mémoire demandés, servis dans l'ordre par le processus
+        self.memory_requests = deque()
+
+
+class InferenceWorkerPool:
+    """Pool de processus d'inférence alimenté par des files, routage vers le moins chargé"""
+
+    def __init__(self, num_workers: int, intra_op_threads: int = 0, inter_op_threads: int = 0,
+                 monitor_interval: float = 0.5, version: str = None, cpu_affinity: bool = False,
+                 max_restart_delay: float = 30.0, niceness: int = 0):
+        if num_workers < 1:
+            raise ValueError("num_workers doit être >= 1")
+        self.num_workers = num_workers
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cpu_affinity = cpu_affinity
+        self.niceness = niceness
+        self.monitor_interval = monitor_interval
+        self.max_restart_delay = max_restart_delay
+        # Version chargée par les processus (y compris après redémarrage)
+        self.target_version = version
+        self.model_version = None
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._requests = {}
+        # Lots reçus pendant qu'aucun processus n'est vivant, envoyés au prochain redémarrage
+        self._pending = deque()
+        self._params = 0
+        self._closed = False
+
+        self._workers = [_Worker(i) for i in range(num_workers)]
+        for worker in self._workers:
+            self._start(worker)
+
+        self._reader = threading.Thread(target=self._read_results, name="inference-results", daemon=True)
+        self._reader.start()
+        self._monitor = threading.Thread(target=self._watch_workers, name="inference-monitor", daemon=True)
+        self._monitor.start()
+
+    @staticmethod
+    def _close_queue(input_queue):
+        # Un lot resté dans le tampon d'un processus mort bloquerait le thread d'alimentation,
+        # et la sortie de l'interpréteur qui l'attend
+        input_queue.close()
+        input_queue.cancel_join_thread()
+
+    def _start(self, worker: _Worker):
+        if worker.input_queue is not None:
+            self._close_queue(worker.input_queue)
+        worker.input_queue = self._context.Queue()
+        worker.restart_at = None
+        worker.ready = False
+        # Les relevés en attente sur l'ancien processus expirent, sans décaler les suivants
+        worker.memory_requests.clear()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.worker_id, worker.input_queue, self._results,
+                  self.intra_op_threads, self.inter_op_threads, self.target_version,
+                  self.cpu_affinity, self.num_workers, self.niceness),
+            name=f"inference-worker-{worker.worker_id}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def submit(self, images: np.ndarray, method: str = "predict_batch") -> Future:
+        """Envoi d'un lot au processus le moins chargé, résultat (sortie, version du modèle du processus)"""
+        if method not in METHODS:
+            raise ValueError(f"Méthode inconnue: {method}")
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Pool d'inférence arrêté")
+            if all(self._failed(w) for w in self._workers):
+                raise RuntimeError(f"Aucun processus d'inférence n'a chargé le modèle: {self._workers[0].load_error}")
+            request_id = next(self._ids)
+            self._requests[request_id] = _Request(future, method, images)
+            self._dispatch(request_id)
+        return future
+
+    @staticmethod
+    def _failed(worker: _Worker) -> bool:
+        """Processus sans modèle après un échec de chargement (arrêté puis relancé par la supervision)"""
+        return worker.load_error is not None and not worker.ready
+
+    def _dispatch(self, request_id: int):
+        request = self._requests[request_id]
+        alive = [w for w in self._workers
+                 if w.restart_at is None and w.process.is_alive() and not self._failed(w)]
+        if not alive:
+            request.worker = None
+            self._pending.append(request_id)
+            return
+        worker = min(alive, key=lambda w: (not w.ready, len(w.inflight)))
+        request.attempts += 1
+        request.worker = worker
+        worker.inflight[request_id] = request
+        worker.input_queue.put((request_id, request.method, request.images))
+
+    def predict_batch(self, images: np.ndarray, with_version: bool = False):
+        """Prédiction bloquante sur un lot (interface commune avec CatDogPredictor)"""
+        scores, version = self.submit(images).result()
+        return (scores, version) if with_version else scores
+
+    def embed_batch(self, images: np.ndarray, with_version: bool = False):
+        """Embeddings bloquants d'un lot (interface commune avec CatDogPredictor)"""
+        embeddings, version = self.submit(images, "embed_batch").result()
+        return (embeddings, version) if with_version else embeddings
+
+    def _read_results(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            kind, key, payload, error = message
+            with self._lock:
+                if kind == "ready":
+                    worker = self._workers[key]
+                    worker.ready = True
+                    worker.failures = 0
+                    self._params, worker.version, worker.load_stats = payload
+                    worker.load_error = None
+                    self.model_version = worker.version
+                    continue
+                if kind == "failed":
+                    worker = self._workers[key]
+                    worker.load_error = payload
+                    # Échec d'un rechargement : l'ancien modèle reste servi. Sans modèle, le processus
+                    # est arrêté ; la supervision le relance avec l'attente croissante des plantages
+                    if not worker.ready:
+                        print(f"Échec du chargement du processus d'inférence {key}: {payload}")
+                        worker.process.terminate()
+                    continue
+                if kind == "memory":
+                    requests = self._workers[key].memory_requests
+                    future = requests.popleft() if requests else None
+                    if future is not None:
+                        future.set_result(payload)
+                    continue
+                request = self._requests.pop(key, None)
+                if request is None:
+                    continue
+                # Résultat envoyé juste avant un plantage : le lot renvoyé ou en attente est abandonné
+                if request.worker is not None:
+                    request.worker.inflight.pop(key, None)
+                    request.worker.completed += 1
+            if error is not None:
+                request.future.set_exception(RuntimeError(error))
+            else:
+                request.future.set_result(payload)
+
+    def _restart_delay(self, worker: _Worker) -> float:
+        """Attente avant redémarrage, doublée à chaque plantage sans chargement réussi"""
+        return min(self.monitor_interval * 2 ** (worker.failures - 1), self.max_restart_delay)
+
+    def _watch_workers(self):
+        while True:
+            time.sleep(self.monitor_interval)
+            failed = []
+            with self._lock:
+                if self._closed:
+                    break
+                now = time.monotonic()
+                for worker in self._workers:
+                    if worker.restart_at is not None:
+                        if now >= worker.restart_at:
+                            worker.restarts += 1
+                            self._start(worker)
+                        continue
+                    if worker.process.is_alive():
+                        continue
+                    worker.failures += 1
+                    delay = self._restart_delay(worker)
+                    print(f"Processus d'inférence {worker.worker_id} arrêté "
+                          f"(code {worker.process.exitcode}), redémarrage dans {delay:.1f} s")
+                    worker.ready = False
+                    worker.restart_at = now + delay
+                    self._close_queue(worker.input_queue)
+                    orphans = list(worker.inflight)
+                    worker.inflight.clear()
+                    # Un lot est renvoyé une seule fois : il peut être la cause du plantage
+                    for request_id in orphans:
+                        if self._requests[request_id].attempts > 1:
+                            failed.append(self._requests.pop(request_id).future)
+                        else:
+                            self._dispatch(request_id)
+                # Aucun processus ne parvient à charger le modèle : les lots en attente échouent
+                if all(self._failed(w) for w in self._workers):
+                    failed.extend(self._requests.pop(request_id).future for request_id in self._pending
+                                  if request_id in self._requests)
+                    self._pending.clear()
+                # Lots en attente d'un processus vivant
+                for _ in range(len(self._pending)):
+                    request_id = self._pending.popleft()
+                    if request_id in self._requests:
+                        self._dispatch(request_id)
+            for future in failed:
+                future.set_exception(RuntimeError("Processus d'inférence arrêté ou modèle non chargé"))
+
+    def is_loaded(self) -> bool:
+        return any(worker.ready for worker in self._workers)
+
+    def reload(self, version: str):
+        """Rechargement à chaud dans chaque processus, qui continue de servir pendant le chargement"""
+        with self._lock:
+            self.target_version = version
+            for worker in self._workers:
+                if worker.restart_at is None:
+                    worker.input_queue.put(("reload", version))
+
+    def memory_info(self, timeout: float = 5) -> list:
+        """Relevé mémoire de chaque processus (poids du modèle, mémoire résidente, allocateur)"""
+        pending = []
+        with self._lock:
+            for worker in self._workers:
+                future = Future()
+                if worker.restart_at is None:
+                    worker.memory_requests.append(future)
+                    worker.input_queue.put(("memory",))
+                else:
+                    future.set_exception(RuntimeError("Processus en redémarrage"))
+                pending.append((worker, future))
+
+        reports = []
+        for worker, future in pending:
+            try:
+                report = future.result(timeout=timeout)
+            except Exception:
+                # Processus occupé ou en redémarrage : mémoire résidente lue depuis /proc
+                report = {"pid": worker.process.pid, **process_rss_mb(worker.process.pid), "error": "Pas de réponse"}
+            reports.append({"id": worker.worker_id, **report})
+        return reports
+
+    def load_status(self) -> list:
+        """État de chargement de chaque processus : version, durées de chargement et de préchauffage, erreur"""
+        with self._lock:
+            return [
+                {
+                    "id": worker.worker_id,
+                    "ready": worker.ready,
+                    "restarting": worker.restart_at is not None,
+                    "version": worker.version,
+                    "load_error": worker.load_error,
+                    **worker.load_stats,
+                }
+                for worker in self._workers
+            ]
+
+    @property
+    def state(self) -> str:
+        if self.is_loaded():
+            return "ready"
+        return "failed" if all(self._failed(w) for w in self._workers) else "loading"
+
+    def count_params(self) -> int:
+        return self._params
+
+    def shutdown(self):
+        """Arrêt des processus et des threads de supervision"""
+        with self._lock:
+            self._closed = True
+            for worker in self._workers:
+                if worker.process.is_alive():
+                    worker.input_queue.put(None)
+            pending = [self._requests.pop(request_id).future for request_id in self._pending
+                       if request_id in self._requests]
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(RuntimeError("Pool d'inférence arrêté"))
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            self._close_queue(worker.input_queue)
+        self._results.put(None)
+        self._reader.join(timeout=5)
+        self._close_queue(self._results)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "num_workers": self.num_workers,
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "cpu_affinity": self.cpu_affinity,
+                "niceness": self.niceness,
+                "model_version": self.model_version,
+                "workers": [
+                    {
+                        "id": worker.worker_id,
+                        "pid": worker.process.pid,
+                        "alive": worker.process.is_alive(),
+                        "ready": worker.ready,
+                        "version": worker.version,
+                        "inflight": len(worker.inflight),
+                        "completed": worker.completed,
+                        "restarts": worker.restarts,
+                        "restarting": worker.restart_at is not None,
+                    }
+                    for worker in self._workers
+                ],
+            }
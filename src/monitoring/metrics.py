@@ -1,3 +1,4 @@
+import asyncio
 import csv
 import time
 from datetime import datetime
@@ -5,9 +6,94 @@ from pathlib import Path
 from functools import wraps
 import sys
 import hashlib
-from src.utils.image import analyze_image_content
+from config.settings import MODEL_CONFIG, METRICS_CONFIG
+from src.utils.image import DecodedImage, as_decoded
 from src.utils.task_id import generate_task_id
-from src.database.db import insert_image_metadata, insert_prediction, insert_feedback
+from src.database.db import insert_batch, insert_prediction_rows
+from src.database.models import ImageMetadata, PredictionLog, Feedback
+from src.monitoring.writer import make_writer
+
+
+def describe_upload(file_content, filename: str) -> dict:
+    """Hash and metadata of an uploaded image (raw bytes or a DecodedImage whose header is reused)"""
+    decoded = as_decoded(file_content, filename)
+    return {
+        # Fast MD5 hash instead of SHA256
+        'hash': hashlib.md5(decoded.file_content).hexdigest(),
+        'filename': filename,
+        **decoded.metadata()
+    }
+
+
+def describe_tensor(pixels, index: int = 0) -> dict:
+    """Hash and metadata of a raw RGB uint8 pixel buffer (H, W, 3), hashed without copy"""
+    height, width = pixels.shape[:2]
+    return {
+        'hash': hashlib.md5(pixels).hexdigest(),
+        'filename': f"tensor-{index}",
+        'width': width,
+        'height': height,
+        'color_mode': 'RGB',
+        'extension': '.raw',
+        'format': 'RAW',
+        'file_size': pixels.nbytes
+    }
+
+
+def prediction_rows(record: dict) -> tuple:
+    """Metadata, prediction log and initial feedback rows of one prediction record"""
+    image_info = record['image_info']
+    image_metadata = ImageMetadata(
+        hash=image_info['hash'],
+        filename=image_info['filename'],
+        ext_type=image_info['extension'],
+        size_w=image_info['width'],
+        size_h=image_info['height'],
+        color_mode=image_info['color_mode']
+    )
+    prediction = PredictionLog(
+        uuid=record['uuid'],
+        prob_cat=record['prediction']['p_cat'],
+        prob_dog=record['prediction']['p_dog'],
+        inference_time_ms=record['inference_time_ms'],
+        success=record['success'],
+        image_id=image_info['hash'],
+        cache_hit=record.get('cache_hit', False),
+        model_version=record.get('model_version') or MODEL_CONFIG["version"]
+    )
+    return image_metadata, prediction, Feedback(uuid=record['uuid'], grade=0)
+
+
+def log_prediction(record: dict):
+    """Logging of a single prediction, all rows in one transaction"""
+    return insert_prediction_rows(*prediction_rows(record))
+
+
+def log_batch(records: list):
+    """Bulk logging of batch predictions (metadata, prediction log and feedback rows, one transaction)"""
+    image_metadata, predictions, feedbacks = [], [], []
+    for record in records:
+        image_row, prediction, feedback = prediction_rows(record)
+        image_metadata.append(image_row)
+        predictions.append(prediction)
+        feedbacks.append(feedback)
+    return insert_batch(image_metadata, predictions, feedbacks)
+
+
+# Écriture différée en lots par un thread dédié (None : écriture synchrone sur le chemin de la requête)
+metrics_writer = make_writer(METRICS_CONFIG, log_batch)
+
+
+async def record_predictions(records: list):
+    """Queue prediction records for write-behind logging, or write them in a thread when disabled
+
+    Called from the event loop: neither the database write nor a blocking queue put runs on it.
+    """
+    if metrics_writer is None:
+        if len(records) == 1:
+            return await asyncio.to_thread(log_prediction, records[0])
+        return await asyncio.to_thread(log_batch, records)
+    return await metrics_writer.submit_many_async(records)
 
 
 def log_metrics(func):
@@ -17,6 +103,8 @@ def log_metrics(func):
         success = False
         result = None
         image_info = {}
+        cache_hit = False
+        model_version = None
         uuid = generate_task_id()
         
         try:
@@ -25,21 +113,23 @@ def log_metrics(func):
                 # Read file content ONCE
                 file_content = await file.read()
                 
-                # Fast MD5 hash instead of SHA256
-                image_hash = hashlib.md5(file_content).hexdigest()
+                # Parse the header ONCE, shared by metadata, validation and preprocessing
+                decoded_image = DecodedImage(file_content, file.filename)
                 
                 # Analyze everything from content
-                image_info = {
-                    'hash': image_hash,
-                    'filename': file.filename,
-                    **analyze_image_content(file_content, file.filename)
-                }
+                image_info = describe_upload(decoded_image, file.filename)
+                image_hash = image_info['hash']
                 
-                # Pass content to function
+                # Pass content, decoded image, hash and task id to function
                 kwargs['image_data'] = file_content
+                kwargs['decoded_image'] = decoded_image
+                kwargs['image_hash'] = image_hash
+                kwargs['task_id'] = uuid
             
             result = await func(*args, **kwargs)
             result['task_id'] = uuid
+            cache_hit = result.get('cached', False)
+            model_version = result.get('model_version')
             prediction = {
                 'p_cat': result["probabilities"]["cat"],
                 'p_dog': result["probabilities"]["dog"]
@@ -56,21 +146,16 @@ def log_metrics(func):
             end_time = time.perf_counter()
             inference_time_ms = (end_time - start_time) * 1000
             
-            insert_image_metadata(
-                hash=image_info.get('hash', None),
-                filename=image_info.get('filename', 'unknown'),
-                ext_type=image_info.get('extension', 'unknown'),
-                size_w=image_info.get('width', 0),
-                size_h=image_info.get('height', 0),
-                color_mode=image_info.get('color_mode', 0)
-            )
-            insert_prediction(
-                uuid=uuid,
-                image_id=image_info.get('hash', 'unknown'),  # MD5 hash
-                inference_time_ms=inference_time_ms,
-                success=success,
-                prediction= prediction
-            )
-            insert_feedback(uuid=uuid, grade=0)
+            # Without a readable upload there is no image row to reference: nothing to log
+            if image_info.get('hash'):
+                await record_predictions([{
+                    'uuid': uuid,
+                    'image_info': image_info,
+                    'prediction': prediction,
+                    'success': success,
+                    'cache_hit': cache_hit,
+                    'model_version': model_version,
+                    'inference_time_ms': inference_time_ms
+                }])
             
     return wrapper
\ No newline at end of file
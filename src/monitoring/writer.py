@@ -0,0 +1,211 @@
+import asyncio
+import queue
+import threading
+import time
+
+OVERFLOW_POLICIES = ("drop_new", "drop_oldest", "block")
+
+
+class _FlushRequest:
+    """Marqueur placé dans la file : le thread écrit tout ce qui le précède puis le signale"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriterStats:
+    """Compteurs de la journalisation différée"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.dropped_full = 0
+        self.dropped_closed = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.total_flush_ms = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "dropped_full": self.dropped_full,
+            "dropped_closed": self.dropped_closed,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "mean_rows_per_flush": (self.written + self.failed) / self.flushes if self.flushes else 0.0,
+            "mean_flush_ms": self.total_flush_ms / self.flushes if self.flushes else 0.0,
+        }
+
+
+class WriteBehindWriter:
+    """Écriture différée des lignes de journalisation, en lots, hors du chemin de la réponse
+
+    Les enregistrements passent par une file bornée et sont écrits par write_fn (une liste
+    d'enregistrements, une transaction) dès que flush_rows sont en attente ou flush_ms après
+    le premier d'entre eux. write_fn retourne le nombre d'enregistrements écrits (None : tous),
+    les autres sont comptés en échec. File pleine : l'enregistrement est abandonné ("drop_new"), le plus
+    ancien en file est remplacé ("drop_oldest"), ou l'appelant attend jusqu'à block_ms avant
+    abandon ("block").
+    """
+
+    def __init__(self, write_fn, queue_size: int = 10000, flush_rows: int = 200, flush_ms: float = 500,
+                 overflow: str = "drop_new", block_ms: float = 100):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {overflow} (attendu : {', '.join(OVERFLOW_POLICIES)})")
+        if flush_rows < 1:
+            raise ValueError("flush_rows doit être au moins 1")
+        self.write_fn = write_fn
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self.overflow = overflow
+        self.block_ms = block_ms
+        self.stats = WriterStats()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        """Démarrage du thread d'écriture (aussi fait au premier enregistrement)"""
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, record: dict) -> bool:
+        """Mise en file d'un enregistrement ; False s'il est abandonné"""
+        if self._closed:
+            self.stats.dropped_closed += 1
+            return False
+        if self._thread is None:
+            self.start()
+
+        if self.overflow == "block":
+            try:
+                self._queue.put(record, timeout=self.block_ms / 1000)
+            except queue.Full:
+                self.stats.dropped_full += 1
+                return False
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(record)
+                    break
+                except queue.Full:
+                    if self.overflow == "drop_new" or not self._evict_oldest():
+                        self.stats.dropped_full += 1
+                        return False
+        self.stats.submitted += 1
+        return True
+
+    def submit_many(self, records: list) -> int:
+        return sum(self.submit(record) for record in records)
+
+    async def submit_many_async(self, records: list) -> int:
+        """submit_many depuis la boucle asyncio : l'attente de la politique "block" se fait dans un thread"""
+        if self.overflow == "block":
+            return await asyncio.to_thread(self.submit_many, records)
+        return self.submit_many(records)
+
+    def _evict_oldest(self) -> bool:
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            return True
+        if isinstance(item, _FlushRequest) or item is None:
+            # Les marqueurs ne sont jamais évincés : ils repassent en fin de file
+            self._queue.put(item)
+            return False
+        self.stats.dropped_full += 1
+        return True
+
+    def _next_batch(self) -> tuple:
+        """Enregistrements jusqu'à flush_rows ou jusqu'à l'échéance, et marqueur éventuel"""
+        batch = []
+        deadline = None
+        while len(batch) < self.flush_rows:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None or isinstance(item, _FlushRequest):
+                return batch, item
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_ms / 1000
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, marker = self._next_batch()
+            if batch:
+                self._write(batch)
+            if marker is None:
+                break
+            if marker:
+                marker.done.set()
+
+    def _write(self, batch: list):
+        start = time.perf_counter()
+        try:
+            written = self.write_fn(batch)
+            written = len(batch) if written is None else written
+            self.stats.written += written
+            self.stats.failed += len(batch) - written
+        except Exception as e:
+            print(f"Erreur d'écriture des journaux: {e}")
+            self.stats.failed += len(batch)
+        self.stats.flushes += 1
+        self.stats.total_flush_ms += (time.perf_counter() - start) * 1000
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attente de l'écriture de tout ce qui est déjà en file"""
+        if self._thread is None or self._closed:
+            return True
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Vidage de la file puis arrêt du thread ; les enregistrements suivants sont abandonnés"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            "overflow": self.overflow,
+            "flush_rows": self.flush_rows,
+            "flush_ms": self.flush_ms,
+            "queue_size": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self.stats.as_dict(),
+        }
+
+
+def make_writer(config: dict, write_fn):
+    """Journalisation différée selon la configuration (None si désactivée : écriture synchrone)"""
+    if not config["write_behind"]:
+        return None
+    return WriteBehindWriter(
+        write_fn,
+        queue_size=config["queue_size"],
+        flush_rows=config["flush_rows"],
+        flush_ms=config["flush_ms"],
+        overflow=config["overflow"],
+        block_ms=config["block_ms"],
+    )
@@ -0,0 +1,61 @@
+import itertools
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
+
+
+def _is_image(name: str) -> bool:
+    path = PurePosixPath(name)
+    # Skip hidden files and macOS resource forks (__MACOSX/, ._name)
+    if path.name.startswith('.') or '__MACOSX' in path.parts:
+        return False
+    return path.suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_archive_images(fileobj, max_member_bytes: int):
+    """Yield (name, content, error) for each image of a zip or tar archive, one member at a time
+
+    Members are read sequentially from the file object without extracting to disk;
+    members larger than max_member_bytes are reported with an error instead of being read.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        return _iter_zip(zipfile.ZipFile(fileobj), max_member_bytes)
+
+    fileobj.seek(0)
+    try:
+        # Streaming mode: transparent gzip/bz2/xz decompression, no seeking back
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+    except tarfile.TarError:
+        raise ValueError("Archive non supportée (zip ou tar attendu)")
+    return _iter_tar(archive, max_member_bytes)
+
+
+def _iter_zip(archive: zipfile.ZipFile, max_member_bytes: int):
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not _is_image(info.filename):
+                continue
+            if info.file_size > max_member_bytes:
+                yield info.filename, None, "Fichier trop volumineux"
+                continue
+            yield info.filename, archive.read(info), None
+
+
+def _iter_tar(archive: tarfile.TarFile, max_member_bytes: int):
+    with archive:
+        for member in archive:
+            if member.isfile() and _is_image(member.name):
+                if member.size > max_member_bytes:
+                    yield member.name, None, "Fichier trop volumineux"
+                else:
+                    yield member.name, archive.extractfile(member).read(), None
+            # TarFile keeps every TarInfo it has seen: drop them to keep memory bounded
+            archive.members = []
+
+
+def next_chunk(iterator, size: int) -> list:
+    """Next members of an archive iterator (empty list when exhausted)"""
+    return list(itertools.islice(iterator, size))
@@ -0,0 +1,81 @@
+import random
+import resource
+import time
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter les chemins nécessaires
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from config.settings import RAW_DATA_DIR
+
+
+def measure(fn, repeat: int = 100, warmup: int = 5) -> dict:
+    """Mesure de latence (ms) d'un appel répété"""
+    for _ in range(warmup):
+        fn()
+    
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings[i] = (time.perf_counter() - start) * 1000
+    
+    return summarize(timings)
+
+
+def summarize(timings_ms) -> dict:
+    """Résumé statistique d'une série de latences (ms)"""
+    timings_ms = np.asarray(timings_ms, dtype=np.float64)
+    return {
+        "mean": float(timings_ms.mean()),
+        "p50": float(np.percentile(timings_ms, 50)),
+        "p99": float(np.percentile(timings_ms, 99)),
+        "n": int(timings_ms.size),
+    }
+
+
+def load_sample_images(limit: int = None, data_path: Path = None, seed: int = None, offset: int = 0) -> list:
+    """Chargement des images d'exemple (chemin, octets, label 0=Cat / 1=Dog)
+
+    Avec la même graine, des tranches [offset, offset + limit) distinctes sont disjointes.
+    """
+    data_path = data_path or RAW_DATA_DIR / "PetImages"
+    paths = []
+    for label, folder_name in enumerate(("Cat", "Dog")):
+        paths.extend((fpath, label) for fpath in sorted((data_path / folder_name).glob("*.jpg")))
+    
+    if seed is not None:
+        random.Random(seed).shuffle(paths)
+    paths = paths[offset:offset + limit] if limit else paths[offset:]
+    
+    return [(fpath, fpath.read_bytes(), label) for fpath, label in paths]
+
+
+def current_rss_mb() -> float:
+    """Mémoire résidente courante du processus (Mo)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Hors Linux : pic de mémoire résidente (octets sous macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def print_table(rows: list, columns: list):
+    """Affichage tabulaire des résultats de benchmark"""
+    widths = [max(len(str(c)), *(len(_format(r.get(c))) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(_format(row.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
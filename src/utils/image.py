@@ -2,52 +2,226 @@ from PIL import Image
 from io import BytesIO
 import mimetypes
 from pathlib import Path
+import numpy as np
 
-def analyze_image_content(file_content: bytes, filename: str = None):
-    """Extract image metadata from file content"""
-    try:
-        # Load image from bytes
-        image = Image.open(BytesIO(file_content))
+# Signatures of the accepted formats (first bytes of the file)
+MAGIC_BYTES = [
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+    (b'BM', 'BMP'),
+]
+
+class ImageRejected(ValueError):
+    """Upload refused before decoding, with the HTTP status to return"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def sniff_format(file_content: bytes):
+    """Image format from magic bytes (None if unknown)"""
+    for magic, image_format in MAGIC_BYTES:
+        if file_content.startswith(magic):
+            return image_format
+    if file_content[:4] == b'RIFF' and file_content[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+FORMAT_TO_EXT = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'GIF': '.gif',
+    'BMP': '.bmp',
+    'WEBP': '.webp'
+}
+
+class DecodedImage:
+    """Request-scoped view of an upload: the header is parsed once and shared by
+    validation, metadata analysis and preprocessing
+
+    The first pixel decode reuses the parsed image (draft included); later ones reopen it,
+    since a PIL image cannot be drafted again once its pixels are loaded.
+    """
+
+    def __init__(self, file_content: bytes, filename: str = None):
+        self.file_content = file_content
+        self.filename = filename
+        self._image = None
+        self._header = None
+        self._error = None
+        self._consumed = False
+        # Model-size image kept from the last decode, reused by dhash()
+        self._thumbnail = None
+
+    def _open(self):
+        return Image.open(BytesIO(self.file_content))
+
+    @property
+    def header(self) -> dict:
+        """Format, size and mode from the header (raises if the image is unreadable)"""
+        if self._header is None and self._error is None:
+            try:
+                # Image.open only parses the header, pixels are decoded lazily
+                self._image = self._open()
+                self._header = {
+                    'format': self._image.format,
+                    'width': self._image.size[0],
+                    'height': self._image.size[1],
+                    'color_mode': self._image.mode,
+                }
+            except Exception as e:
+                self._error = e
+        if self._error is not None:
+            raise self._error
+        return self._header
+
+    def _take_image(self):
+        self.header
+        if self._consumed:
+            return self._open()
+        self._consumed = True
+        return self._image
+
+    def check(self, formats: list, max_bytes: int, max_pixels: int) -> dict:
+        """Cheap gate before any pixel decode: file size, magic bytes, then header dimensions"""
+        if len(self.file_content) > max_bytes:
+            raise ImageRejected(f"Fichier trop volumineux ({len(self.file_content)} octets > {max_bytes})", 413)
         
-        # Get resolution (width, height)
-        width, height = image.size
+        image_format = sniff_format(self.file_content)
+        if image_format not in formats:
+            raise ImageRejected("Format d'image invalide")
         
-        # Get color mode
-        color_mode = image.mode  # 'RGB', 'RGBA', 'L' (grayscale), 'CMYK', etc.
+        try:
+            header = self.header
+        except Image.DecompressionBombError:
+            raise ImageRejected("Dimensions de l'image trop grandes", 413)
+        except Exception:
+            raise ImageRejected("Image illisible")
+        width, height = header['width'], header['height']
+        if width * height > max_pixels:
+            raise ImageRejected(f"Dimensions de l'image trop grandes ({width}x{height})", 413)
         
-        # Get format/extension
-        image_format = image.format  # 'JPEG', 'PNG', 'GIF', etc.
+        return {'format': image_format, 'width': width, 'height': height}
+
+    def metadata(self) -> dict:
+        """Image metadata as stored in ImageMetadata (defaults if the image is unreadable)"""
+        try:
+            header = self.header
+        except Exception:
+            # Return defaults if image analysis fails
+            return {
+                'width': 0,
+                'height': 0,
+                'color_mode': 'unknown',
+                'extension': Path(self.filename).suffix.lower() if self.filename else '.unknown',
+                'format': 'unknown',
+                'file_size': len(self.file_content)
+            }
         
         # Extension from filename or format
-        if filename:
-            extension = Path(filename).suffix.lower()
+        if self.filename:
+            extension = Path(self.filename).suffix.lower()
         else:
-            # Map format to extension
-            format_to_ext = {
-                'JPEG': '.jpg',
-                'PNG': '.png', 
-                'GIF': '.gif',
-                'BMP': '.bmp',
-                'WEBP': '.webp'
-            }
-            extension = format_to_ext.get(image_format, '.unknown')
+            extension = FORMAT_TO_EXT.get(header['format'], '.unknown')
         
         return {
-            'width': width,
-            'height': height,
-            'color_mode': color_mode,
+            'width': header['width'],
+            'height': header['height'],
+            'color_mode': header['color_mode'],
             'extension': extension,
-            'format': image_format,
-            'file_size': len(file_content)
+            'format': header['format'],
+            'file_size': len(self.file_content)
         }
+
+    def to_array(self, size: tuple, draft: bool = True, out: np.ndarray = None) -> np.ndarray:
+        """RGB uint8 array (H, W, 3) at the model input size
+
+        When out is given (e.g. a row of a pooled batch buffer), pixels are written into it and out is returned.
+        """
+        image = self._take_image()
         
-    except Exception as e:
-        # Return defaults if image analysis fails
-        return {
-            'width': 0,
-            'height': 0,
-            'color_mode': 'unknown',
-            'extension': Path(filename).suffix.lower() if filename else '.unknown',
-            'format': 'unknown',
-            'file_size': len(file_content)
-        }
\ No newline at end of file
+        if draft and image.format == 'JPEG':
+            # DCT-domain downscaling (1/2, 1/4, 1/8): decode at the smallest scale still >= size
+            image.draft('RGB', size)
+        
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        image = self._thumbnail = image.resize(size)
+        if out is None:
+            return np.asarray(image)
+        # PIL stores RGB padded to 4 bytes per pixel: np.asarray unpacks it into a transient
+        # bytes object (freed right away), then a single copy lands in out. No array outlives the call.
+        out[...] = np.asarray(image)
+        return out
+
+    def to_tta_views(self, size: tuple, draft: bool = True, crop_ratio: float = 0.875,
+                     out: np.ndarray = None) -> np.ndarray:
+        """Test-time augmentation views (4, H, W, 3) from a single decode
+
+        Views: full image, its horizontal flip, a centered crop (crop_ratio of each side) and its flip.
+        When out is given (e.g. a pooled buffer), views are written into it and out is returned.
+        """
+        image = self._take_image()
+        
+        if draft and image.format == 'JPEG':
+            # The crop must still be at least the model input size after DCT downscaling
+            image.draft('RGB', tuple(int(side / crop_ratio) + 1 for side in size))
+        
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        width, height = image.size
+        crop_w, crop_h = width * crop_ratio, height * crop_ratio
+        left, top = (width - crop_w) / 2, (height - crop_h) / 2
+        
+        self._thumbnail = image.resize(size)
+        full = np.asarray(self._thumbnail)
+        crop = np.asarray(image.resize(size, box=(left, top, left + crop_w, top + crop_h)))
+        if out is None:
+            return np.stack([full, full[:, ::-1], crop, crop[:, ::-1]])
+        out[0], out[1], out[2], out[3] = full, full[:, ::-1], crop, crop[:, ::-1]
+        return out
+
+    def dhash(self, hash_size: int = 8) -> int:
+        """Perceptual difference hash, from the model-size thumbnail when pixels are already decoded"""
+        image = self._thumbnail
+        if image is None:
+            image = self._take_image()
+            if image.format == 'JPEG':
+                image.draft('L', (hash_size + 1, hash_size))
+        return dhash(image, hash_size)
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Difference hash: hash_size² bits, one per horizontal gradient sign of a grayscale thumbnail
+
+    Resized or re-encoded copies of a picture land within a few bits (Hamming distance).
+    """
+    pixels = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+def as_decoded(image_data, filename: str = None) -> DecodedImage:
+    """Wrap raw bytes in a DecodedImage, pass an existing one through"""
+    if isinstance(image_data, DecodedImage):
+        return image_data
+    return DecodedImage(image_data, filename)
+
+def check_upload(file_content: bytes, formats: list, max_bytes: int, max_pixels: int) -> dict:
+    """Cheap gate before any pixel decode: file size, magic bytes, then header dimensions"""
+    return DecodedImage(file_content).check(formats, max_bytes, max_pixels)
+
+def prepare_image(file_content: bytes, size: tuple, draft: bool = True, out: np.ndarray = None) -> np.ndarray:
+    """Decode image bytes into an RGB uint8 array (H, W, 3) at the model input size, written into out if given"""
+    return as_decoded(file_content).to_array(size, draft=draft, out=out)
+
+def prepare_tta_views(file_content: bytes, size: tuple, draft: bool = True, crop_ratio: float = 0.875,
+                      out: np.ndarray = None) -> np.ndarray:
+    """Decode image bytes once into test-time augmentation views (4, H, W, 3), written into out if given"""
+    return as_decoded(file_content).to_tta_views(size, draft=draft, crop_ratio=crop_ratio, out=out)
+
+def analyze_image_content(file_content: bytes, filename: str = None):
+    """Extract image metadata from file content"""
+    return DecodedImage(file_content, filename).metadata()
@@ -71,6 +71,15 @@ class TestAPIEndpoints:
         data = response.json()
         assert "status" in data
         assert data["status"] == "healthy"
+        assert data["model_state"] in ["idle", "loading", "ready", "failed"]
+    
+    def test_ready_endpoint(self):
+        """Test du endpoint /ready (200 seulement une fois le modèle préchauffé)"""
+        response = requests.get(f"{BASE_URL}/ready")
+        assert response.status_code in [200, 503]
+        
+        health = requests.get(f"{BASE_URL}/health").json()
+        assert (response.status_code == 200) == health["model_loaded"]
     
     def test_root_endpoint(self):
         """Test de la page d'accueil"""
@@ -96,6 +105,16 @@ class TestAPIEndpoints:
         assert "model_loaded" in data
         assert "version" in data
         assert data["version"] == "1.0.0"
+    
+    def test_api_stats_endpoint(self):
+        """Test du endpoint /api/stats"""
+        response = requests.get(f"{BASE_URL}/api/stats")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "batching" in data
+        assert "max_batch_size" in data["batching"]
+        assert "queue_wait_ms" in data["batching"]
 
 class TestAuthentication:
     """Tests d'authentification"""
@@ -170,6 +189,58 @@ class TestPrediction:
         assert "cat" in probs
         assert "dog" in probs
     
+    def test_prediction_with_tta(self, test_image):
+        """Test de prédiction avec augmentation au moment du test"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        
+        with open(test_image, "rb") as f:
+            files = {"file": (test_image.name, f, "image/jpeg")}
+            response = requests.post(
+                f"{BASE_URL}/api/predict",
+                params={"tta": "true"},
+                files=files,
+                headers=headers,
+                timeout=30
+            )
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["tta"] is True
+        assert data["prediction"] in ["Cat", "Dog"]
+        assert data["probabilities"]["cat"] + data["probabilities"]["dog"] == pytest.approx(1.0)
+    
+    def test_embedding_and_neighbors(self, test_image):
+        """Une image indexée est retrouvée comme quasi-doublon d'elle-même"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        
+        with open(test_image, "rb") as f:
+            files = {"file": (test_image.name, f, "image/jpeg")}
+            response = requests.post(f"{BASE_URL}/api/embed", files=files, headers=headers, timeout=30)
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert len(data["embedding"]) == 128
+        
+        response = requests.get(
+            f"{BASE_URL}/api/embed/{data['image_hash']}/neighbors",
+            params={"k": 3},
+            headers=headers,
+            timeout=30
+        )
+        if response.status_code == 404:
+            pytest.skip("Index des embeddings désactivé")
+        
+        assert response.status_code == 200
+        assert len(response.json()["neighbors"]) <= 3
+    
     def test_prediction_with_invalid_file(self):
         """Test avec un fichier non-image"""
         headers = {"Authorization": f"Bearer {TOKEN}"}
@@ -184,6 +255,22 @@ class TestPrediction:
         
         assert response.status_code == 400
     
+    def test_prediction_with_spoofed_content_type(self):
+        """Test avec un type annoncé image/jpeg mais un contenu qui n'est pas une image"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        
+        files = {"file": ("fake.jpg", b"Ceci n'est pas une image", "image/jpeg")}
+        response = requests.post(
+            f"{BASE_URL}/api/predict", 
+            files=files, 
+            headers=headers
+        )
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 400
+    
     def test_prediction_consistency(self, test_image):
         """Test de cohérence - image de chat devrait prédire Chat"""
         headers = {"Authorization": f"Bearer {TOKEN}"}
@@ -211,6 +298,144 @@ class TestPrediction:
         print(f"Prédiction: {data['prediction']}")
         print(f"Confiance: {data['confidence']}")
 
+class TestBatchPrediction:
+    """Tests de prédiction par lot"""
+    
+    def test_batch_prediction(self, test_image):
+        """Plusieurs fichiers dans une requête, un résultat par fichier"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        content = test_image.read_bytes()
+        files = [
+            ("files", (test_image.name, content, "image/jpeg")),
+            ("files", (test_image.name, content, "image/jpeg")),
+            ("files", ("test.txt", b"Ceci n'est pas une image", "text/plain")),
+        ]
+        response = requests.post(
+            f"{BASE_URL}/api/predict/batch",
+            files=files,
+            headers=headers,
+            timeout=60
+        )
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["count"] == 3
+        assert data["succeeded"] == 2
+        
+        results = data["results"]
+        assert [r["filename"] for r in results] == [test_image.name, test_image.name, "test.txt"]
+        assert len({r["task_id"] for r in results}) == 3
+        assert results[0]["prediction"] == results[1]["prediction"]
+        assert results[0]["prediction"] in ["Cat", "Dog"]
+        assert "error" in results[2]
+    
+    def test_archive_prediction(self, test_image):
+        """Une archive zip est diffusée en NDJSON, une ligne par image puis un résumé"""
+        import io
+        import json
+        import zipfile
+        
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("a/cat.jpg", test_image.read_bytes())
+            archive.writestr("b/cat.jpg", test_image.read_bytes())
+            archive.writestr("readme.txt", b"ignore")
+        
+        response = requests.post(
+            f"{BASE_URL}/api/predict/archive",
+            files={"file": ("images.zip", buffer.getvalue(), "application/zip")},
+            headers=headers,
+            stream=True,
+            timeout=60
+        )
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        lines = [json.loads(line) for line in response.iter_lines() if line]
+        assert [line["filename"] for line in lines[:-1]] == ["a/cat.jpg", "b/cat.jpg"]
+        assert all(line["prediction"] in ["Cat", "Dog"] for line in lines[:-1])
+        assert lines[-1]["summary"] == {"count": 2, "succeeded": 2}
+    
+    def test_archive_prediction_invalid_archive(self):
+        """Un fichier qui n'est pas une archive est refusé"""
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        response = requests.post(
+            f"{BASE_URL}/api/predict/archive",
+            files={"file": ("images.zip", b"pas une archive" * 100, "application/zip")},
+            headers=headers
+        )
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        
+        assert response.status_code == 400
+    
+    def test_raw_tensor_prediction(self, test_image):
+        """Des pixels bruts donnent la même prédiction que l'image encodée"""
+        import numpy as np
+        from PIL import Image
+        
+        headers = {"Authorization": f"Bearer {TOKEN}"}
+        pixels = np.asarray(Image.open(test_image).convert("RGB").resize((128, 128)), dtype=np.uint8)
+        batch = np.stack([pixels, pixels[:, ::-1]])
+        
+        single = requests.post(
+            f"{BASE_URL}/api/predict/raw",
+            data=pixels.tobytes(),
+            headers={**headers, "Content-Type": "application/octet-stream", "X-Tensor-Shape": "128,128,3"},
+            timeout=30
+        )
+        if single.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        response = requests.post(
+            f"{BASE_URL}/api/predict/raw",
+            data=batch.tobytes(),
+            headers={**headers, "Content-Type": "application/octet-stream", "X-Tensor-Shape": "2,128,128,3"},
+            timeout=30
+        )
+        
+        assert single.status_code == 200
+        assert single.json()["prediction"] in ["Cat", "Dog"]
+        assert response.status_code == 200
+        data = response.json()
+        assert data["count"] == data["succeeded"] == 2
+        assert data["results"][0]["probabilities"]["dog"] == pytest.approx(single.json()["probabilities"]["dog"], abs=1e-5)
+    
+    @pytest.mark.parametrize("shape,size,status", [
+        ("128,128,3", 100, 400),
+        ("64,64,3", 64 * 64 * 3, 400),
+        (None, 128 * 128 * 3, 400),
+    ])
+    def test_raw_tensor_invalid(self, shape, size, status):
+        """Forme absente, différente du modèle ou incompatible avec la taille du corps"""
+        headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/octet-stream"}
+        if shape:
+            headers["X-Tensor-Shape"] = shape
+        response = requests.post(f"{BASE_URL}/api/predict/raw", data=bytes(size), headers=headers, timeout=30)
+        
+        if response.status_code == 503:
+            pytest.skip("Modèle non disponible")
+        assert response.status_code == status
+    
+    def test_batch_prediction_without_auth(self, test_image):
+        """Test de prédiction par lot sans authentification"""
+        with open(test_image, "rb") as f:
+            response = requests.post(
+                f"{BASE_URL}/api/predict/batch",
+                files=[("files", (test_image.name, f, "image/jpeg"))]
+            )
+        
+        assert response.status_code in [401, 403]
+
 class TestAPIResponseFormat:
     """Tests du format des réponses API"""
     
@@ -394,6 +619,7 @@ class TestFeedback:
     ("/info", 200),
     ("/inference", 200),
     ("/api/info", 200),
+    ("/api/stats", 200),
     ("/docs", 200),
 ])
 def test_endpoints_status(endpoint, expected_status):
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests pytest de la lecture d'archives d'images"""
+
+import io
+import tarfile
+import zipfile
+import pytest
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils.archive import iter_archive_images, next_chunk
+
+MEMBERS = {
+    "cats/1.jpg": b"jpeg-1",
+    "dogs/2.PNG": b"png-2",
+    "notes.txt": b"pas une image",
+    "__MACOSX/cats/._1.jpg": b"resource fork",
+    "big.jpg": b"x" * 64,
+}
+
+
+def make_zip() -> io.BytesIO:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in MEMBERS.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar(mode: str = "w:gz") -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, content in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+class TestArchiveImages:
+    """Tests de l'itération sur les membres d'une archive"""
+
+    @pytest.mark.parametrize("make_archive", [make_zip, make_tar, lambda: make_tar("w")])
+    def test_only_images_are_read(self, make_archive):
+        """Seules les images sont lues, les membres trop volumineux sont signalés"""
+        members = list(iter_archive_images(make_archive(), max_member_bytes=32))
+
+        assert members == [
+            ("cats/1.jpg", b"jpeg-1", None),
+            ("dogs/2.PNG", b"png-2", None),
+            ("big.jpg", None, "Fichier trop volumineux"),
+        ]
+
+    def test_unsupported_archive(self):
+        """Un fichier qui n'est pas une archive est refusé"""
+        with pytest.raises(ValueError):
+            iter_archive_images(io.BytesIO(b"ceci n'est pas une archive" * 100), max_member_bytes=32)
+
+    def test_next_chunk(self):
+        """Les membres sont consommés par paquets"""
+        members = iter_archive_images(make_tar(), max_member_bytes=1024)
+
+        assert len(next_chunk(members, 2)) == 2
+        assert len(next_chunk(members, 2)) == 1
+        assert next_chunk(members, 2) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Tests pytest de l'ordonnanceur de regroupement d'inférence"""
+
+import asyncio
+import time
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.batcher import MicroBatcher
+from src.models.executor import InferenceExecutor
+from src.models.buffers import BufferPool
+
+
+class FakeModel:
+    """Modèle factice enregistrant la taille des lots reçus"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, images):
+        self.batch_sizes.append(len(images))
+        # Le score encode la valeur du premier pixel pour vérifier le routage
+        return images[:, 0, 0, 0].astype(np.float32) / 255
+
+
+def make_image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+class TestMicroBatcher:
+    """Tests du regroupement dynamique"""
+
+    def test_single_request(self):
+        """Une requête isolée est traitée après max_wait_ms"""
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=1)
+
+        score = asyncio.run(batcher.submit(make_image(51)))
+
+        assert score == pytest.approx(0.2)
+        assert model.batch_sizes == [1]
+
+    def test_version_of_the_batch(self):
+        """with_version : chaque requête reçoit la version du modèle qui a calculé son lot"""
+        model = FakeModel()
+        versions = iter(["1.0.0", "1.1.0"])
+        batcher = MicroBatcher(lambda images: (model(images), next(versions)),
+                               max_batch_size=2, max_wait_ms=50, with_version=True)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(make_image(v)) for v in (51, 102, 153)))
+
+        results = asyncio.run(run())
+
+        assert [version for _, version in results] == ["1.0.0", "1.0.0", "1.1.0"]
+        assert [score for score, _ in results] == pytest.approx([0.2, 0.4, 0.6])
+
+    def test_concurrent_requests_are_batched(self):
+        """Les requêtes concurrentes partagent une seule passe du modèle"""
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=50)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(make_image(v)) for v in range(8)))
+
+        scores = asyncio.run(run())
+
+        assert model.batch_sizes == [8]
+        assert scores == pytest.approx([v / 255 for v in range(8)])
+
+    def test_max_batch_size_is_respected(self):
+        """Les lots ne dépassent jamais max_batch_size"""
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=20)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(make_image(v)) for v in range(10)))
+
+        scores = asyncio.run(run())
+
+        assert max(model.batch_sizes) <= 4
+        assert sum(model.batch_sizes) == 10
+        assert scores == pytest.approx([v / 255 for v in range(10)])
+
+    def test_errors_are_propagated(self):
+        """Une erreur du modèle est renvoyée à toutes les requêtes du lot"""
+        def failing_model(images):
+            raise ValueError("Modèle non chargé")
+
+        batcher = MicroBatcher(failing_model, max_batch_size=4, max_wait_ms=10)
+
+        async def run():
+            return await asyncio.gather(
+                *(batcher.submit(make_image(v)) for v in range(3)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_stats(self):
+        """Les statistiques reflètent les lots exécutés"""
+        model = FakeModel()
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=20)
+
+        async def run():
+            await asyncio.gather(*(batcher.submit(make_image(v)) for v in range(4)))
+
+        asyncio.run(run())
+        stats = batcher.get_stats()
+
+        assert stats["total_requests"] == 4
+        assert stats["total_batches"] == 1
+        assert stats["mean_batch_size"] == 4
+        assert stats["batch_size_histogram"] == {"4": 1}
+        assert stats["queue_wait_ms"]["max"] >= 0
+
+    def test_invalid_batch_size(self):
+        """Une taille de lot nulle est refusée"""
+        with pytest.raises(ValueError):
+            MicroBatcher(FakeModel(), max_batch_size=0)
+
+
+class TestInferenceExecutor:
+    """Tests de l'exécution hors de la boucle asyncio"""
+
+    def test_event_loop_stays_responsive(self):
+        """Une tâche bloquante ne bloque pas les autres coroutines"""
+        executor = InferenceExecutor(max_workers=2)
+
+        async def run():
+            started = time.perf_counter()
+            blocking = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+            await asyncio.sleep(0.01)
+            responsive_after = time.perf_counter() - started
+            await blocking
+            return responsive_after
+
+        responsive_after = asyncio.run(run())
+        executor.shutdown()
+
+        assert responsive_after < 0.2
+
+    def test_concurrency_is_bounded(self):
+        """Jamais plus de max_workers tâches simultanées"""
+        executor = InferenceExecutor(max_workers=2)
+        running = []
+        peak = []
+
+        def task():
+            running.append(1)
+            peak.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+
+        async def run():
+            await asyncio.gather(*(executor.run(task) for _ in range(6)))
+
+        asyncio.run(run())
+        executor.shutdown()
+
+        assert max(peak) <= 2
+
+    def test_batcher_with_executor(self):
+        """Le regroupement fonctionne avec l'inférence déportée"""
+        model = FakeModel()
+        executor = InferenceExecutor(max_workers=2)
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=20, executor=executor)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(make_image(v)) for v in range(8)))
+
+        scores = asyncio.run(run())
+        executor.shutdown()
+
+        assert scores == pytest.approx([v / 255 for v in range(8)])
+        assert sum(model.batch_sizes) == 8
+        assert batcher.get_stats()["max_inflight"] == 2
+
+
+class TestBufferPool:
+    """Tests des tampons préalloués"""
+
+    def test_acquire_release_reuses_buffers(self):
+        """Un tampon rendu est réutilisé, le pool ne bloque jamais"""
+        pool = BufferPool(1, (4, 4, 3))
+        first = pool.acquire()
+        extra = pool.acquire()
+        pool.release(first)
+        pool.release(extra)
+
+        assert pool.acquire() is first
+        stats = pool.get_stats()
+        assert stats["misses"] == 1
+        assert stats["free"] == 0
+
+    def test_batcher_assembles_into_pooled_buffer(self):
+        """Les lots sont assemblés dans un tampon du pool, rendu après l'inférence"""
+        model = FakeModel()
+        pool = BufferPool(1, (8, 4, 4, 3))
+        buffer = pool.acquire()
+        pool.release(buffer)
+        inputs = []
+        batcher = MicroBatcher(lambda images: inputs.append(images) or model(images),
+                               max_batch_size=8, max_wait_ms=20, buffer_pool=pool)
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(make_image(v)) for v in range(5)))
+
+        scores = asyncio.run(run())
+
+        assert scores == pytest.approx([v / 255 for v in range(5)])
+        assert np.shares_memory(inputs[0], buffer)
+        stats = pool.get_stats()
+        assert stats["free"] == 1
+        assert stats["misses"] == 0
+
+    def test_fill_into_rows_and_pad_in_buffer(self):
+        """fill_fn écrit chaque élément dans sa ligne, le lot est complété dans le même tampon"""
+        model = FakeModel()
+        pool = BufferPool(1, (8, 4, 4, 3))
+        buffer = pool.acquire()
+        buffer[:] = 255
+        pool.release(buffer)
+        inputs = []
+        executor = InferenceExecutor(max_workers=2)
+
+        def fill(value, out):
+            if value is None:
+                raise ValueError("image illisible")
+            out[...] = value
+
+        batcher = MicroBatcher(lambda images: inputs.append(images.copy()) or model(images),
+                               max_batch_size=8, max_wait_ms=20, buffer_pool=pool,
+                               fill_fn=fill, fill_executor=executor, batch_buckets=[1, 2, 4, 8])
+
+        async def run():
+            return await asyncio.gather(*(batcher.submit(v) for v in (51, None, 102)), return_exceptions=True)
+
+        first, failed, third = asyncio.run(run())
+        executor.shutdown()
+
+        assert (first, third) == (pytest.approx(0.2), pytest.approx(0.4))
+        assert isinstance(failed, ValueError)
+        # Lot de 3 complété à 4 : la ligne en échec et la ligne de complétion sont nulles
+        assert model.batch_sizes == [4]
+        assert [int(row[0, 0, 0]) for row in inputs[0]] == [51, 0, 102, 0]
+        assert pool.get_stats()["misses"] == 0
+
+    def test_copy_of_model_input(self):
+        """copy_to reçoit l'entrée du modèle telle qu'écrite dans le tampon du lot"""
+        pool = BufferPool(1, (4, 4, 4, 3))
+        batcher = MicroBatcher(FakeModel(), max_batch_size=4, max_wait_ms=1, buffer_pool=pool,
+                               fill_fn=lambda value, out: out.fill(value))
+        copy = np.zeros((4, 4, 3), dtype=np.uint8)
+
+        score = asyncio.run(batcher.submit(51, copy_to=copy))
+
+        assert score == pytest.approx(0.2)
+        assert (copy == 51).all()
+
+    def test_fill_requires_buffer_pool(self):
+        """fill_fn sans tampons de lot est refusé"""
+        with pytest.raises(ValueError):
+            MicroBatcher(FakeModel(), fill_fn=lambda item, out: None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Tests pytest du cache de prédictions"""
+
+import asyncio
+import random
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.cache import PredictionCache, BKTree, NearDuplicateCache, hamming, make_cache, make_near_duplicate_cache
+
+
+class TestPredictionCache:
+    """Tests de l'éviction LRU/TTL et des compteurs"""
+
+    def test_hit_and_miss(self):
+        """Un score enregistré est retrouvé, les compteurs suivent"""
+        cache = PredictionCache(max_entries=4)
+
+        assert cache.get("abc", "1.0.0") is None
+        cache.set("abc", "1.0.0", 0.8)
+
+        assert cache.get("abc", "1.0.0") == pytest.approx(0.8)
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    def test_key_includes_model_version(self):
+        """Un changement de version du modèle invalide le cache"""
+        cache = PredictionCache()
+        cache.set("abc", "1.0.0", 0.8)
+
+        assert cache.get("abc", "2.0.0") is None
+
+    def test_lru_eviction(self):
+        """L'entrée la moins récemment utilisée est évincée"""
+        cache = PredictionCache(max_entries=2)
+        cache.set("a", "v", 0.1)
+        cache.set("b", "v", 0.2)
+        cache.get("a", "v")
+        cache.set("c", "v", 0.3)
+
+        assert len(cache) == 2
+        assert cache.get("b", "v") is None
+        assert cache.get("a", "v") == pytest.approx(0.1)
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration(self):
+        """Les entrées expirées ne sont plus servies"""
+        cache = PredictionCache(ttl_seconds=0.05)
+        cache.set("a", "v", 0.1)
+        time.sleep(0.1)
+
+        assert cache.get("a", "v") is None
+        assert len(cache) == 0
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_async_access(self):
+        """get_async/set_async (utilisés par l'API) partagent les entrées et les compteurs"""
+        cache = PredictionCache(max_entries=4)
+
+        async def run():
+            await cache.set_async("abc", "1.0.0", 0.8)
+            return await cache.get_async("abc", "1.0.0")
+
+        assert asyncio.run(run()) == pytest.approx(0.8)
+        assert cache.get("abc", "1.0.0") == pytest.approx(0.8)
+        assert cache.get_stats()["hits"] == 2
+
+    def test_make_cache(self):
+        """Le cache désactivé ou inconnu est géré par la configuration"""
+        config = {"enabled": False, "backend": "memory", "max_entries": 10, "ttl_seconds": 1, "redis_url": ""}
+        assert make_cache(config) is None
+
+        assert isinstance(make_cache({**config, "enabled": True}), PredictionCache)
+        with pytest.raises(ValueError):
+            make_cache({**config, "enabled": True, "backend": "memcached"})
+
+
+
+class TestNearDuplicateCache:
+    """Tests de l'arbre BK et de la réutilisation des scores de quasi-doublons"""
+
+    def test_bk_tree_matches_brute_force(self):
+        """L'arbre BK trouve la même distance minimale qu'un parcours exhaustif"""
+        rng = random.Random(0)
+        hashes = [rng.getrandbits(64) for _ in range(500)]
+        tree = BKTree()
+        for i, value in enumerate(hashes):
+            tree.add(value, i)
+
+        for _ in range(50):
+            query = rng.choice(hashes) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+            best = min(hamming(query, value) for value in hashes)
+            match = tree.search(query, max_distance=4)
+            if best <= 4:
+                assert match[0] == best
+                assert hamming(query, hashes[match[1]]) == best
+            else:
+                assert match is None
+
+    def test_reuse_within_distance(self):
+        """Un hash à distance <= max_distance réutilise le score, les compteurs suivent"""
+        cache = NearDuplicateCache(max_distance=2)
+        cache.set(0b1111, "1.0.0", 0.9)
+
+        assert cache.get(0b1100, "1.0.0") == pytest.approx(0.9)
+        assert cache.get(0b0000, "1.0.0") is None
+        assert cache.get(0b1111, "2.0.0") is None
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_oldest_evicted_when_full(self):
+        """Au-delà de max_entries, seule l'entrée la plus ancienne est évincée"""
+        cache = NearDuplicateCache(max_distance=0, max_entries=2)
+        cache.set(1, "v", 0.1)
+        cache.set(2, "v", 0.2)
+        cache.set(4, "v", 0.4)
+
+        assert len(cache) == 2
+        assert cache.get(1, "v") is None
+        assert cache.get(2, "v") == pytest.approx(0.2)
+        assert cache.get(4, "v") == pytest.approx(0.4)
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_ttl_expiration(self):
+        """Les entrées expirées ne sont plus servies, une entrée plus récente reste trouvée"""
+        cache = NearDuplicateCache(max_distance=2, ttl_seconds=0.05)
+        cache.set(0b1111, "v", 0.9)
+        time.sleep(0.1)
+        cache.set(0b0111, "v", 0.7)
+
+        assert cache.get(0b1110, "v") == pytest.approx(0.7)
+        assert len(cache) == 1
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_bk_tree_remove(self):
+        """Un hash supprimé n'est plus trouvé, ses descendants le restent"""
+        tree = BKTree()
+        for value in range(16):
+            tree.add(value, value)
+        for value in range(0, 16, 2):
+            assert tree.remove(value)
+
+        assert not tree.remove(0)
+        assert len(tree) == 8
+        assert tree.search(0, max_distance=0) is None
+        assert all(tree.search(value, max_distance=0) == (0, value) for value in range(1, 16, 2))
+
+    def test_make_near_duplicate_cache(self):
+        """Désactivé avec le cache ou par PREDICTION_CACHE_PHASH"""
+        config = {"enabled": True, "max_entries": 10, "ttl_seconds": 60, "phash": True, "phash_distance": 3}
+        assert make_near_duplicate_cache(config).max_distance == 3
+        assert make_near_duplicate_cache({**config, "phash": False}) is None
+        assert make_near_duplicate_cache({**config, "enabled": False}) is None
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
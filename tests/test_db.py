@@ -17,9 +17,11 @@ import os
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+from src.database import db
 from src.database.db import (
     make_engine, create_tables, drop_tables, insert,
-    insert_feedback, update_feedback, insert_image_metadata, insert_prediction
+    insert_feedback, update_feedback, insert_image_metadata, insert_prediction, insert_batch,
+    insert_prediction_rows, update_shadow_predictions
 )
 from src.database.models import Feedback, ImageMetadata, PredictionLog, get_utc_timestamp
 
@@ -40,6 +42,132 @@ def get_test_engine():
     
     return create_engine(test_db_url, echo=True)
 
+class TestEngine:
+    """Tests du moteur unique par processus"""
+
+    def test_engine_is_shared(self):
+        """make_engine renvoie le même moteur (et le même pool) à chaque appel"""
+        assert make_engine() is make_engine()
+
+    def test_dispose_creates_new_engine(self):
+        """Après dispose_engine, un nouveau moteur est créé au prochain usage"""
+        engine = make_engine()
+        db.dispose_engine()
+        assert make_engine() is not engine
+
+    def test_pool_options(self):
+        """Taille du pool, débordement et journalisation SQL viennent de DB_CONFIG"""
+        options = db.engine_options(db.db_url)
+        if db.db_url.get_backend_name() != "sqlite":
+            assert options["pool_size"] == db.DB_CONFIG["pool_size"]
+            assert options["max_overflow"] == db.DB_CONFIG["max_overflow"]
+        assert options["echo"] == db.DB_CONFIG["echo"]
+
+
+class TestImageMetadataUpsert:
+    """Tests de l'upsert natif (ON CONFLICT DO NOTHING), sur la base SQLite de substitution"""
+    
+    @pytest.fixture
+    def sqlite_engine(self):
+        from sqlalchemy.pool import StaticPool
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        with patch('src.database.db.make_engine', return_value=engine):
+            create_tables()
+            yield engine
+    
+    @staticmethod
+    def image(image_hash: str, filename: str = "upsert.jpg") -> ImageMetadata:
+        return ImageMetadata(hash=image_hash, filename=filename, ext_type=".jpg", size_w=64, size_h=64, color_mode="RGB")
+    
+    def test_repeated_hash_is_ignored(self, sqlite_engine):
+        """Un hash répété n'écrase pas la ligne existante et ne lève pas d'erreur"""
+        insert(self.image("test_upsert", "original.jpg"))
+        insert(self.image("test_upsert", "duplicate.jpg"))
+        
+        with Session(sqlite_engine) as session:
+            rows = session.execute(text("SELECT filename FROM imagemetadata WHERE hash = 'test_upsert'")).all()
+        assert [row.filename for row in rows] == ["original.jpg"]
+    
+    def test_bulk_upsert_counts_new_rows(self, sqlite_engine):
+        """En lot : une seule instruction, seuls les hashes nouveaux sont insérés"""
+        insert(self.image("test_known"))
+        
+        inserted = insert_batch(
+            image_metadata=[self.image(h) for h in ("test_known", "test_new", "test_new")],
+            predictions=[
+                PredictionLog(uuid=f"test_upsert_{i}", prob_cat=0.5, prob_dog=0.5, inference_time_ms=1.0,
+                              success=True, image_id=h)
+                for i, h in enumerate(("test_known", "test_new", "test_new"))
+            ],
+            feedbacks=[Feedback(uuid=f"test_upsert_{i}", grade=0) for i in range(3)]
+        )
+        
+        assert inserted == 3
+        with Session(sqlite_engine) as session:
+            assert session.execute(text("SELECT COUNT(*) FROM imagemetadata")).scalar() == 2
+            assert session.execute(text("SELECT COUNT(*) FROM predictionlog")).scalar() == 3
+    
+    def test_bulk_insert_retries_rows_one_by_one(self, sqlite_engine):
+        """Un uuid déjà enregistré fait refuser le lot : les autres prédictions sont écrites une par une"""
+        insert_prediction_rows(
+            self.image("test_retry_known"),
+            PredictionLog(uuid="test_retry_dup", prob_cat=0.5, prob_dog=0.5, inference_time_ms=1.0,
+                          success=True, image_id="test_retry_known")
+        )
+        
+        uuids = ["test_retry_0", "test_retry_dup", "test_retry_1"]
+        hashes = ["test_retry_a", "test_retry_b", "test_retry_c"]
+        inserted = insert_batch(
+            image_metadata=[self.image(h) for h in hashes],
+            predictions=[
+                PredictionLog(uuid=u, prob_cat=0.5, prob_dog=0.5, inference_time_ms=1.0, success=True, image_id=h)
+                for u, h in zip(uuids, hashes)
+            ],
+            feedbacks=[Feedback(uuid=u, grade=0) for u in uuids]
+        )
+        
+        assert inserted == 2
+        with Session(sqlite_engine) as session:
+            images = session.execute(text("SELECT hash FROM imagemetadata ORDER BY hash")).scalars().all()
+            feedbacks = session.execute(text("SELECT COUNT(*) FROM feedback")).scalar()
+        assert images == ["test_retry_a", "test_retry_c", "test_retry_known"]
+        assert feedbacks == 3
+    
+    def test_shadow_scores_bulk_update(self, sqlite_engine):
+        """Scores fantômes écrits par un seul UPDATE, les uuid inconnus sont ignorés"""
+        insert_batch(
+            image_metadata=[self.image("test_shadow")],
+            predictions=[
+                PredictionLog(uuid=f"test_shadow_{i}", prob_cat=0.5, prob_dog=0.5, inference_time_ms=1.0,
+                              success=True, image_id="test_shadow")
+                for i in range(2)
+            ],
+            feedbacks=[]
+        )
+        
+        statements = []
+        from sqlalchemy import event
+        event.listen(sqlite_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        update_shadow_predictions([("test_shadow_0", 0.9, "2.0.0"), ("test_shadow_1", 0.1, "2.0.0"),
+                                   ("unknown", 0.5, "2.0.0")])
+        
+        assert sum(statement.startswith("UPDATE") for statement in statements) == 1
+        with Session(sqlite_engine) as session:
+            rows = session.execute(text(
+                "SELECT uuid, shadow_prob_dog, shadow_model_version FROM predictionlog ORDER BY uuid"
+            )).all()
+        assert [tuple(row) for row in rows] == [("test_shadow_0", 0.9, "2.0.0"), ("test_shadow_1", 0.1, "2.0.0")]
+    
+    def test_postgresql_statement(self):
+        """Sur PostgreSQL, l'insertion compile en INSERT ... ON CONFLICT (hash) DO NOTHING"""
+        from sqlalchemy.dialects import postgresql
+        statement = db.UPSERT_INSERTS["postgresql"](ImageMetadata).values(
+            hash="h", filename="f", ext_type=".jpg", size_w=1, size_h=1, color_mode="RGB"
+        ).on_conflict_do_nothing(index_elements=["hash"])
+        assert "ON CONFLICT (hash) DO NOTHING" in str(statement.compile(dialect=postgresql.dialect()))
+
+
 class TestTableCreation:
     """Tests de création de tables uniquement"""
     
@@ -585,6 +713,124 @@ class TestPredictionLogInsert:
                 
                 print("✓ Failed prediction log handled correctly")
     
+    def test_insert_prediction_cache_hit(self, setup_tables):
+        """Test d'insertion d'une prédiction servie par le cache"""
+        engine = setup_tables
+        
+        with patch('src.database.db.make_engine', return_value=engine):
+            test_uuid = "test_pred_cache_hit"
+            
+            insert_prediction(
+                uuid=test_uuid,
+                image_id=self.test_image_data["hash"],
+                inference_time_ms=1.5,
+                success=True,
+                prediction={"p_cat": 0.7, "p_dog": 0.3},
+                cache_hit=True
+            )
+            
+            with Session(engine) as session:
+                row = session.execute(
+                    text("SELECT * FROM predictionlog WHERE uuid = :uuid"),
+                    {"uuid": test_uuid}
+                ).fetchone()
+                
+                assert row is not None
+                assert row.cache_hit is True
+                
+                print("✓ Cache hit flag stored correctly")
+    
+    def test_insert_batch(self, setup_tables):
+        """Test d'insertion groupée d'un lot (images connues et répétées dédupliquées)"""
+        engine = setup_tables
+        
+        with patch('src.database.db.make_engine', return_value=engine):
+            hashes = [self.test_image_data["hash"], "test_batch_image", "test_batch_image"]
+            uuids = [f"test_batch_{i}" for i in range(len(hashes))]
+            
+            inserted = insert_batch(
+                image_metadata=[
+                    ImageMetadata(hash=h, filename="batch.jpg", ext_type=".jpg", size_w=64, size_h=64, color_mode="RGB")
+                    for h in hashes
+                ],
+                predictions=[
+                    PredictionLog(uuid=u, prob_cat=0.4, prob_dog=0.6, inference_time_ms=10.0, success=True, image_id=h)
+                    for u, h in zip(uuids, hashes)
+                ],
+                feedbacks=[Feedback(uuid=u, grade=0) for u in uuids]
+            )
+            
+            assert inserted == len(uuids)
+            
+            with Session(engine) as session:
+                count = session.execute(
+                    text("SELECT COUNT(*) FROM predictionlog WHERE uuid LIKE 'test_batch_%'")
+                ).scalar()
+                images = session.execute(
+                    text("SELECT COUNT(*) FROM imagemetadata WHERE hash = 'test_batch_image'")
+                ).scalar()
+                feedbacks = session.execute(
+                    text("SELECT COUNT(*) FROM feedback WHERE uuid LIKE 'test_batch_%'")
+                ).scalar()
+                
+                assert count == len(uuids)
+                assert images == 1
+                assert feedbacks == len(uuids)
+                
+                print(f"✓ Batch of {count} predictions inserted in one transaction")
+    
+    def test_insert_prediction_rows(self, setup_tables):
+        """Test de l'unité de travail : image (upsert), journal et feedback initial en une transaction"""
+        engine = setup_tables
+        
+        with patch('src.database.db.make_engine', return_value=engine):
+            for i, image_hash in enumerate(["test_uow_image", "test_uow_image", self.test_image_data["hash"]]):
+                result = insert_prediction_rows(
+                    ImageMetadata(hash=image_hash, filename="uow.jpg", ext_type=".jpg", size_w=64, size_h=64, color_mode="RGB"),
+                    PredictionLog(uuid=f"test_uow_{i}", prob_cat=0.3, prob_dog=0.7, inference_time_ms=5.0,
+                                  success=True, image_id=image_hash)
+                )
+                assert result is not None
+            
+            with Session(engine) as session:
+                predictions = session.execute(
+                    text("SELECT COUNT(*) FROM predictionlog WHERE uuid LIKE 'test_uow_%'")
+                ).scalar()
+                images = session.execute(
+                    text("SELECT COUNT(*) FROM imagemetadata WHERE hash = 'test_uow_image'")
+                ).scalar()
+                grades = session.execute(
+                    text("SELECT grade FROM feedback WHERE uuid LIKE 'test_uow_%'")
+                ).scalars().all()
+                
+                assert predictions == 3
+                assert images == 1
+                assert grades == [0, 0, 0]
+    
+    def test_insert_prediction_rows_is_atomic(self, setup_tables):
+        """Test qu'un échec n'écrit aucune des lignes (pas d'image orpheline)"""
+        engine = setup_tables
+        
+        with patch('src.database.db.make_engine', return_value=engine):
+            # uuid déjà utilisé : le journal est refusé, l'image ne doit pas être écrite non plus
+            insert_prediction_rows(
+                ImageMetadata(hash="test_uow_first", filename="uow.jpg", ext_type=".jpg", size_w=64, size_h=64, color_mode="RGB"),
+                PredictionLog(uuid="test_uow_dup", prob_cat=0.3, prob_dog=0.7, inference_time_ms=5.0,
+                              success=True, image_id="test_uow_first")
+            )
+            result = insert_prediction_rows(
+                ImageMetadata(hash="test_uow_orphan", filename="uow.jpg", ext_type=".jpg", size_w=64, size_h=64, color_mode="RGB"),
+                PredictionLog(uuid="test_uow_dup", prob_cat=0.3, prob_dog=0.7, inference_time_ms=5.0,
+                              success=True, image_id="test_uow_orphan")
+            )
+            
+            assert result is None
+            with Session(engine) as session:
+                images = session.execute(
+                    text("SELECT COUNT(*) FROM imagemetadata WHERE hash = 'test_uow_orphan'")
+                ).scalar()
+                assert images == 0
+    
     def test_insert_prediction_missing_image(self, setup_tables):
         """Test d'insertion avec image_id inexistant (devrait être géré par rollback)"""
         engine = setup_tables
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Tests pytest de l'index des embeddings"""
+
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.embeddings import EmbeddingIndex, make_index
+
+
+@pytest.fixture(scope="module")
+def clustered():
+    """Vecteurs regroupés autour de 20 centres, comme des images proches"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    return np.concatenate([center + 0.1 * rng.normal(size=(50, 32)) for center in centers]).astype(np.float32)
+
+
+def fill(index: EmbeddingIndex, vectors: np.ndarray) -> EmbeddingIndex:
+    for i, vector in enumerate(vectors):
+        index.add(str(i), vector)
+    return index
+
+
+class TestEmbeddingIndex:
+    """Tests de la recherche exacte, approchée et de la persistance"""
+
+    def test_exact_search(self, clustered):
+        """Le plus proche voisin d'un vecteur indexé est lui-même, les scores sont décroissants"""
+        index = fill(EmbeddingIndex(), clustered)
+
+        results = index.search(clustered[7], k=5)
+
+        assert len(index) == len(clustered)
+        assert results[0][0] == "7"
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+    def test_exclude_and_duplicates(self, clustered):
+        """Une clé déjà indexée n'est pas ajoutée deux fois et peut être écartée des résultats"""
+        index = fill(EmbeddingIndex(), clustered[:10])
+
+        assert not index.add("3", clustered[3])
+        assert len(index) == 10
+        assert "3" not in [key for key, _ in index.search(clustered[3], k=3, exclude="3")]
+
+    def test_ivf_recall(self, clustered):
+        """La recherche approchée retrouve l'essentiel des voisins exacts"""
+        exact = fill(EmbeddingIndex(), clustered)
+        ivf = fill(EmbeddingIndex(mode="ivf", n_lists=16, n_probe=4), clustered)
+
+        assert ivf.trained
+        recall = np.mean([
+            len({k for k, _ in exact.search(q, k=10)} & {k for k, _ in ivf.search(q, k=10)}) / 10
+            for q in clustered[::25]
+        ])
+        assert recall >= 0.9
+
+    @pytest.mark.parametrize("mode", ["exact", "ivf"])
+    def test_save_and_load(self, clustered, tmp_path, mode):
+        """L'index relu en memmap donne les mêmes résultats et accepte de nouveaux vecteurs"""
+        index = fill(EmbeddingIndex(mode=mode, n_lists=16, model_version="1.0.0"), clustered)
+        index.save(tmp_path)
+
+        loaded = EmbeddingIndex.load(tmp_path)
+
+        assert isinstance(loaded._vectors, np.memmap)
+        assert loaded.model_version == "1.0.0"
+        assert loaded.search(clustered[3], k=5) == index.search(clustered[3], k=5)
+        assert loaded.add("new", clustered[0] * 2)
+        assert loaded.search(clustered[0], k=2)[0][1] == pytest.approx(1.0, abs=1e-5)
+
+    def test_reset_on_version_change(self, clustered):
+        """Les embeddings d'une autre version du modèle sont écartés"""
+        index = fill(EmbeddingIndex(model_version="1.0.0"), clustered[:10])
+        index.reset("2.0.0")
+
+        assert len(index) == 0
+        assert index.search(clustered[0]) == []
+
+    def test_make_index(self, tmp_path):
+        """Index désactivé, neuf ou relu depuis le disque selon la configuration"""
+        config = {"enabled": True, "path": tmp_path, "mode": "exact", "n_lists": 64, "n_probe": 8}
+        assert make_index({**config, "enabled": False}) is None
+        assert len(make_index(config)) == 0
+
+        fill(EmbeddingIndex(), np.eye(4)).save(tmp_path)
+        assert len(make_index(config)) == 4
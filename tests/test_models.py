@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""Tests pytest du modèle de classification"""
+
+import itertools
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+import pytest
+import sys
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+from PIL import Image
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.predictor import CatDogPredictor
+from src.models.backends import load_backend
+from src.models.exporter import CatDogExporter
+from src.models.workers import InferenceWorkerPool, _Worker
+from src.models.registry import ModelRegistry
+from src.utils.benchmark import load_sample_images
+from src.utils.image import prepare_image, prepare_tta_views, check_upload, analyze_image_content, DecodedImage, ImageRejected
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    """Prédicteur chargé une seule fois pour le module"""
+    predictor = CatDogPredictor()
+    if not predictor.is_loaded():
+        pytest.skip("Modèle non disponible")
+    return predictor
+
+
+@pytest.fixture(scope="module")
+def sample_batch(predictor):
+    """Lot d'images d'exemple prétraitées"""
+    samples = load_sample_images()
+    if not samples:
+        pytest.skip("Aucune image d'exemple")
+    return np.concatenate([predictor.preprocess_image(data) for _, data, _ in samples])
+
+
+class TestPredictor:
+    """Tests du prédicteur"""
+
+    def test_preprocess_shape(self, predictor, sample_batch):
+        """Le prétraitement produit des tenseurs uint8 de la taille du modèle"""
+        assert sample_batch.dtype == np.uint8
+        assert sample_batch.shape[1:] == predictor.image_size + (3,)
+
+    def test_compiled_path_matches_keras_predict(self, predictor, sample_batch):
+        """Le chemin compilé donne les mêmes scores que model.predict"""
+        expected = predictor.model.predict(sample_batch, verbose=0)[:, 0]
+        scores = predictor.predict_batch(sample_batch)
+
+        np.testing.assert_allclose(scores, expected, atol=1e-5)
+
+    @pytest.mark.parametrize("size", [1, 3, 5])
+    def test_padding_does_not_change_scores(self, predictor, sample_batch, size):
+        """La complétion jusqu'au bucket n'affecte pas les scores"""
+        images = sample_batch[:size]
+        scores = predictor.predict_batch(images)
+        single = [predictor.predict_batch(image[None])[0] for image in images]
+
+        assert scores.shape == (size,)
+        np.testing.assert_allclose(scores, single, atol=1e-5)
+
+    def test_batch_larger_than_max_bucket(self, predictor, sample_batch):
+        """Les lots plus grands que le plus grand bucket sont découpés"""
+        repeats = predictor.batch_buckets[-1] // len(sample_batch) + 2
+        images = np.concatenate([sample_batch] * repeats)
+        scores = predictor.predict_batch(images)
+
+        assert scores.shape == (len(images),)
+        np.testing.assert_allclose(scores[:len(sample_batch)], scores[-len(sample_batch):], atol=1e-5)
+
+    def test_embeddings(self, predictor, sample_batch):
+        """Embeddings de la couche de pooling global, indépendants de la complétion du lot"""
+        embeddings = predictor.embed_batch(sample_batch)
+        single = predictor.embed_batch(sample_batch[:1])
+
+        assert embeddings.shape == (len(sample_batch), 128)
+        np.testing.assert_allclose(single[0], embeddings[0], atol=1e-5)
+
+    def test_predict_result_format(self, predictor):
+        """Format du résultat de prédiction"""
+        _, data, _ = load_sample_images(limit=1)[0]
+        result = predictor.predict(data)
+
+        assert result["prediction"] in ["Cat", "Dog"]
+        assert result["probabilities"]["cat"] + result["probabilities"]["dog"] == pytest.approx(1.0)
+        assert 0.5 <= result["confidence"] <= 1.0
+
+
+class TestStartup:
+    """Tests du chargement différé du modèle"""
+
+    def test_predictor_import_does_not_load_tensorflow(self):
+        """L'import du prédicteur n'importe pas TensorFlow"""
+        code = "import sys; import src.models.predictor; assert 'tensorflow' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, check=True)
+
+    def test_background_loading(self, predictor):
+        """Le modèle chargé en arrière-plan n'est servi qu'une fois préchauffé"""
+        background = CatDogPredictor(load=False)
+        assert background.state == "idle"
+        assert not background.is_loaded()
+
+        background.load_in_background().join(timeout=120)
+
+        assert background.state == "ready"
+        assert background.is_loaded()
+        assert background.load_stats["warmup_ms"] > 0
+
+
+class TestHotReload:
+    """Tests du rechargement à chaud depuis le registre"""
+
+    def test_reload_swaps_model_without_interruption(self, sample_batch, tmp_path):
+        """Le nouveau modèle est servi après préchauffage, l'ancien sert pendant le chargement"""
+        predictor = CatDogPredictor()
+        old_backend, old_version = predictor.backend, predictor.model_version
+        predictor.registry = ModelRegistry(
+            tmp_path / "registry", predictor.registry.artifact_names,
+            fallback_version=old_version, fallback_paths={predictor.backend_name: predictor.model_path},
+        )
+        predictor.registry.register(predictor.model_path, "9.0.0", predictor.backend_name)
+        expected = predictor.predict_batch(sample_batch)
+
+        thread = predictor.reload()
+        assert predictor.reloading == "9.0.0"
+        np.testing.assert_allclose(predictor.predict_batch(sample_batch), expected, atol=1e-5)
+        thread.join(timeout=120)
+
+        assert predictor.reloading is None
+        assert predictor.model_version == "9.0.0"
+        assert predictor.backend is not old_backend
+        np.testing.assert_allclose(predictor.predict_batch(sample_batch), expected, atol=1e-5)
+
+        with pytest.raises(ValueError):
+            predictor.reload("0.0.0-inconnue")
+        assert predictor.model_version == "9.0.0"
+
+
+class TestDraftDecoding:
+    """Tests du décodage JPEG à résolution réduite"""
+
+    @staticmethod
+    def encode(image: Image.Image, format: str) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format=format)
+        return buffer.getvalue()
+
+    @pytest.mark.parametrize("format", ["JPEG", "PNG"])
+    def test_draft_matches_full_decode(self, format):
+        """Un grand JPEG décodé en mode réduit reste proche du décodage complet"""
+        gradient = np.linspace(0, 255, 3000, dtype=np.uint8)
+        pixels = np.stack([np.tile(gradient, (2000, 1)), np.tile(gradient[:2000, None], (1, 3000)),
+                           np.full((2000, 3000), 128, dtype=np.uint8)], axis=-1)
+        data = self.encode(Image.fromarray(pixels), format)
+
+        full = prepare_image(data, (128, 128), draft=False)
+        draft = prepare_image(data, (128, 128), draft=True)
+
+        assert draft.shape == full.shape == (128, 128, 3)
+        assert draft.dtype == np.uint8
+        assert np.abs(draft.astype(np.int16) - full).mean() < 2.0
+
+    def test_draft_preserves_predictions(self, predictor):
+        """Le décodage réduit ne change pas la classe prédite sur les images d'exemple"""
+        samples = load_sample_images()
+        if not samples:
+            pytest.skip("Aucune image d'exemple")
+        full = np.stack([prepare_image(data, predictor.image_size, draft=False) for _, data, _ in samples])
+        draft = np.stack([prepare_image(data, predictor.image_size, draft=True) for _, data, _ in samples])
+
+        expected = predictor.predict_batch(full)
+        scores = predictor.predict_batch(draft)
+
+        np.testing.assert_array_equal(scores > 0.5, expected > 0.5)
+        np.testing.assert_allclose(scores, expected, atol=0.1)
+
+
+class TestTTA:
+    """Tests de l'augmentation au moment du test"""
+
+    def test_views(self):
+        """Quatre vues à la taille du modèle, la deuxième est le miroir de la première"""
+        pixels = np.random.default_rng(0).integers(0, 256, (300, 400, 3), dtype=np.uint8)
+        data = TestDraftDecoding.encode(Image.fromarray(pixels), "PNG")
+
+        views = prepare_tta_views(data, (128, 128))
+
+        assert views.shape == (4, 128, 128, 3)
+        assert views.dtype == np.uint8
+        np.testing.assert_array_equal(views[1], views[0][:, ::-1])
+        np.testing.assert_array_equal(views[3], views[2][:, ::-1])
+        np.testing.assert_array_equal(views[0], prepare_image(data, (128, 128)))
+
+    def test_tta_scores_single_batch(self, predictor):
+        """Les vues passent en un seul lot, la moyenne reste une probabilité"""
+        _, data, _ = load_sample_images(limit=1)[0]
+        views = predictor.preprocess_tta(data)
+        scores = predictor.predict_batch(views)
+
+        assert scores.shape == (4,)
+        result = predictor.format_prediction(scores.mean())
+        assert result["probabilities"]["cat"] + result["probabilities"]["dog"] == pytest.approx(1.0)
+
+
+class TestUploadGate:
+    """Tests du contrôle des fichiers avant décodage"""
+
+    FORMATS = ["JPEG", "PNG"]
+
+    def check(self, data: bytes, max_bytes: int = 1024 * 1024, max_pixels: int = 10_000):
+        return check_upload(data, formats=self.FORMATS, max_bytes=max_bytes, max_pixels=max_pixels)
+
+    def test_header_is_read(self):
+        """Format et dimensions sont lus dans l'en-tête"""
+        data = TestDraftDecoding.encode(Image.new("RGB", (40, 30)), "PNG")
+
+        assert self.check(data) == {"format": "PNG", "width": 40, "height": 30}
+
+    @pytest.mark.parametrize("data", [b"Ceci n'est pas une image", b"GIF89a" + b"\0" * 32])
+    def test_unsupported_format(self, data):
+        """Une signature inconnue ou non acceptée est refusée"""
+        with pytest.raises(ImageRejected) as error:
+            self.check(data)
+        assert error.value.status_code == 400
+
+    def test_truncated_header(self):
+        """Une signature valide sans en-tête lisible est refusée"""
+        with pytest.raises(ImageRejected) as error:
+            self.check(b"\x89PNG\r\n\x1a\n" + b"\0" * 8)
+        assert error.value.status_code == 400
+
+    def test_oversize_file(self):
+        """Un fichier trop volumineux est refusé avant la lecture de l'en-tête"""
+        data = TestDraftDecoding.encode(Image.new("RGB", (40, 30)), "PNG")
+        with pytest.raises(ImageRejected) as error:
+            self.check(data, max_bytes=len(data) - 1)
+        assert error.value.status_code == 413
+
+    def test_decompression_bomb(self):
+        """Des dimensions démesurées sont refusées sans décoder les pixels"""
+        data = TestDraftDecoding.encode(Image.new("L", (400, 300)), "PNG")
+        with pytest.raises(ImageRejected) as error:
+            self.check(data, max_pixels=400 * 300 - 1)
+        assert error.value.status_code == 413
+
+
+class TestDecodedImage:
+    """Tests de l'image analysée une seule fois par requête"""
+
+    def test_single_header_parse(self, monkeypatch):
+        """Contrôle, métadonnées et tenseur partagent une seule ouverture de l'image"""
+        data = TestDraftDecoding.encode(Image.new("RGB", (400, 300), (200, 10, 10)), "JPEG")
+        decoded = DecodedImage(data, "chat.jpg")
+        opens = []
+        original_open = Image.open
+        monkeypatch.setattr(Image, "open", lambda *args: opens.append(args) or original_open(*args))
+
+        check = decoded.check(formats=["JPEG"], max_bytes=len(data), max_pixels=400 * 300)
+        metadata = decoded.metadata()
+        array = decoded.to_array((128, 128))
+
+        assert len(opens) == 1
+        assert check == {"format": "JPEG", "width": 400, "height": 300}
+        # Les dimensions d'origine sont conservées malgré le décodage réduit
+        assert metadata == analyze_image_content(data, "chat.jpg")
+        assert (metadata["width"], metadata["height"]) == (400, 300)
+        np.testing.assert_array_equal(array, prepare_image(data, (128, 128)))
+
+    def test_second_decode_reopens(self):
+        """Un second décodage repart des octets et donne le même résultat"""
+        data = TestDraftDecoding.encode(Image.new("RGB", (400, 300), (10, 200, 10)), "JPEG")
+        decoded = DecodedImage(data)
+
+        first = decoded.to_array((128, 128))
+        views = decoded.to_tta_views((128, 128))
+
+        np.testing.assert_array_equal(views, prepare_tta_views(data, (128, 128)))
+        np.testing.assert_array_equal(decoded.to_array((128, 128)), first)
+
+    def test_dhash_near_duplicates(self):
+        """Une copie redimensionnée et réencodée reste proche, une autre image est loin"""
+        rng = np.random.default_rng(0)
+        smooth = np.kron(rng.integers(0, 256, (12, 16, 3), dtype=np.uint8), np.ones((25, 25, 1), dtype=np.uint8))
+        image = Image.fromarray(smooth)
+        original = DecodedImage(TestDraftDecoding.encode(image, "PNG"))
+        copy = DecodedImage(TestDraftDecoding.encode(image.resize((200, 150)), "JPEG"))
+        other = DecodedImage(TestDraftDecoding.encode(image.transpose(Image.FLIP_LEFT_RIGHT), "PNG"))
+
+        original.to_array((128, 128))
+        distance = lambda a, b: bin(a.dhash() ^ b.dhash()).count("1")
+
+        assert distance(original, copy) <= 4
+        assert distance(original, other) > 10
+
+    def test_unreadable_metadata_defaults(self):
+        """Une image illisible garde les métadonnées par défaut"""
+        metadata = DecodedImage(b"pas une image", "photo.PNG").metadata()
+
+        assert metadata["format"] == "unknown"
+        assert metadata["extension"] == ".png"
+        assert (metadata["width"], metadata["height"]) == (0, 0)
+
+
+class TestTFLiteBackend:
+    """Tests de l'export et du backend TFLite"""
+
+    def test_tflite_matches_keras(self, predictor, sample_batch, tmp_path):
+        """Le modèle TFLite float32 reproduit les scores Keras"""
+        model_path = CatDogExporter(predictor.model_path).export_tflite(tmp_path / "model.tflite")
+        backend = load_backend("tflite", model_path, predictor.image_size, predictor.batch_buckets)
+
+        expected = predictor.predict_batch(sample_batch)
+        scores = backend.predict(sample_batch)
+
+        assert scores.shape == expected.shape
+        np.testing.assert_allclose(scores, expected, atol=1e-4)
+
+    def test_int8_matches_keras(self, predictor, sample_batch, tmp_path, monkeypatch):
+        """Le modèle quantifié int8, calibré sur quelques images, reste proche des scores Keras"""
+        exporter = CatDogExporter(predictor.model_path)
+        # Calibration sur les images d'exemple plutôt que sur le jeu PetImages complet
+        monkeypatch.setattr(exporter, "calibration_images", lambda num_samples: sample_batch[:num_samples])
+        model_path = exporter.export_tflite(tmp_path / "model_int8.tflite", quantize=True, num_calibration=8)
+        backend = load_backend("tflite", model_path, predictor.image_size, predictor.batch_buckets)
+
+        expected = predictor.predict_batch(sample_batch)
+        scores = backend.predict(sample_batch)
+
+        assert scores.shape == expected.shape
+        np.testing.assert_allclose(scores, expected, atol=0.1)
+        assert np.abs(scores - expected).mean() < 0.05
+
+    def test_unknown_backend(self, predictor):
+        """Un backend inconnu est refusé"""
+        with pytest.raises(ValueError):
+            load_backend("onnx", predictor.model_path, predictor.image_size, predictor.batch_buckets)
+
+
+class TestHalfPrecision:
+    """Tests des poids en demi-précision"""
+
+    @pytest.mark.parametrize("dtype", ["float16", "bfloat16"])
+    def test_half_precision_parity(self, predictor, sample_batch, dtype):
+        """Poids deux fois plus légers, scores proches et mêmes classes qu'en float32"""
+        backend = load_backend("keras", predictor.model_path, predictor.image_size, predictor.batch_buckets,
+                               weights_dtype=dtype)
+
+        expected = predictor.predict_batch(sample_batch)
+        scores = backend.predict(sample_batch)
+
+        assert scores.dtype == np.float32
+        assert backend.weights_bytes() == predictor.backend.weights_bytes() // 2
+        np.testing.assert_allclose(scores, expected, atol=0.05)
+        np.testing.assert_array_equal(scores > 0.5, expected > 0.5)
+
+    def test_unknown_weights_dtype(self, predictor):
+        """Un type de poids inconnu ou non applicable est refusé"""
+        with pytest.raises(ValueError):
+            load_backend("keras", predictor.model_path, predictor.image_size, predictor.batch_buckets,
+                         weights_dtype="int4")
+        with pytest.raises(ValueError):
+            load_backend("tflite", predictor.model_path, predictor.image_size, predictor.batch_buckets,
+                         weights_dtype="float16")
+
+    def test_memory_info(self, predictor):
+        """Relevé mémoire du processus et des poids du modèle servi"""
+        info = predictor.memory_info()
+
+        assert info["weights_mb"] > 0
+        assert info["rss_mb"] is None or info["rss_mb"] > info["weights_mb"]
+
+
+class TestInferenceWorkerPool:
+    """Tests du pool de processus d'inférence"""
+
+    @staticmethod
+    def wait_ready(pool, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if all(w["ready"] for w in pool.get_stats()["workers"]):
+                return
+            time.sleep(0.2)
+        pytest.fail("Processus d'inférence non prêts")
+
+    def test_pool_predictions_and_restart(self, predictor, sample_batch):
+        """Le pool reproduit les scores et redémarre un processus arrêté"""
+        pool = InferenceWorkerPool(num_workers=2, intra_op_threads=1, inter_op_threads=1)
+        try:
+            self.wait_ready(pool)
+            assert all(status["warmup_ms"] > 0 for status in pool.load_status())
+            expected = predictor.predict_batch(sample_batch)
+            np.testing.assert_allclose(pool.predict_batch(sample_batch), expected, atol=1e-5)
+
+            pid = pool.get_stats()["workers"][0]["pid"]
+            os.kill(pid, signal.SIGKILL)
+            # Les requêtes continuent d'être servies pendant le redémarrage
+            np.testing.assert_allclose(pool.predict_batch(sample_batch), expected, atol=1e-5)
+
+            self.wait_ready(pool)
+            worker = pool.get_stats()["workers"][0]
+            assert worker["restarts"] == 1
+            assert worker["pid"] != pid
+        finally:
+            pool.shutdown()
+
+    def test_restart_backoff(self):
+        """Un processus qui plante au chargement est relancé avec une attente croissante, bornée"""
+        pool = InferenceWorkerPool.__new__(InferenceWorkerPool)
+        pool.monitor_interval = 0.5
+        pool.max_restart_delay = 4.0
+        worker = _Worker(0)
+
+        delays = []
+        for failures in range(1, 6):
+            worker.failures = failures
+            delays.append(pool._restart_delay(worker))
+
+        assert delays == [0.5, 1.0, 2.0, 4.0, 4.0]
+
+    @staticmethod
+    def message_pool(messages: list) -> InferenceWorkerPool:
+        """Pool sans processus, alimenté par des messages simulés"""
+        class FakeProcess:
+            terminated = False
+
+            def is_alive(self):
+                return not self.terminated
+
+            def terminate(self):
+                self.terminated = True
+
+        pool = InferenceWorkerPool.__new__(InferenceWorkerPool)
+        pool._lock = threading.Lock()
+        pool._requests = {}
+        pool._pending = deque()
+        pool._ids = itertools.count()
+        pool._closed = False
+        pool._workers = [_Worker(0), _Worker(1)]
+        for worker in pool._workers:
+            worker.process = FakeProcess()
+            worker.input_queue = queue.Queue()
+        pool._results = queue.Queue()
+        for message in messages + [None]:
+            pool._results.put(message)
+        pool._read_results()
+        return pool
+
+    def test_load_status_from_worker_messages(self):
+        """Durées de chargement et erreurs remontées par les messages des processus"""
+        pool = self.message_pool([
+            ("ready", 0, (10, "1.0.0", {"load_ms": 12.0, "warmup_ms": 30.0}), None),
+            ("failed", 1, "Modèle non trouvé", None),
+        ])
+
+        ready, failed = pool.load_status()
+        assert ready["ready"] and ready["version"] == "1.0.0" and ready["warmup_ms"] == 30.0
+        assert not failed["ready"] and failed["load_error"] == "Modèle non trouvé"
+
+    def test_failed_load_stops_worker_and_skips_dispatch(self):
+        """Un processus sans modèle est arrêté (puis relancé par la supervision) et ne reçoit plus de lots"""
+        pool = self.message_pool([
+            ("ready", 0, (10, "1.0.0", {}), None),
+            ("failed", 1, "Modèle non trouvé", None),
+        ])
+        healthy, failed = pool._workers
+
+        assert failed.process.terminated and not healthy.process.terminated
+        for _ in range(3):
+            pool.submit(np.zeros((1, 2, 2, 3), dtype=np.uint8))
+        assert len(healthy.inflight) == 3 and not failed.inflight
+        assert pool.state == "ready"
+
+    def test_all_workers_failed(self):
+        """Sans aucun modèle chargé, les prédictions échouent aussitôt"""
+        pool = self.message_pool([("failed", 0, "Modèle non trouvé", None), ("failed", 1, "Modèle non trouvé", None)])
+
+        assert pool.state == "failed"
+        with pytest.raises(RuntimeError):
+            pool.submit(np.zeros((1, 2, 2, 3), dtype=np.uint8))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
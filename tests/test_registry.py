@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Tests pytest du registre de modèles versionnés"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.registry import ModelRegistry
+
+ARTIFACTS = {"keras": "cats_dogs_model.keras", "tflite": "cats_dogs_model.tflite"}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    fallback = tmp_path / "legacy.keras"
+    fallback.write_bytes(b"legacy")
+    return ModelRegistry(tmp_path / "registry", ARTIFACTS, fallback_version="1.0.0",
+                         fallback_paths={"keras": fallback})
+
+
+class TestModelRegistry:
+    """Tests de résolution et d'enregistrement des versions"""
+
+    def test_empty_registry_uses_fallback(self, registry):
+        """Sans version enregistrée, le modèle historique est servi"""
+        version, path = registry.resolve("keras")
+
+        assert version == "1.0.0"
+        assert path.read_bytes() == b"legacy"
+        assert registry.resolve("keras", "1.0.0") == (version, path)
+
+    def test_latest_version_is_resolved(self, registry, tmp_path):
+        """La version la plus récente (tri naturel) est servie par défaut"""
+        artifact = tmp_path / "model.keras"
+        for version in ["1.2.0", "1.10.0", "1.9.1"]:
+            artifact.write_bytes(version.encode())
+            registry.register(artifact, version, "keras")
+
+        assert registry.versions("keras") == ["1.2.0", "1.9.1", "1.10.0"]
+        version, path = registry.resolve("keras")
+        assert version == "1.10.0"
+        assert path.read_bytes() == b"1.10.0"
+        assert registry.resolve("keras", "1.2.0")[1].read_bytes() == b"1.2.0"
+
+    def test_versions_are_filtered_by_backend(self, registry, tmp_path):
+        """Une version sans artefact pour le backend n'est pas proposée"""
+        artifact = tmp_path / "model.tflite"
+        artifact.write_bytes(b"tflite")
+        registry.register(artifact, "2.0.0", "tflite")
+
+        assert registry.versions("tflite") == ["2.0.0"]
+        assert registry.versions("keras") == []
+
+    def test_unknown_or_duplicate_version(self, registry, tmp_path):
+        """Une version inconnue ou déjà enregistrée est refusée"""
+        artifact = tmp_path / "model.keras"
+        artifact.write_bytes(b"model")
+        registry.register(artifact, "1.1.0", "keras")
+
+        with pytest.raises(ValueError):
+            registry.resolve("keras", "9.9.9")
+        with pytest.raises(ValueError):
+            registry.register(artifact, "1.1.0", "keras")
+
+    def test_version_outside_registry_is_refused(self, registry, tmp_path):
+        """Une version qui désigne un chemin hors du registre est refusée, même si l'artefact existe"""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / ARTIFACTS["keras"]).write_bytes(b"model")
+
+        with pytest.raises(ValueError):
+            registry.resolve("keras", "../outside")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
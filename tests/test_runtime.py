@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Tests pytest des réglages par processus (CPU, threads, mémoire)"""
+
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.runtime import available_cpus, claim_slot, cpu_slice, parse_cpu_list, pin_cpus, process_memory
+
+
+class TestCpuAffinity:
+    """Tests du partage des CPU entre processus"""
+
+    def test_parse_cpu_list(self):
+        """Plages et CPU isolés, dédoublonnés et triés"""
+        assert parse_cpu_list("8,0-3, 2,10-11") == [0, 1, 2, 3, 8, 10, 11]
+        assert parse_cpu_list("") == []
+
+    @pytest.mark.parametrize("num_cpus,count", [(10, 3), (8, 4), (4, 4), (7, 2)])
+    def test_cpu_slices_partition(self, num_cpus, count):
+        """Les parts couvrent tous les CPU sans recouvrement, à un CPU près"""
+        cpus = list(range(num_cpus))
+        slices = [cpu_slice(cpus, i, count) for i in range(count)]
+
+        assert sorted(cpu for part in slices for cpu in part) == cpus
+        assert max(map(len, slices)) - min(map(len, slices)) <= 1
+
+    def test_more_processes_than_cpus(self):
+        """Plus de processus que de CPU : chacun reçoit un CPU, partagé"""
+        assert [cpu_slice([0, 1], i, 3) for i in range(3)] == [[0], [1], [0]]
+
+    def test_claim_slot(self, tmp_path):
+        """Chaque verrou de fichier réserve une part distincte"""
+        assert [claim_slot(3, tmp_path) for _ in range(3)] == [0, 1, 2]
+
+    @pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="Épinglage CPU non disponible")
+    def test_pin_cpus(self):
+        """Le processus est restreint à sa part"""
+        before = available_cpus()
+        try:
+            cpus = pin_cpus(",".join(map(str, before)), index=0, count=2)
+            assert available_cpus() == cpus == cpu_slice(before, 0, 2)
+        finally:
+            os.sched_setaffinity(0, before)
+
+
+class TestProcessMemory:
+    """Tests du relevé mémoire par processus"""
+
+    def test_process_memory(self):
+        """Mémoire résidente et allocateur du processus courant"""
+        info = process_memory()
+
+        assert info["pid"] == os.getpid()
+        assert info["peak_rss_mb"] > 0
+        if info["allocator"] is not None:
+            assert info["allocator"]["in_use_mb"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
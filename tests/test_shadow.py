@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tests pytest de l'inférence fantôme"""
+
+import time
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.models.shadow import ShadowRunner
+
+
+class FakeEngine:
+    """Moteur du modèle candidat factice : le score encode le premier octet de l'image"""
+    model_version = "2.0.0"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self.stopped = False
+
+    def is_loaded(self):
+        return True
+
+    def predict_batch(self, images, with_version: bool = False):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(images))
+        scores = images[:, 0, 0, 0].astype(np.float32) / 255
+        return (scores, self.model_version) if with_version else scores
+
+    def shutdown(self):
+        self.stopped = True
+
+
+def image(value: int) -> np.ndarray:
+    """Entrée du modèle (H, W, C) déjà prétraitée par le chemin principal"""
+    return np.full((2, 2, 3), value, dtype=np.uint8)
+
+
+def make_runner(engine=None, **kwargs) -> ShadowRunner:
+    engine = engine or FakeEngine()
+    kwargs.setdefault("write_fn", lambda rows: None)
+    shadow = ShadowRunner(lambda: engine, **kwargs)
+    shadow.engine = engine
+    return shadow
+
+
+class TestShadowRunner:
+    """Tests de l'échantillonnage, de la file bornée et de l'écriture des scores"""
+
+    def test_scores_are_written_with_version(self):
+        """Les scores du candidat sont écrits avec sa version, l'accord est suivi"""
+        rows = []
+        engine = FakeEngine()
+        shadow = ShadowRunner(lambda: engine, write_fn=rows.extend, sample_rate=1.0)
+        assert not shadow.sample()
+        shadow.start()
+
+        assert shadow.sample()
+        assert shadow.submit("task-1", image(255), primary_score=0.9)
+        assert shadow.submit("task-2", image(0), primary_score=0.9)
+        shadow.shutdown()
+
+        assert rows == [("task-1", 1.0, "2.0.0"), ("task-2", 0.0, "2.0.0")]
+        assert engine.stopped
+        stats = shadow.get_stats()
+        assert stats["processed"] == 2
+        assert stats["agreement"] == pytest.approx(0.5)
+
+    def test_sampling(self):
+        """Sans échantillonnage, aucune copie n'est faite"""
+        shadow = make_runner(sample_rate=0.0)
+
+        assert not shadow.sample()
+        assert shadow.get_stats()["submitted"] == 0
+
+    def test_full_queue_drops_without_blocking(self):
+        """Une file pleine abandonne les copies au lieu de bloquer"""
+        shadow = make_runner(sample_rate=1.0, queue_size=2)
+
+        start = time.perf_counter()
+        accepted = [shadow.submit(f"task-{i}", image(i), primary_score=0.5) for i in range(5)]
+
+        assert time.perf_counter() - start < 0.1
+        assert accepted == [True, True, False, False, False]
+        assert shadow.get_stats()["dropped_full"] == 3
+
+    def test_busy_primary_drops(self):
+        """Les copies sont abandonnées quand l'inférence principale est saturée"""
+        shadow = make_runner(sample_rate=1.0, is_busy=lambda: True)
+
+        assert not shadow.sample()
+        assert shadow.get_stats()["dropped_busy"] == 1
+
+    def test_load_rechecked_before_each_batch(self):
+        """Une copie acceptée est abandonnée si l'inférence principale sature avant son lot"""
+        rows = []
+        busy = [False]
+        engine = FakeEngine()
+        shadow = make_runner(engine, write_fn=rows.extend, sample_rate=1.0, is_busy=lambda: busy[0])
+
+        assert shadow.submit("task-1", image(1), primary_score=0.5)
+        assert shadow.submit("task-2", image(2), primary_score=0.5)
+        busy[0] = True
+        shadow.start()
+        shadow.shutdown()
+
+        assert rows == [] and engine.batch_sizes == []
+        assert shadow.get_stats()["dropped_busy"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
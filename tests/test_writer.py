@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Tests pytest de la journalisation différée"""
+
+import asyncio
+import threading
+import time
+import pytest
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire racine au path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.monitoring.writer import WriteBehindWriter, make_writer
+
+
+class RecordingWrite:
+    """write_fn factice : enregistre chaque lot, peut bloquer jusqu'à libération"""
+
+    def __init__(self, blocked: bool = False, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+
+    def __call__(self, batch):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("base indisponible")
+        self.batches.append(list(batch))
+
+    @property
+    def rows(self):
+        return [row for batch in self.batches for row in batch]
+
+
+class TestWriteBehindWriter:
+    """Tests du regroupement, de la file bornée et du vidage à l'arrêt"""
+
+    def test_flush_by_rows(self):
+        """Un lot est écrit dès flush_rows enregistrements, sans attendre l'échéance"""
+        write = RecordingWrite()
+        writer = WriteBehindWriter(write, flush_rows=3, flush_ms=10_000)
+
+        for i in range(3):
+            assert writer.submit({"uuid": i})
+        deadline = time.monotonic() + 2
+        while not write.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert write.batches == [[{"uuid": 0}, {"uuid": 1}, {"uuid": 2}]]
+        writer.shutdown()
+
+    def test_flush_by_time(self):
+        """Un lot incomplet est écrit flush_ms après son premier enregistrement"""
+        write = RecordingWrite()
+        writer = WriteBehindWriter(write, flush_rows=100, flush_ms=20)
+
+        writer.submit({"uuid": 1})
+        time.sleep(0.3)
+
+        assert write.rows == [{"uuid": 1}]
+        assert writer.get_stats()["written"] == 1
+        writer.shutdown()
+
+    def test_shutdown_drains_queue(self):
+        """L'arrêt écrit tout ce qui est en file, les enregistrements suivants sont abandonnés"""
+        write = RecordingWrite()
+        writer = WriteBehindWriter(write, flush_rows=1000, flush_ms=10_000)
+
+        writer.submit_many([{"uuid": i} for i in range(10)])
+        writer.shutdown()
+
+        assert write.rows == [{"uuid": i} for i in range(10)]
+        assert not writer.submit({"uuid": "late"})
+        assert writer.get_stats()["dropped_closed"] == 1
+
+    def test_flush_waits_for_queued_rows(self):
+        """flush() rend la main une fois les enregistrements déjà en file écrits"""
+        write = RecordingWrite()
+        writer = WriteBehindWriter(write, flush_rows=1000, flush_ms=10_000)
+
+        writer.submit({"uuid": 1})
+        assert writer.flush()
+        assert write.rows == [{"uuid": 1}]
+        writer.shutdown()
+
+    def test_drop_new_when_full(self):
+        """drop_new : file pleine, les nouveaux enregistrements sont abandonnés sans bloquer"""
+        write = RecordingWrite(blocked=True)
+        writer = WriteBehindWriter(write, queue_size=2, flush_rows=1, flush_ms=0, overflow="drop_new")
+
+        writer.submit({"uuid": 0})
+        time.sleep(0.1)  # Le premier est pris par le thread, bloqué dans write_fn
+        start = time.perf_counter()
+        accepted = [writer.submit({"uuid": i}) for i in range(1, 5)]
+
+        assert time.perf_counter() - start < 0.1
+        assert accepted == [True, True, False, False]
+        write.release.set()
+        writer.shutdown()
+        assert write.rows == [{"uuid": 0}, {"uuid": 1}, {"uuid": 2}]
+        assert writer.get_stats()["dropped_full"] == 2
+
+    def test_drop_oldest_when_full(self):
+        """drop_oldest : file pleine, les plus anciens en attente cèdent la place"""
+        write = RecordingWrite(blocked=True)
+        writer = WriteBehindWriter(write, queue_size=2, flush_rows=1, flush_ms=0, overflow="drop_oldest")
+
+        writer.submit({"uuid": 0})
+        time.sleep(0.1)
+        accepted = [writer.submit({"uuid": i}) for i in range(1, 5)]
+
+        assert accepted == [True, True, True, True]
+        write.release.set()
+        writer.shutdown()
+        assert write.rows == [{"uuid": 0}, {"uuid": 3}, {"uuid": 4}]
+        assert writer.get_stats()["dropped_full"] == 2
+
+    def test_block_then_drop(self):
+        """block : l'appelant attend jusqu'à block_ms avant abandon"""
+        write = RecordingWrite(blocked=True)
+        writer = WriteBehindWriter(write, queue_size=1, flush_rows=1, flush_ms=0, overflow="block", block_ms=50)
+
+        writer.submit({"uuid": 0})
+        time.sleep(0.1)
+        assert writer.submit({"uuid": 1})
+        start = time.perf_counter()
+        assert not writer.submit({"uuid": 2})
+        assert time.perf_counter() - start >= 0.04
+        write.release.set()
+        writer.shutdown()
+
+    def test_block_does_not_stall_event_loop(self):
+        """block depuis la boucle asyncio : l'attente se fait dans un thread, la boucle continue"""
+        write = RecordingWrite(blocked=True)
+        writer = WriteBehindWriter(write, queue_size=1, flush_rows=1, flush_ms=0, overflow="block", block_ms=200)
+
+        writer.submit({"uuid": 0})
+        time.sleep(0.1)
+        writer.submit({"uuid": 1})
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            accepted = await writer.submit_many_async([{"uuid": 2}])
+            task.cancel()
+            return accepted, ticks
+
+        accepted, ticks = asyncio.run(run())
+        assert accepted == 0
+        assert ticks >= 5
+        write.release.set()
+        writer.shutdown()
+
+    def test_write_failure_is_counted(self):
+        """Une erreur d'écriture est comptée et n'arrête pas le thread"""
+        write = RecordingWrite(fail=True)
+        writer = WriteBehindWriter(write, flush_rows=1, flush_ms=0)
+
+        writer.submit({"uuid": 1})
+        writer.flush()
+        write.fail = False
+        writer.submit({"uuid": 2})
+        writer.shutdown()
+
+        assert write.rows == [{"uuid": 2}]
+        assert writer.get_stats()["failed"] == 1
+
+    def test_partial_write_is_counted(self):
+        """Les enregistrements que write_fn n'a pas pu écrire sont comptés en échec"""
+        writer = WriteBehindWriter(lambda batch: len(batch) - 1, flush_rows=3, flush_ms=10_000)
+
+        writer.submit_many([{"uuid": i} for i in range(3)])
+        writer.shutdown()
+
+        stats = writer.get_stats()
+        assert (stats["written"], stats["failed"]) == (2, 1)
+
+    def test_invalid_overflow(self):
+        """Une politique de débordement inconnue est refusée"""
+        with pytest.raises(ValueError):
+            WriteBehindWriter(lambda batch: None, overflow="ignore")
+
+    def test_make_writer_disabled(self):
+        """Sans écriture différée, pas de file : écriture synchrone"""
+        config = {"write_behind": False, "queue_size": 10, "flush_rows": 1, "flush_ms": 1,
+                  "overflow": "drop_new", "block_ms": 1}
+        assert make_writer(config, lambda batch: None) is None
+        assert isinstance(make_writer({**config, "write_behind": True}, lambda batch: None), WriteBehindWriter)